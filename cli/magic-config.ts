@@ -101,6 +101,12 @@ const embeddingModels: ModelConfig[] = [
     dimensions: 1536,
     default: false,
   },
+  {
+    provider: "bedrock",
+    name: "amazon.titan-embed-text-v2:0",
+    dimensions: 1024,
+    default: false,
+  },
   //Support for inputImage is not yet implemented for amazon.titan-embed-image-v1
   {
     provider: "bedrock",
@@ -562,6 +562,8 @@ export class AwsGenAILLMChatbotStack extends cdk.Stack {
             `/${this.stackName}/RagEngines/AuroraPgVector/CreateAuroraWorkspace/CreateAuroraWorkspaceFunction/ServiceRole/Resource`,
             `/${this.stackName}/RagEngines/AuroraPgVector/CreateAuroraWorkspace/CreateAuroraWorkspaceFunction/ServiceRole/DefaultPolicy/Resource`,
             `/${this.stackName}/RagEngines/AuroraPgVector/CreateAuroraWorkspace/CreateAuroraWorkspace/Role/DefaultPolicy/Resource`,
+            `/${this.stackName}/RagEngines/AuroraPgVector/IndexMaintenanceFunction/ServiceRole/Resource`,
+            `/${this.stackName}/RagEngines/AuroraPgVector/IndexMaintenanceFunction/ServiceRole/DefaultPolicy/Resource`,
           ],
           [
             {
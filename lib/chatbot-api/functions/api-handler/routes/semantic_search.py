@@ -1,3 +1,4 @@
+from typing import Optional
 from common.constant import ID_FIELD_VALIDATION, SAFE_PROMPT_STR_REGEX
 import genai_core.semantic_search
 from pydantic import BaseModel, Field
@@ -14,6 +15,8 @@ permissions = UserPermissions(router)
 class SemanticSearchRequest(BaseModel):
     workspaceId: str = ID_FIELD_VALIDATION
     query: str = Field(max_length=256, pattern=SAFE_PROMPT_STR_REGEX)
+    efSearch: Optional[int] = Field(gt=0, le=1000, default=None)
+    probes: Optional[int] = Field(gt=0, le=1000, default=None)
 
 
 @router.resolver(field_name="performSemanticSearch")
@@ -29,6 +32,8 @@ def semantic_search(input: dict):
         query=request.query,
         limit=25,
         full_response=True,
+        ef_search=request.efSearch,
+        probes=request.probes,
     )
     result = _convert_semantic_search_result(request.workspaceId, result)
 
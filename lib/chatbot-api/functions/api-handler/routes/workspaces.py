@@ -5,6 +5,7 @@ from common.constant import (
 )
 from common.validation import WorkspaceIdValidation
 import genai_core.types
+import genai_core.aurora.create
 import genai_core.kendra
 import genai_core.bedrock_kb
 import genai_core.parameters
@@ -44,6 +45,16 @@ class CreateWorkspaceAuroraRequest(BaseModel):
     chunkingStrategy: str = SAFE_SHORT_STR_VALIDATION
     chunkSize: int = Field(gt=100)
     chunkOverlap: int = Field(gt=0)
+    embeddingsDimensions: Optional[int] = Field(gt=0, default=None)
+    vectorPrecision: Optional[str] = SAFE_SHORT_STR_VALIDATION_OPTIONAL
+    vectorRescore: Optional[bool] = None
+    chunkDedup: Optional[bool] = None
+    indexType: Optional[str] = SAFE_SHORT_STR_VALIDATION_OPTIONAL
+    hnswM: Optional[int] = Field(ge=2, le=100, default=None)
+    hnswEfConstruction: Optional[int] = Field(ge=4, le=1000, default=None)
+    hnswEfSearch: Optional[int] = Field(gt=0, le=1000, default=None)
+    ivfflatProbes: Optional[int] = Field(gt=0, le=1000, default=None)
+    tableLayout: Optional[str] = SAFE_SHORT_STR_VALIDATION_OPTIONAL
 
 
 class CreateWorkspaceOpenSearchRequest(BaseModel):
@@ -62,6 +73,10 @@ class CreateWorkspaceOpenSearchRequest(BaseModel):
     chunkingStrategy: str = SAFE_SHORT_STR_VALIDATION
     chunkSize: int = Field(gt=0)
     chunkOverlap: int = Field(gt=0)
+    embeddingsDimensions: Optional[int] = Field(gt=0, default=None)
+    vectorPrecision: Optional[str] = SAFE_SHORT_STR_VALIDATION_OPTIONAL
+    vectorRescore: Optional[bool] = None
+    chunkDedup: Optional[bool] = None
 
 
 class CreateWorkspaceKendraRequest(BaseModel):
@@ -197,6 +212,10 @@ def _create_workspace_aurora(request: CreateWorkspaceAuroraRequest, config: dict
         raise genai_core.types.CommonError("Cross encoder model not found")
 
     embeddings_model_dimensions = embeddings_model["dimensions"]
+    if request.embeddingsDimensions is not None:
+        if request.embeddingsDimensions > embeddings_model_dimensions:
+            raise genai_core.types.CommonError("Invalid embeddings dimensions")
+        embeddings_model_dimensions = request.embeddingsDimensions
 
     if len(request.languages) == 0 or len(request.languages) > 3:
         raise genai_core.types.CommonError("Invalid languages")
@@ -204,7 +223,7 @@ def _create_workspace_aurora(request: CreateWorkspaceAuroraRequest, config: dict
     if request.metric not in ["inner", "cosine", "l2"]:
         raise genai_core.types.CommonError("Invalid metric")
 
-    if request.chunkingStrategy not in ["recursive"]:
+    if request.chunkingStrategy not in ["recursive", "token"]:
         raise genai_core.types.CommonError("Invalid chunking strategy")
 
     if request.chunkSize < 100 or request.chunkSize > 10000:
@@ -213,6 +232,42 @@ def _create_workspace_aurora(request: CreateWorkspaceAuroraRequest, config: dict
     if request.chunkOverlap < 0 or request.chunkOverlap >= request.chunkSize:
         raise genai_core.types.CommonError("Invalid chunk overlap")
 
+    vector_precision = (
+        request.vectorPrecision or genai_core.types.VectorPrecision.FLOAT32.value
+    )
+    if vector_precision not in [
+        precision.value for precision in genai_core.types.VectorPrecision
+    ]:
+        raise genai_core.types.CommonError("Invalid vector precision")
+
+    index_type = request.indexType or genai_core.types.VectorIndexType.IVFFLAT.value
+    if index_type not in [
+        index_type.value for index_type in genai_core.types.VectorIndexType
+    ]:
+        raise genai_core.types.CommonError("Invalid index type")
+
+    # pgvector requires ef_construction of at least twice m
+    hnsw_m = request.hnswM or genai_core.aurora.create.HNSW_M
+    hnsw_ef_construction = (
+        request.hnswEfConstruction or genai_core.aurora.create.HNSW_EF_CONSTRUCTION
+    )
+    if hnsw_ef_construction < 2 * hnsw_m:
+        raise genai_core.types.CommonError("Invalid HNSW ef construction")
+
+    table_layout = request.tableLayout or genai_core.types.TableLayout.TABLE.value
+    if table_layout not in [layout.value for layout in genai_core.types.TableLayout]:
+        raise genai_core.types.CommonError("Invalid table layout")
+    # The shared tables index the configurations they were created with
+    if (
+        table_layout == genai_core.types.TableLayout.PARTITIONED.value
+        and request.hybridSearch
+        and any(
+            language not in genai_core.aurora.create.TEXT_SEARCH_LANGUAGES
+            for language in request.languages
+        )
+    ):
+        raise genai_core.types.CommonError("Invalid languages")
+
     return _convert_workspace(
         genai_core.workspaces.create_workspace_aurora(
             workspace_name=workspace_name,
@@ -228,6 +283,15 @@ def _create_workspace_aurora(request: CreateWorkspaceAuroraRequest, config: dict
             chunking_strategy=request.chunkingStrategy,
             chunk_size=request.chunkSize,
             chunk_overlap=request.chunkOverlap,
+            vector_precision=vector_precision,
+            vector_rescore=bool(request.vectorRescore),
+            chunk_dedup=bool(request.chunkDedup),
+            index_type=index_type,
+            hnsw_m=request.hnswM,
+            hnsw_ef_construction=request.hnswEfConstruction,
+            hnsw_ef_search=request.hnswEfSearch,
+            ivfflat_probes=request.ivfflatProbes,
+            table_layout=table_layout,
         )
     )
 
@@ -264,11 +328,15 @@ def _create_workspace_open_search(
         raise genai_core.types.CommonError("Cross encoder model not found")
 
     embeddings_model_dimensions = embeddings_model["dimensions"]
+    if request.embeddingsDimensions is not None:
+        if request.embeddingsDimensions > embeddings_model_dimensions:
+            raise genai_core.types.CommonError("Invalid embeddings dimensions")
+        embeddings_model_dimensions = request.embeddingsDimensions
 
     if len(request.languages) == 0 or len(request.languages) > 3:
         raise genai_core.types.CommonError("Invalid languages")
 
-    if request.chunkingStrategy not in ["recursive"]:
+    if request.chunkingStrategy not in ["recursive", "token"]:
         raise genai_core.types.CommonError("Invalid chunking strategy")
 
     if request.chunkSize < 100 or request.chunkSize > 10000:
@@ -277,6 +345,14 @@ def _create_workspace_open_search(
     if request.chunkOverlap < 0 or request.chunkOverlap >= request.chunkSize:
         raise genai_core.types.CommonError("Invalid chunk overlap")
 
+    vector_precision = (
+        request.vectorPrecision or genai_core.types.VectorPrecision.FLOAT32.value
+    )
+    if vector_precision not in [
+        precision.value for precision in genai_core.types.VectorPrecision
+    ]:
+        raise genai_core.types.CommonError("Invalid vector precision")
+
     return _convert_workspace(
         genai_core.workspaces.create_workspace_open_search(
             workspace_name=workspace_name,
@@ -290,6 +366,9 @@ def _create_workspace_open_search(
             chunking_strategy=request.chunkingStrategy,
             chunk_size=request.chunkSize,
             chunk_overlap=request.chunkOverlap,
+            vector_precision=vector_precision,
+            vector_rescore=bool(request.vectorRescore),
+            chunk_dedup=bool(request.chunkDedup),
         )
     )
 
@@ -360,6 +439,16 @@ def _convert_workspace(workspace: dict):
         "chunkingStrategy": workspace.get("chunking_strategy"),
         "chunkSize": workspace.get("chunk_size"),
         "chunkOverlap": workspace.get("chunk_overlap"),
+        "vectorPrecision": workspace.get("vector_precision"),
+        "vectorRescore": workspace.get("vector_rescore"),
+        "chunkDedup": workspace.get("chunk_dedup"),
+        "indexType": workspace.get("index_type"),
+        "hnswM": workspace.get("hnsw_m"),
+        "hnswEfConstruction": workspace.get("hnsw_ef_construction"),
+        "hnswEfSearch": workspace.get("hnsw_ef_search"),
+        "ivfflatProbes": workspace.get("ivfflat_probes"),
+        "ivfflatLists": workspace.get("ivfflat_lists"),
+        "tableLayout": workspace.get("table_layout"),
         "vectors": workspace.get("vectors", 0),
         "documents": workspace.get("documents", 0),
         "aossEngine": workspace.get("aoss_engine"),
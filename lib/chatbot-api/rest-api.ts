@@ -82,6 +82,9 @@ export class ApiResolvers extends Construct {
           AURORA_DB_HOST:
             props.ragEngines?.auroraPgVector?.database?.clusterEndpoint
               ?.hostname ?? "",
+          AURORA_DB_READER_HOST:
+            props.ragEngines?.auroraPgVector?.database?.clusterReadEndpoint
+              ?.hostname ?? "",
           AURORA_DB_PORT:
             props.ragEngines?.auroraPgVector?.database?.clusterEndpoint?.port +
             "",
@@ -153,6 +156,15 @@ export class ApiResolvers extends Construct {
     );
     this.appSyncLambdaResolver = appSyncLambdaResolver;
 
+    if (props.shared.localEmbeddingsLayer && props.ragEngines) {
+      // Models are read from the models/ prefix of the processing bucket
+      appSyncLambdaResolver.addLayers(props.shared.localEmbeddingsLayer);
+      appSyncLambdaResolver.addEnvironment(
+        "LOCAL_EMBEDDINGS_MODELS_BUCKET_NAME",
+        props.ragEngines.processingBucket.bucketName
+      );
+    }
+
     function addPermissions(apiHandler: lambda.Function) {
       if (props.ragEngines?.workspacesTable) {
         props.ragEngines.workspacesTable.grantReadWriteData(apiHandler);
@@ -67,6 +67,9 @@ export class LangChainInterface extends Construct {
         AURORA_DB_HOST:
           props.ragEngines?.auroraPgVector?.database?.clusterEndpoint
             ?.hostname ?? "",
+        AURORA_DB_READER_HOST:
+          props.ragEngines?.auroraPgVector?.database?.clusterReadEndpoint
+            ?.hostname ?? "",
         AURORA_DB_PORT:
           props.ragEngines?.auroraPgVector?.database?.clusterEndpoint?.port +
           "",
@@ -90,6 +93,16 @@ export class LangChainInterface extends Construct {
 
     props.chatbotFilesBucket.grantReadWrite(requestHandler);
 
+    if (props.shared.localEmbeddingsLayer && props.ragEngines) {
+      // Models are read from the models/ prefix of the processing bucket
+      requestHandler.addLayers(props.shared.localEmbeddingsLayer);
+      requestHandler.addEnvironment(
+        "LOCAL_EMBEDDINGS_MODELS_BUCKET_NAME",
+        props.ragEngines.processingBucket.bucketName
+      );
+      props.ragEngines.processingBucket.grantRead(requestHandler, "models/*");
+    }
+
     if (props.config.bedrock?.enabled) {
       requestHandler.addToRolePolicy(
         new iam.PolicyStatement({
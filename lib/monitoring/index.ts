@@ -4,6 +4,7 @@ import {
   LogQueryWidget,
   MathExpression,
   Metric,
+  Unit,
 } from "aws-cdk-lib/aws-cloudwatch";
 import { ITable } from "aws-cdk-lib/aws-dynamodb";
 import { IFunction as ILambdaFunction } from "aws-cdk-lib/aws-lambda";
@@ -167,6 +168,13 @@ export class Monitoring extends Construct {
         alarmFriendlyName: props.aurora.node.id,
         humanReadableName: props.aurora.node.id,
       });
+
+      if (props.advancedMonitoring) {
+        this.addAuroraLatencyMetricFilter(props.prefix + "GenAI", monitoring, [
+          ...props.appsyncResolversLogGroups,
+          ...props.llmRequestHandlersLogGroups,
+        ]);
+      }
     }
 
     if (props.opensearch) {
@@ -351,6 +359,51 @@ export class Monitoring extends Construct {
     });
   }
 
+  private addAuroraLatencyMetricFilter(
+    namespace: string,
+    monitoring: MonitoringFacade,
+    logGroups: ILogGroup[]
+  ) {
+    for (const logGroupKey in logGroups) {
+      new MetricFilter(this, "AuroraLatencyFilter" + logGroupKey, {
+        logGroup: logGroups[logGroupKey],
+        metricNamespace: namespace,
+        metricName: "AuroraLatency",
+        filterPattern: FilterPattern.stringValue(
+          "$.metric_type",
+          "=",
+          "aurora_latency"
+        ),
+        metricValue: "$.value",
+        unit: Unit.MILLISECONDS,
+        dimensions: {
+          endpoint: "$.endpoint",
+        },
+      });
+    }
+
+    monitoring.monitorCustom({
+      alarmFriendlyName: "AuroraLatency",
+      humanReadableName: "Aurora Latency",
+      metricGroups: [
+        {
+          title: "Aurora Latency per Endpoint (ms)",
+          metrics: ["writer", "reader"].map((endpoint) => ({
+            alarmFriendlyName: "AuroraLatency" + endpoint,
+            metric: new Metric({
+              namespace,
+              metricName: "AuroraLatency",
+              dimensionsMap: { endpoint },
+              statistic: "p90",
+              label: endpoint,
+            }),
+            addAlarm: {},
+          })),
+        },
+      ],
+    });
+  }
+
   private addCognitoMetrics(
     monitoring: MonitoringFacade,
     userpoolId: string,
@@ -0,0 +1,43 @@
+import genai_core.workspaces
+import genai_core.aurora.maintenance
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+logger = Logger()
+
+
+@logger.inject_lambda_context(log_event=True)
+def lambda_handler(event, context: LambdaContext):
+    rebuilt = 0
+    for workspace in genai_core.workspaces.list_workspaces():
+        if workspace["engine"] != "aurora" or workspace["status"] != "ready":
+            continue
+
+        workspace_id = workspace["workspace_id"]
+        try:
+            languages = genai_core.aurora.maintenance.add_tsvector_columns(workspace)
+            if languages is not None:
+                genai_core.workspaces.set_tsvector_languages(workspace_id, languages)
+                genai_core.aurora.maintenance.drop_tsvector_expression_indexes(
+                    workspace
+                )
+
+            # Small partitions have no vector index yet
+            result = genai_core.aurora.maintenance.build_partition_index(workspace)
+            if result is None:
+                result = genai_core.aurora.maintenance.rebuild_ivfflat_index(workspace)
+        except Exception:
+            # The other workspaces are still maintained
+            logger.exception(f"Index maintenance failed for {workspace_id}")
+            continue
+
+        if result is None:
+            continue
+
+        if result["lists"] is not None:
+            genai_core.workspaces.set_ivfflat_index(
+                workspace_id, result["lists"], result["rows"]
+            )
+        rebuilt += 1
+
+    return {"ok": True, "rebuilt": rebuilt}
@@ -6,6 +6,8 @@ import { Shared } from "../../shared";
 import { CreateAuroraWorkspace } from "./create-aurora-workspace";
 import { RagDynamoDBTables } from "../rag-dynamodb-tables";
 import * as ec2 from "aws-cdk-lib/aws-ec2";
+import * as events from "aws-cdk-lib/aws-events";
+import * as targets from "aws-cdk-lib/aws-events-targets";
 import * as lambda from "aws-cdk-lib/aws-lambda";
 import * as logs from "aws-cdk-lib/aws-logs";
 import * as rds from "aws-cdk-lib/aws-rds";
@@ -46,6 +48,14 @@ export class AuroraPgVector extends Construct {
           ? cdk.RemovalPolicy.SNAPSHOT
           : cdk.RemovalPolicy.DESTROY,
       writer: rds.ClusterInstance.serverlessV2("ServerlessInstance"),
+      readers: Array.from(
+        { length: props.config.rag.engines.aurora.readers ?? 0 },
+        (_, idx) =>
+          rds.ClusterInstance.serverlessV2(`ReaderInstance${idx}`, {
+            // Promoted first on failover, sized like the writer
+            scaleWithWriter: idx === 0,
+          })
+      ),
       vpc: props.shared.vpc,
       vpcSubnets: { subnetType: ec2.SubnetType.PRIVATE_ISOLATED },
       iamAuthentication: true,
@@ -116,6 +126,47 @@ export class AuroraPgVector extends Construct {
       }
     );
 
+    const indexMaintenanceFunction = new lambda.Function(
+      this,
+      "IndexMaintenanceFunction",
+      {
+        vpc: props.shared.vpc,
+        code: props.shared.sharedCode.bundleWithLambdaAsset(
+          path.join(__dirname, "./functions/index-maintenance")
+        ),
+        description: "Migrates and rebuilds Aurora workspace indexes",
+        runtime: props.shared.pythonRuntime,
+        architecture: props.shared.lambdaArchitecture,
+        handler: "index.lambda_handler",
+        layers: [props.shared.powerToolsLayer, props.shared.commonLayer],
+        timeout: cdk.Duration.minutes(15),
+        logRetention: props.config.logRetention ?? logs.RetentionDays.ONE_WEEK,
+        loggingFormat: lambda.LoggingFormat.JSON,
+        environment: {
+          ...props.shared.defaultEnvironmentVariables,
+          AURORA_DB_USER: AURORA_DB_USERS.ADMIN,
+          AURORA_DB_HOST: dbCluster.clusterEndpoint.hostname,
+          AURORA_DB_PORT: dbCluster.clusterEndpoint.port + "",
+          WORKSPACES_TABLE_NAME:
+            props.ragDynamoDBTables.workspacesTable.tableName,
+          WORKSPACES_BY_OBJECT_TYPE_INDEX_NAME:
+            props.ragDynamoDBTables.workspacesByObjectTypeIndexName,
+        },
+      }
+    );
+
+    // The workspace tables are owned by the admin user
+    dbCluster.grantConnect(indexMaintenanceFunction, AURORA_DB_USERS.ADMIN);
+    dbCluster.connections.allowDefaultPortFrom(indexMaintenanceFunction);
+    props.ragDynamoDBTables.workspacesTable.grantReadWriteData(
+      indexMaintenanceFunction
+    );
+
+    new events.Rule(this, "IndexMaintenanceSchedule", {
+      schedule: events.Schedule.rate(cdk.Duration.days(1)),
+      targets: [new targets.LambdaFunction(indexMaintenanceFunction)],
+    });
+
     this.database = dbCluster;
     this.createAuroraWorkspaceWorkflow = createWorkflow.stateMachine;
 
@@ -13,6 +13,7 @@ import * as rds from "aws-cdk-lib/aws-rds";
 import * as sagemaker from "aws-cdk-lib/aws-sagemaker";
 import { NagSuppressions } from "cdk-nag";
 import { AURORA_DB_USERS } from "../aurora-pgvector";
+import { Utils } from "../../shared/utils";
 
 export interface FileImportBatchJobProps {
   readonly config: SystemConfig;
@@ -83,6 +84,7 @@ export class FileImportBatchJob extends Construct {
           AURORA_DB_USER: AURORA_DB_USERS.WRITE,
           AURORA_DB_HOST: props.auroraDatabase?.clusterEndpoint?.hostname ?? "",
           AURORA_DB_PORT: props.auroraDatabase?.clusterEndpoint?.port + "",
+          AURORA_POOL_SIZE: "4",
           PROCESSING_BUCKET_NAME: props.processingBucket.bucketName,
           WORKSPACES_TABLE_NAME:
             props.ragDynamoDBTables.workspacesTable.tableName,
@@ -96,6 +98,12 @@ export class FileImportBatchJob extends Construct {
             props.sageMakerRagModelsEndpoint?.attrEndpointName ?? "",
           OPEN_SEARCH_COLLECTION_ENDPOINT:
             props.openSearchVector?.openSearchCollectionEndpoint ?? "",
+          ...(Utils.hasLocalEmbeddingsModels(props.config)
+            ? {
+                LOCAL_EMBEDDINGS_MODELS_BUCKET_NAME:
+                  props.processingBucket.bucketName,
+              }
+            : {}),
         },
       }
     );
@@ -82,6 +82,7 @@ export class WebCrawlerBatchJob extends Construct {
           AURORA_DB_USER: AURORA_DB_USERS.WRITE,
           AURORA_DB_HOST: props.auroraDatabase?.clusterEndpoint?.hostname ?? "",
           AURORA_DB_PORT: props.auroraDatabase?.clusterEndpoint?.port + "",
+          AURORA_POOL_SIZE: "4",
           PROCESSING_BUCKET_NAME: props.processingBucket.bucketName,
           WORKSPACES_TABLE_NAME:
             props.ragDynamoDBTables.workspacesTable.tableName,
@@ -1,12 +1,30 @@
+import io
 import os
+import json
 import torch
+import inspect
 import logging
+import numpy as np
+import threading
 import torch.nn.functional as F
+from types import SimpleNamespace
 from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Padded tokens (batch size * longest sequence) and sequences per forward pass
+MAX_BATCH_TOKENS = int(os.environ.get("MAX_BATCH_TOKENS", 16384))
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 128))
+# "torch" or "onnx" (dynamically quantized int8 graphs on ONNX Runtime, CPU only)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+# Comma separated model ids loaded in model_fn, other models load on first use
+WARMUP_MODELS = os.environ.get("WARMUP_MODELS", "")
+# Exported and quantized graphs are written here, the model dir is read only
+ONNX_MODELS_DIR = os.environ.get("ONNX_MODELS_DIR", "/tmp/onnx-models")  # nosec B108
+# Clients sending this Accept header get a float32 .npy body instead of JSON
+NPY_CONTENT_TYPE = "application/x-npy"
+
 """
 {
     "type": "embeddings",
@@ -46,48 +64,213 @@ def mean_pooling(model_output, attention_mask):
     )
 
 
-def model_fn(model_dir):
-    logger.info("model_fn")
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-    config = {}
-    for model_id in process_model_list(embeddings_models):
-        embeddings_model_dir = f"{model_dir}/{model_id}"
-        embeddings_tokenizer = AutoTokenizer.from_pretrained(embeddings_model_dir)
-        embeddings_model = AutoModel.from_pretrained(embeddings_model_dir)
-        embeddings_model.eval()
-        embeddings_model.to(device)
-
-        model_config = {
-            "model": embeddings_model,
-            "tokenizer": embeddings_tokenizer,
+def get_length_sorted_batches(lengths, max_tokens, max_size):
+    """
+    Group sequence indices by length so that each batch pads to a similar
+    length and batch size * longest sequence stays within max_tokens
+    """
+    order = sorted(range(len(lengths)), key=lambda idx: lengths[idx])
+
+    batches = []
+    current = []
+    for idx in order:
+        # Sorted ascending, so the current sequence is the longest of the batch
+        padded_tokens = (len(current) + 1) * lengths[idx]
+        if current and (padded_tokens > max_tokens or len(current) >= max_size):
+            batches.append(current)
+            current = []
+        current.append(idx)
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def run_batched(tokenizer, inputs, run_batch, device):
+    """
+    Tokenize the inputs once, run them in length sorted micro batches and
+    return the per input results in the original order
+    """
+    if not inputs:
+        return np.zeros((0,), dtype=np.float32)
+
+    encoded = tokenizer(inputs, truncation=True)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+
+    ret_value = [None] * len(lengths)
+    for batch in get_length_sorted_batches(lengths, MAX_BATCH_TOKENS, MAX_BATCH_SIZE):
+        features = tokenizer.pad(
+            {key: [encoded[key][idx] for idx in batch] for key in encoded.keys()},
+            return_tensors="pt",
+        )
+        features = features.to(device)
+
+        for idx, value in zip(batch, run_batch(features)):
+            ret_value[idx] = value
+
+    return np.asarray(ret_value, dtype=np.float32)
+
+
+class OnnxModel(object):
+    """
+    Runs an int8 ONNX Runtime graph behind the same call interface as the
+    transformers models, so predict_fn does not depend on the backend
+    """
+
+    def __init__(self, session, model_type):
+        self.session = session
+        self.model_type = model_type
+        self.input_names = [value.name for value in session.get_inputs()]
+
+    def __call__(self, **features):
+        inputs = {
+            name: features[name].cpu().numpy()
+            for name in self.input_names
+            if name in features
         }
+        output = torch.from_numpy(self.session.run(None, inputs)[0])
 
-        config[model_id] = model_config
+        if self.model_type == "embeddings":
+            return (output,)
+
+        return SimpleNamespace(logits=output)
 
-    for model_id in process_model_list(cross_encoder_models):
-        cross_encoder_model_dir = os.path.join(model_dir, model_id)
-        cross_encoder_model = AutoModelForSequenceClassification.from_pretrained(
-            cross_encoder_model_dir
-        )
-        cross_encoder_tokenizer = AutoTokenizer.from_pretrained(cross_encoder_model_dir)
 
-        cross_encoder_model.eval()
-        cross_encoder_model.to(device)
+def load_torch_model(model_dir, model_type):
+    if model_type == "embeddings":
+        model = AutoModel.from_pretrained(model_dir)
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    return model
+
+
+def load_onnx_model(model_dir, tokenizer, model_id, model_type):
+    import onnxruntime
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_dir = os.path.join(ONNX_MODELS_DIR, model_id)
+    quantized_path = os.path.join(output_dir, "model_quantized.onnx")
+
+    if not os.path.exists(quantized_path):
+        logger.info(f"Exporting {model_id} to ONNX")
+        # The PyTorch weights are only loaded to export, not kept in memory
+        model = load_torch_model(model_dir, model_type)
+        os.makedirs(output_dir, exist_ok=True)
+        model_path = os.path.join(output_dir, "model.onnx")
+        sample = tokenizer(["sample input"], return_tensors="pt")
+        # Inputs are passed positionally, in the order of the forward arguments
+        input_names = [
+            name
+            for name in inspect.signature(model.forward).parameters
+            if name in sample
+        ]
+        output_name = "last_hidden_state" if model_type == "embeddings" else "logits"
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes[output_name] = {0: "batch"}
+
+        export_options = {}
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            # Newer torch versions default to the dynamo exporter
+            export_options["dynamo"] = False
+
+        with torch.inference_mode():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                model_path,
+                input_names=input_names,
+                output_names=[output_name],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                **export_options,
+            )
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        os.remove(model_path)
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = onnxruntime.InferenceSession(
+        quantized_path, sess_options=options, providers=["CPUExecutionProvider"]
+    )
 
-        model_config = {
-            "model": cross_encoder_model,
-            "tokenizer": cross_encoder_tokenizer,
+    return OnnxModel(session, model_type)
+
+
+class ModelRegistry(object):
+    """Loads each model on first use and keeps it for later requests"""
+
+    def __init__(self, model_dir, device, backend):
+        self.model_dir = model_dir
+        self.device = device
+        self.backend = backend
+        self.model_types = {}
+        for model_id in process_model_list(embeddings_models):
+            self.model_types[model_id] = "embeddings"
+        for model_id in process_model_list(cross_encoder_models):
+            self.model_types[model_id] = "cross-encoder"
+
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def get(self, model_id):
+        if model_id not in self.model_types:
+            return None
+
+        model_config = self.models.get(model_id)
+        if model_config is not None:
+            return model_config
+
+        with self.lock:
+            model_config = self.models.get(model_id)
+            if model_config is None:
+                model_config = self._load(model_id)
+                self.models[model_id] = model_config
+
+        return model_config
+
+    def _load(self, model_id):
+        logger.info(f"Loading {model_id} with the {self.backend} backend")
+        model_type = self.model_types[model_id]
+        current_model_dir = os.path.join(self.model_dir, model_id)
+        if not os.path.isdir(current_model_dir):
+            # Single model deployments are extracted at the root of model_dir
+            current_model_dir = self.model_dir
+
+        tokenizer = AutoTokenizer.from_pretrained(current_model_dir)
+        if self.backend == "onnx":
+            model = load_onnx_model(current_model_dir, tokenizer, model_id, model_type)
+        else:
+            model = load_torch_model(current_model_dir, model_type)
+            model.to(self.device)
+
+        return {
+            "model": model,
+            "tokenizer": tokenizer,
         }
 
-        config[model_id] = model_config
+
+def model_fn(model_dir):
+    logger.info("model_fn")
+    if INFERENCE_BACKEND == "onnx":
+        device = torch.device("cpu")
+    else:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    config = ModelRegistry(model_dir, device, INFERENCE_BACKEND)
+    for model_id in process_model_list(
+        [value.strip() for value in WARMUP_MODELS.split(",") if value.strip()]
+    ):
+        config.get(model_id)
 
     return config
 
 
 def predict_fn(input_object, config):
     logger.info("predict_fn")
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    device = config.device
 
     current_model_id = input_object["model"].split("/")[-1]
     current_model_config = config.get(current_model_id)
@@ -105,24 +288,20 @@ def predict_fn(input_object, config):
             else:
                 current_input = "query: " + current_input
 
-        with torch.inference_mode():
-            encoded_input = current_tokenizer(
-                current_input,
-                padding=True,
-                truncation=True,
-                return_tensors="pt",
-            )
+        if not isinstance(current_input, list):
+            current_input = [current_input]
 
-            encoded_input = encoded_input.to(device)
+        def embed(encoded_input):
             model_output = current_model(**encoded_input)
-
             input_embeddings = mean_pooling(
                 model_output, encoded_input["attention_mask"]
             )
-
             input_embeddings = F.normalize(input_embeddings, p=2, dim=1)
-            response = input_embeddings.cpu().numpy()
-            ret_value = response.tolist()
+
+            return input_embeddings.cpu().numpy()
+
+        with torch.inference_mode():
+            ret_value = run_batched(current_tokenizer, current_input, embed, device)
 
             return ret_value
     elif input_object["type"] == "cross-encoder":
@@ -130,21 +309,26 @@ def predict_fn(input_object, config):
         passages = input_object["passages"]
         data = [[current_input, passage] for passage in passages]
 
-        with torch.inference_mode():
-            features = current_tokenizer(
-                data, padding=True, truncation=True, return_tensors="pt"
-            )
+        def score(features):
+            scores = current_model(**features).logits.cpu().numpy()
 
-            features = features.to(device)
+            return scores[:, -1] if scores.ndim == 2 else scores
 
-            scores = current_model(**features).logits.cpu().numpy()
-            ret_value = list(
-                map(
-                    lambda val: val[-1] if isinstance(val, list) else val,
-                    scores.tolist(),
-                )
-            )
+        with torch.inference_mode():
+            ret_value = run_batched(current_tokenizer, data, score, device)
 
             return ret_value
 
     return []
+
+
+def output_fn(prediction, accept):
+    prediction = np.asarray(prediction, dtype=np.float32)
+
+    if accept == NPY_CONTENT_TYPE:
+        buffer = io.BytesIO()
+        np.save(buffer, prediction.astype("<f4"), allow_pickle=False)
+
+        return buffer.getvalue()
+
+    return json.dumps(prediction.tolist())
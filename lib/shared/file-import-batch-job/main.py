@@ -1,10 +1,12 @@
 import os
+import codecs
 import boto3
 import genai_core.types
 import genai_core.chunks
 import genai_core.documents
 import genai_core.workspaces
 import genai_core.aurora.create
+from typing import Iterable
 from langchain_community.document_loaders import S3FileLoader
 
 WORKSPACE_ID = os.environ.get("WORKSPACE_ID")
@@ -13,6 +15,7 @@ INPUT_BUCKET_NAME = os.environ.get("INPUT_BUCKET_NAME")
 INPUT_OBJECT_KEY = os.environ.get("INPUT_OBJECT_KEY")
 PROCESSING_BUCKET_NAME = os.environ.get("PROCESSING_BUCKET_NAME")
 PROCESSING_OBJECT_KEY = os.environ.get("PROCESSING_OBJECT_KEY")
+READ_BLOCK_SIZE = 1024 * 1024
 
 s3_client = boto3.client("s3")
 
@@ -39,35 +42,59 @@ def main():
     try:
         extension = os.path.splitext(INPUT_OBJECT_KEY)[-1].lower()
         if extension == ".txt":
+            # Streamed, so memory does not grow with the size of the file
+            if _copy_to_processing_bucket():
+                s3_client.copy(
+                    {"Bucket": INPUT_BUCKET_NAME, "Key": INPUT_OBJECT_KEY},
+                    PROCESSING_BUCKET_NAME,
+                    PROCESSING_OBJECT_KEY,
+                )
+
             object = s3_client.get_object(
                 Bucket=INPUT_BUCKET_NAME, Key=INPUT_OBJECT_KEY
             )
-            content = object["Body"].read().decode("utf-8")
+            chunks = genai_core.chunks.split_content_stream(
+                workspace, _iter_text_blocks(object["Body"])
+            )
         else:
             loader = S3FileLoader(INPUT_BUCKET_NAME, INPUT_OBJECT_KEY)
             print(f"loader: {loader}")
             docs = loader.load()
             content = docs[0].page_content
 
-        if (
-            INPUT_BUCKET_NAME != PROCESSING_BUCKET_NAME
-            and INPUT_OBJECT_KEY != PROCESSING_OBJECT_KEY
-        ):
-            s3_client.put_object(
-                Bucket=PROCESSING_BUCKET_NAME, Key=PROCESSING_OBJECT_KEY, Body=content
-            )
+            if _copy_to_processing_bucket():
+                s3_client.put_object(
+                    Bucket=PROCESSING_BUCKET_NAME,
+                    Key=PROCESSING_OBJECT_KEY,
+                    Body=content,
+                )
+
+            chunks = genai_core.chunks.split_content(workspace, content)
 
-        add_chunks(workspace, document, content)
+        add_chunks(workspace, document, chunks)
     except Exception as error:
         genai_core.documents.set_status(WORKSPACE_ID, DOCUMENT_ID, "error")
         print(error)
         raise error
 
 
-def add_chunks(workspace: dict, document: dict, content: str):
-    chunks = genai_core.chunks.split_content(workspace, content)
+def _copy_to_processing_bucket():
+    return (
+        INPUT_BUCKET_NAME != PROCESSING_BUCKET_NAME
+        and INPUT_OBJECT_KEY != PROCESSING_OBJECT_KEY
+    )
+
+
+def _iter_text_blocks(body):
+    # Multi-byte characters can span two blocks, the decoder keeps the bytes
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for block in body.iter_chunks(chunk_size=READ_BLOCK_SIZE):
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
 
-    genai_core.chunks.add_chunks(
+def add_chunks(workspace: dict, document: dict, chunks: Iterable[str]):
+    result = genai_core.chunks.add_chunks_pipelined(
         workspace=workspace,
         document=document,
         document_sub_id=None,
@@ -75,6 +102,8 @@ def add_chunks(workspace: dict, document: dict, content: str):
         chunk_complements=None,
         replace=True,
     )
+    if result["skipped_chunks"]:
+        print(f"Skipped {result['skipped_chunks']} near-duplicate chunks")
 
 
 if __name__ == "__main__":
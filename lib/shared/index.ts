@@ -11,6 +11,7 @@ import * as path from "path";
 import { Layer } from "../layer";
 import { SupportedBedrockRegion, SystemConfig } from "./types";
 import { SharedAssetBundler } from "./shared-asset-bundler";
+import { Utils } from "./utils";
 import { NagSuppressions } from "cdk-nag";
 import { getConstructId } from "../utils";
 
@@ -36,6 +37,7 @@ export class Shared extends Construct {
   readonly apiKeysSecret: secretsmanager.Secret;
   readonly commonLayer: lambda.ILayerVersion;
   readonly powerToolsLayer: lambda.ILayerVersion;
+  readonly localEmbeddingsLayer?: lambda.ILayerVersion;
   readonly sharedCode: SharedAssetBundler;
   readonly s3vpcEndpoint: ec2.InterfaceVpcEndpoint;
   readonly webACLRules: wafv2.CfnWebACL.RuleProperty[] = [];
@@ -288,6 +290,18 @@ export class Shared extends Construct {
       path: path.join(__dirname, "./layers/common"),
     });
 
+    // ONNX Runtime is too large for the common layer, it is only deployed
+    // when an embeddings model with the "local" provider is configured
+    if (Utils.hasLocalEmbeddingsModels(props.config)) {
+      const localEmbeddingsLayer = new Layer(this, "LocalEmbeddingsLayer", {
+        runtime: pythonRuntime,
+        architecture: lambdaArchitecture,
+        path: path.join(__dirname, "./layers/local-embeddings"),
+      });
+
+      this.localEmbeddingsLayer = localEmbeddingsLayer.layer;
+    }
+
     this.sharedCode = new SharedAssetBundler(this, "genai-core", [
       path.join(__dirname, "layers", "python-sdk", "python", "genai_core"),
     ]);
@@ -1,6 +1,30 @@
+import io
+import uuid
+import struct
+import numpy as np
+import genai_core.quantization
 from psycopg2 import sql
 from typing import List, Optional
 from genai_core.aurora.connection import AuroraConnection
+from genai_core.types import VectorPrecision
+
+
+COPY_COLUMNS = [
+    "chunk_id",
+    "workspace_id",
+    "document_id",
+    "document_sub_id",
+    "document_type",
+    "document_sub_type",
+    "path",
+    "language",
+    "title",
+    "content",
+    "content_complement",
+    "content_embeddings",
+]
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
 
 
 def add_chunks_aurora(
@@ -16,10 +40,46 @@ def add_chunks_aurora(
     chunks: List[str],
     chunk_complements: List[str],
     replace: bool,
+    vector_precision: str = VectorPrecision.FLOAT32.value,
+    full_precision: bool = False,
+    chunk_languages: Optional[List[str]] = None,
 ):
     table_name = sql.Identifier(workspace_id.replace("-", ""))
     complements_len = len(chunk_complements) if chunk_complements else 0
     removed_vectors = 0
+    columns = COPY_COLUMNS
+    if full_precision:
+        # Rescoring reads the float32 embeddings next to the quantized ones
+        columns = columns + [genai_core.quantization.FULL_PRECISION_FIELD]
+
+    # One binary COPY for all rows instead of an INSERT round trip per chunk
+    data = io.BytesIO()
+    data.write(COPY_HEADER)
+    for idx in range(len(chunk_ids)):
+        content_complement = chunk_complements[idx] if idx < complements_len else None
+        language = chunk_languages[idx] if chunk_languages else None
+
+        fields = [
+            _encode_uuid(chunk_ids[idx]),
+            _encode_uuid(workspace_id),
+            _encode_uuid(document_id),
+            _encode_uuid(document_sub_id),
+            _encode_text(document_type),
+            _encode_text(document_sub_type),
+            _encode_text(path),
+            _encode_text(language),
+            _encode_text(title),
+            _encode_text(chunks[idx]),
+            _encode_text(content_complement),
+            _encode_vector(chunk_embeddings[idx], vector_precision),
+        ]
+        if full_precision:
+            fields.append(
+                _encode_vector(chunk_embeddings[idx], VectorPrecision.FLOAT32.value)
+            )
+        data.write(_encode_copy_row(fields))
+    data.write(COPY_TRAILER)
+    data.seek(0)
 
     with AuroraConnection(autocommit=False) as cursor:
         if replace:
@@ -33,44 +93,15 @@ def add_chunks_aurora(
 
             removed_vectors = cursor.rowcount
 
-        for idx in range(len(chunk_ids)):
-            chunk_id = chunk_ids[idx]
-            content = chunks[idx]
-            content_complement = (
-                chunk_complements[idx] if idx < complements_len else None
-            )
-
-            cursor.execute(
-                sql.SQL(
-                    """INSERT INTO {table} (
-                        chunk_id,
-                        workspace_id,
-                        document_id,
-                        document_sub_id,
-                        document_type,
-                        document_sub_type,
-                        path,
-                        title,
-                        content,
-                        content_complement,
-                        content_embeddings
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,%s
-                    );"""
-                ).format(table=table_name),
-                [
-                    chunk_id,
-                    workspace_id,
-                    document_id,
-                    document_sub_id,
-                    document_type,
-                    document_sub_type,
-                    path,
-                    title,
-                    content,
-                    content_complement,
-                    chunk_embeddings[idx],
-                ],
+        if len(chunk_ids) > 0:
+            cursor.copy_expert(
+                sql.SQL("COPY {table} ({columns}) FROM STDIN WITH (FORMAT binary);")
+                .format(
+                    table=table_name,
+                    columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+                )
+                .as_string(cursor),
+                data,
             )
 
         cursor.connection.commit()
@@ -78,13 +109,76 @@ def add_chunks_aurora(
     return {"removed_vectors": removed_vectors, "added_vectors": len(chunk_ids)}
 
 
-def clean_chunks_aurora(workspace_id: str, document_id: str):
+def _encode_copy_row(fields: List[Optional[bytes]]) -> bytes:
+    row = [struct.pack(">h", len(fields))]
+    for field in fields:
+        if field is None:
+            row.append(struct.pack(">i", -1))
+        else:
+            row.append(struct.pack(">i", len(field)))
+            row.append(field)
+
+    return b"".join(row)
+
+
+def _encode_uuid(value) -> Optional[bytes]:
+    if value is None:
+        return None
+
+    return uuid.UUID(str(value)).bytes
+
+
+def _encode_text(value: Optional[str]) -> Optional[bytes]:
+    if value is None:
+        return None
+
+    return value.encode("utf-8")
+
+
+def _encode_vector(embedding, vector_precision: str) -> bytes:
+    """
+    Binary input format of the column type: vector and halfvec are a 16 bit
+    dimension, 16 unused bits and big endian float32 or float16 values, bit
+    is a 32 bit length followed by the packed bits.
+    """
+    values = np.asarray(embedding, dtype=np.float32)
+
+    if vector_precision == VectorPrecision.FLOAT16.value:
+        header = struct.pack(">HH", len(values), 0)
+        return header + values.astype(">f2").tobytes()
+    elif vector_precision == VectorPrecision.BINARY.value:
+        bits = genai_core.quantization.quantize_binary_packed([values])[0]
+        return struct.pack(">i", len(values)) + np.asarray(bits, np.int8).tobytes()
+
+    return struct.pack(">HH", len(values), 0) + values.astype(">f4").tobytes()
+
+
+def clean_chunks_aurora(
+    workspace_id: str, document_id: str, keep_chunk_ids: Optional[List[str]] = None
+):
     table_name = sql.Identifier(workspace_id.replace("-", ""))
+    keep_chunk_ids = [str(chunk_id) for chunk_id in keep_chunk_ids or []]
     with AuroraConnection() as cursor:
         cursor.execute(
             sql.SQL(
                 """DELETE FROM {table} WHERE
-                    workspace_id = %s AND document_id = %s;"""
+                    workspace_id = %s AND document_id = %s
+                    AND NOT (chunk_id = ANY(%s::uuid[]));"""
             ).format(table=table_name),
-            [workspace_id, document_id],
+            [workspace_id, document_id, keep_chunk_ids],
         )
+
+        return cursor.rowcount
+
+
+def delete_chunks_aurora(workspace_id: str, chunk_ids: List[str]):
+    table_name = sql.Identifier(workspace_id.replace("-", ""))
+    with AuroraConnection() as cursor:
+        cursor.execute(
+            sql.SQL("DELETE FROM {table} WHERE chunk_id = ANY(%s::uuid[]);").format(
+                table=table_name
+            ),
+            [[str(chunk_id) for chunk_id in chunk_ids]],
+        )
+
+        return cursor.rowcount
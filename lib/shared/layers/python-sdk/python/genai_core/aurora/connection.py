@@ -1,65 +1,256 @@
 import os
+import time
+import threading
 import boto3
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
 from datetime import datetime, timedelta
+from typing import Optional
+from aws_lambda_powertools import Logger
 from pgvector.psycopg2 import register_vector
+from genai_core.types import ReadConsistency
 
 client = boto3.client("rds")
+logger = Logger()
 
 AURORA_DB_USER = os.environ.get("AURORA_DB_USER")
 AURORA_DB_HOST = os.environ.get("AURORA_DB_HOST")
+# Reads go to the writer when there is no reader endpoint
+AURORA_DB_READER_HOST = os.environ.get("AURORA_DB_READER_HOST")
 AURORA_DB_PORT = os.environ.get("AURORA_DB_PORT")
 AURORA_DB_REGION = os.environ.get("AWS_REGION")
+# One warm connection per Lambda environment, batch jobs set a larger pool
+AURORA_POOL_SIZE = int(os.environ.get("AURORA_POOL_SIZE", "1"))
+AURORA_READER_POOL_SIZE = int(
+    os.environ.get("AURORA_READER_POOL_SIZE", str(AURORA_POOL_SIZE))
+)
+# Replicas apply the writer changes with a lag. With read_your_writes, the
+# reads of a workspace updated in the last AURORA_READER_MAX_LAG_SECONDS,
+# for instance while a document is ingested, use the writer
+AURORA_READ_CONSISTENCY = os.environ.get(
+    "AURORA_READ_CONSISTENCY", ReadConsistency.READ_YOUR_WRITES.value
+)
+AURORA_READER_MAX_LAG_SECONDS = int(
+    os.environ.get("AURORA_READER_MAX_LAG_SECONDS", "60")
+)
+# Idle connections are checked with a round trip before they are reused
+AURORA_POOL_CHECK_IDLE_SECONDS = 60
+AURORA_POOL_WAIT_SECONDS = 30
+
+psycopg2.extras.register_uuid()
 
 
 class AuroraConnection(object):
-    token = None
-    token_refresh = datetime.now() - timedelta(minutes=1)
-
-    def __init__(self, autocommit=True):
-        now = datetime.now()
-        if AuroraConnection.token_refresh < now:
-            AuroraConnection.token_refresh = now + timedelta(
-                minutes=10
-            )  # Expires after 15 min
-            # Base on
-            # https://docs.aws.amazon.com/AmazonRDS/latest/UserGuide/UsingWithRDS.IAMDBAuth.Connecting.Python.html
-            AuroraConnection.token = client.generate_db_auth_token(
-                DBHostname=AURORA_DB_HOST,
-                Port=AURORA_DB_PORT,
-                DBUsername=AURORA_DB_USER,
-                Region=AURORA_DB_REGION,
-            )
+    # Tokens are signed for the endpoint host
+    tokens = {}
+    token_lock = threading.Lock()
+
+    def __init__(self, autocommit=True, reader=False):
         self.autocommit = autocommit
+        self.reader = reader and bool(AURORA_DB_READER_HOST)
+        self.pool = None
+        self.connection = None
+        self.cursor = None
+        self.started = None
+
+    @classmethod
+    def get_token(cls, host: Optional[str] = None):
+        host = host or AURORA_DB_HOST
+        with cls.token_lock:
+            now = datetime.now()
+            token, token_refresh = cls.tokens.get(host, (None, now))
+            if token is None or token_refresh < now:
+                # Base on
+                # https://docs.aws.amazon.com/AmazonRDS/latest/UserGuide/UsingWithRDS.IAMDBAuth.Connecting.Python.html
+                token = client.generate_db_auth_token(
+                    DBHostname=host,
+                    Port=AURORA_DB_PORT,
+                    DBUsername=AURORA_DB_USER,
+                    Region=AURORA_DB_REGION,
+                )
+                # Expires after 15 min
+                cls.tokens[host] = (token, now + timedelta(minutes=10))
 
-        self.dbhost = AURORA_DB_HOST
-        self.dbport = AURORA_DB_PORT
-        self.dbuser = AURORA_DB_USER
-        self.dbpass = AuroraConnection.token
+            if token is None:
+                raise ValueError("Token is not set.")
 
-        if AuroraConnection.token is None:
-            raise ValueError("Token is not set.")
+            return token
 
     def __enter__(self):
-        connection = psycopg2.connect(
-            database="postgres",
-            host=self.dbhost,
-            user=self.dbuser,
-            password=self.dbpass,
-            port=self.dbport,
-            connect_timeout=10,
-        )
+        self.started = time.perf_counter()
+        self.pool = _reader_pool if self.reader else _pool
+        connection = self.pool.acquire()
+        try:
+            connection.autocommit = self.autocommit
+            cursor = connection.cursor()
+        except Exception:
+            self.pool.release(connection, discard=True)
+            raise
 
-        connection.set_session(autocommit=self.autocommit)
-        psycopg2.extras.register_uuid()
-        register_vector(connection)
-        cursor = connection.cursor()
         self.connection = connection
         self.cursor = cursor
 
         return cursor
 
-    def __exit__(self, *args):
-        self.cursor.close()
-        self.connection.close()
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection = self.connection
+        self.connection = None
+
+        discard = isinstance(
+            exc_value, (psycopg2.OperationalError, psycopg2.InterfaceError)
+        )
+        try:
+            self.cursor.close()
+            if (
+                not connection.closed
+                and connection.info.transaction_status
+                != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+            ):
+                # Same as closing the connection, uncommitted work is dropped
+                connection.rollback()
+        except psycopg2.Error:
+            discard = True
+
+        self.pool.release(connection, discard=discard)
+
+        logger.info(
+            "Aurora Metric",
+            metric_type="aurora_latency",
+            endpoint="reader" if self.reader else "writer",
+            value=round((time.perf_counter() - self.started) * 1000, 1),
+            error=exc_type is not None,
+        )
+
+
+class AuroraConnectionPool(object):
+    """
+    Process wide pool of Aurora connections that survives across warm Lambda
+    invocations. Connections are opened on demand up to max_size, new ones
+    use a fresh IAM token, and stale ones are replaced when they are reused.
+    """
+
+    def __init__(self, max_size: int, host: Optional[str] = None):
+        self.max_size = max_size
+        self.host = host or AURORA_DB_HOST
+        self.idle = []
+        self.size = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        deadline = time.monotonic() + AURORA_POOL_WAIT_SECONDS
+        with self.condition:
+            while not self.idle and self.size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.condition.wait(remaining):
+                    raise TimeoutError("No Aurora connection available")
+
+            if self.idle:
+                connection, released_at = self.idle.pop()
+            else:
+                connection, released_at = None, None
+                self.size += 1
+
+        if connection is not None and _is_usable(connection, released_at):
+            return connection
+
+        if connection is not None:
+            _close(connection)
+
+        try:
+            return _connect(self.host)
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, connection, discard: bool = False):
+        if discard or connection.closed:
+            _close(connection)
+
+        with self.condition:
+            if discard or connection.closed:
+                self.size -= 1
+            else:
+                self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            idle = self.idle
+            self.idle = []
+            self.size -= len(idle)
+
+        for connection, _ in idle:
+            _close(connection)
+
+
+def use_reader(workspace: dict) -> bool:
+    """
+    Whether reads of the workspace can use the reader endpoint under the
+    AURORA_READ_CONSISTENCY policy.
+    """
+    if not AURORA_DB_READER_HOST:
+        return False
+    if AURORA_READ_CONSISTENCY == ReadConsistency.STRONG.value:
+        return False
+    if AURORA_READ_CONSISTENCY == ReadConsistency.EVENTUAL.value:
+        return True
+
+    updated_at = workspace.get("updated_at")
+    if not updated_at:
+        return True
+
+    updated = datetime.strptime(updated_at, "%Y-%m-%dT%H:%M:%S.%fZ")
+    lag = timedelta(seconds=AURORA_READER_MAX_LAG_SECONDS)
+
+    return datetime.utcnow() - updated > lag
+
+
+def _connect(host: str):
+    connection = _open_connection(host)
+    # The type lookups must not leave a transaction open on the new connection
+    connection.autocommit = True
+    register_vector(connection)
+
+    return connection
+
+
+def _open_connection(host: str):
+    return psycopg2.connect(
+        database="postgres",
+        host=host,
+        user=AURORA_DB_USER,
+        password=AuroraConnection.get_token(host),
+        port=AURORA_DB_PORT,
+        connect_timeout=10,
+        keepalives=1,
+        keepalives_idle=30,
+    )
+
+
+def _is_usable(connection, released_at: float) -> bool:
+    if connection.closed:
+        return False
+    if time.monotonic() - released_at < AURORA_POOL_CHECK_IDLE_SECONDS:
+        return True
+
+    try:
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1;")
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _close(connection):
+    try:
+        connection.close()
+    except psycopg2.Error:
+        pass
+
+
+_pool = AuroraConnectionPool(AURORA_POOL_SIZE)
+_reader_pool = AuroraConnectionPool(AURORA_READER_POOL_SIZE, AURORA_DB_READER_HOST)
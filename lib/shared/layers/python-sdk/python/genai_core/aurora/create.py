@@ -1,11 +1,76 @@
+import math
+from typing import Optional, Tuple
+import genai_core.quantization
+import genai_core.utils.language
 from aws_lambda_powertools import Logger
 from psycopg2 import sql
 from genai_core.aurora.connection import AuroraConnection
+from genai_core.types import TableLayout, VectorIndexType, VectorPrecision
 
 logger = Logger()
 
+# pgvector defaults, HNSW recall is tuned per query with ef_search
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 40
+# The index is built on the empty table, the maintenance job resizes it
+IVFFLAT_LISTS = 100
+IVFFLAT_MIN_LISTS = 10
+# Partitions are scanned exactly below this size, the maintenance job builds
+# their vector index once they reach it
+PARTITION_INDEX_MIN_ROWS = 10000
+
+# Text search configurations the workspaces can select
+TEXT_SEARCH_LANGUAGES = ["simple", *sorted(genai_core.utils.language.LANGUAGE_PROFILES)]
+# Stored tsvector of the partitioned layout, in the language of each row
+PARTITION_TSVECTOR_COLUMN = "content_tsv"
+
+TABLE_COLUMNS = """chunk_id UUID NOT NULL,
+    workspace_id UUID NOT NULL,
+    document_id UUID,
+    document_sub_id UUID,
+    document_type VARCHAR(50),
+    document_sub_type VARCHAR(50),
+    path TEXT,
+    language VARCHAR(15),
+    title TEXT,
+    content TEXT,
+    content_complement TEXT,
+    content_embeddings {vector_type}(%s),
+    metadata JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"""
+
+VECTOR_COLUMN_TYPES = {
+    VectorPrecision.FLOAT32.value: "vector",
+    VectorPrecision.FLOAT16.value: "halfvec",
+    VectorPrecision.BINARY.value: "bit",
+}
+
+VECTOR_INDEX_OPS = {
+    VectorPrecision.FLOAT32.value: {
+        "cosine": "vector_cosine_ops",
+        "l2": "vector_l2_ops",
+        "inner": "vector_ip_ops",
+    },
+    VectorPrecision.FLOAT16.value: {
+        "cosine": "halfvec_cosine_ops",
+        "l2": "halfvec_l2_ops",
+        "inner": "halfvec_ip_ops",
+    },
+    # Binary quantized vectors are always searched by hamming distance
+    VectorPrecision.BINARY.value: {
+        "cosine": "bit_hamming_ops",
+        "l2": "bit_hamming_ops",
+        "inner": "bit_hamming_ops",
+    },
+}
+
 
 def create_workspace_table(workspace: dict):
+    if get_table_layout(workspace) == TableLayout.PARTITIONED.value:
+        create_workspace_partition(workspace)
+        return
+
     workspace_id = workspace["workspace_id"]
     table_name = sql.Identifier(workspace_id.replace("-", ""))
 
@@ -14,28 +79,22 @@ def create_workspace_table(workspace: dict):
     languages = workspace["languages"]
     has_index = workspace["has_index"]
     metric = workspace["metric"]
+    vector_precision = genai_core.quantization.get_vector_precision(workspace)
+    vector_type = sql.SQL(VECTOR_COLUMN_TYPES[vector_precision])
+    full_precision = genai_core.quantization.is_rescored(workspace)
 
     with AuroraConnection(autocommit=False) as cursor:
         cursor.execute(
             sql.SQL(
-                """CREATE TABLE {table} (
-                    chunk_id UUID PRIMARY KEY,
-                    workspace_id UUID,
-                    document_id UUID,
-                    document_sub_id UUID,
-                    document_type VARCHAR(50),
-                    document_sub_type VARCHAR(50),
-                    path TEXT,
-                    language VARCHAR(15),
-                    title TEXT,
-                    content TEXT,
-                    content_complement TEXT,
-                    content_embeddings vector(%s),
-                    metadata JSONB,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );"""
-            ).format(table=table_name),
-            [embeddings_model_dimensions],
+                "CREATE TABLE {table} ("
+                + TABLE_COLUMNS
+                + "{full_precision}, PRIMARY KEY (chunk_id));"
+            ).format(
+                table=table_name,
+                vector_type=vector_type,
+                full_precision=_get_full_precision_column(full_precision),
+            ),
+            [embeddings_model_dimensions] * (2 if full_precision else 1),
         )
 
         cursor.execute(
@@ -50,35 +109,206 @@ def create_workspace_table(workspace: dict):
 
         if hybrid_search:
             for language in languages:
+                add_tsvector_column(cursor, table_name, language)
                 cursor.execute(
                     sql.SQL(
-                        "CREATE INDEX ON {table} USING "
-                        + " GIN (to_tsvector('{language}', content));"
-                    ).format(table=table_name, language=sql.Identifier(language))
+                        "CREATE INDEX ON {table} USING GIN ({column}) "
+                        + "WHERE {condition};"
+                    ).format(
+                        table=table_name,
+                        column=get_tsvector_column(language),
+                        condition=get_language_condition(language),
+                    )
                 )
 
-        if has_index:
-            if metric == "cosine":
-                cursor.execute(
-                    sql.SQL(
-                        "CREATE INDEX ON {table} USING ivfflat "
-                        + "(content_embeddings vector_cosine_ops) WITH (lists = 100);"
-                    ).format(table=table_name)
+        if has_index and VECTOR_INDEX_OPS[vector_precision].get(metric):
+            cursor.execute(*get_vector_index_statement(workspace, table_name))
+
+        cursor.connection.commit()
+        logger.info("Created workspace table")
+
+
+def create_workspace_partition(workspace: dict):
+    """
+    The partitioned layout keeps many small workspaces in one table per vector
+    type and dimensions, list partitioned on the workspace id. Partitions are
+    named like the workspace tables and get the text and document indexes of
+    the shared table, their vector index is built by the maintenance job.
+    """
+    workspace_id = workspace["workspace_id"]
+    partition_name = sql.Identifier(workspace_id.replace("-", ""))
+    table = get_partitioned_table(workspace)
+    table_name = sql.Identifier(table)
+    vector_precision = genai_core.quantization.get_vector_precision(workspace)
+    vector_type = sql.SQL(VECTOR_COLUMN_TYPES[vector_precision])
+    # Quantized workspaces with and without rescoring share the table
+    full_precision = genai_core.quantization.is_quantized(workspace)
+    dimensions = workspace["embeddings_model_dimensions"]
+
+    with AuroraConnection(autocommit=False) as cursor:
+        # Serializes the workspaces creating the same shared table
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", [table])
+        cursor.execute("SELECT to_regclass(quote_ident(%s));", [table])
+        if cursor.fetchone()[0] is None:
+            cursor.execute(
+                sql.SQL(
+                    "CREATE TABLE {table} ("
+                    + TABLE_COLUMNS
+                    + "{full_precision}"
+                    + ", {column} tsvector GENERATED ALWAYS AS ({tsvector}) STORED"
+                    + ", PRIMARY KEY (chunk_id, workspace_id)"
+                    + ") PARTITION BY LIST (workspace_id);"
+                ).format(
+                    table=table_name,
+                    vector_type=vector_type,
+                    full_precision=_get_full_precision_column(full_precision),
+                    column=sql.Identifier(PARTITION_TSVECTOR_COLUMN),
+                    tsvector=_get_partition_tsvector(),
+                ),
+                [dimensions] * (2 if full_precision else 1),
+            )
+            cursor.execute(
+                sql.SQL("CREATE INDEX ON {table} (document_id);").format(
+                    table=table_name
                 )
-            elif metric == "l2":
-                cursor.execute(
-                    sql.SQL(
-                        "CREATE INDEX ON {table} USING ivfflat "
-                        + "(content_embeddings vector_l2_ops) WITH (lists = 100);"
-                    ).format(table=table_name)
+            )
+            cursor.execute(
+                sql.SQL("CREATE INDEX ON {table} (document_sub_id);").format(
+                    table=table_name
                 )
-            elif metric == "inner":
-                cursor.execute(
-                    sql.SQL(
-                        "CREATE INDEX ON {table} USING ivfflat "
-                        + "(content_embeddings vector_ip_ops) WITH (lists = 100);"
-                    ).format(table=table_name)
+            )
+            cursor.execute(
+                sql.SQL("CREATE INDEX ON {table} USING GIN ({column});").format(
+                    table=table_name, column=sql.Identifier(PARTITION_TSVECTOR_COLUMN)
                 )
+            )
+            logger.info("Created partitioned table", table=table)
+
+        cursor.execute(
+            sql.SQL(
+                "CREATE TABLE {partition} PARTITION OF {table} "
+                + "FOR VALUES IN ({workspace_id});"
+            ).format(
+                partition=partition_name,
+                table=table_name,
+                workspace_id=sql.Literal(workspace_id),
+            )
+        )
 
         cursor.connection.commit()
-        logger.info("Created workspace table")
+        logger.info("Created workspace partition", table=table)
+
+
+def get_vector_index_statement(
+    workspace: dict,
+    table_name: sql.Identifier,
+    lists: int = IVFFLAT_LISTS,
+    index_name: Optional[sql.Identifier] = None,
+) -> Tuple[sql.Composable, list]:
+    """
+    Statement and parameters creating the vector index of the workspace, named
+    indexes are built concurrently.
+    """
+    vector_precision = genai_core.quantization.get_vector_precision(workspace)
+    index_ops = sql.SQL(VECTOR_INDEX_OPS[vector_precision][workspace["metric"]])
+    create = sql.SQL("CREATE INDEX")
+    if index_name is not None:
+        create = sql.SQL("CREATE INDEX CONCURRENTLY {index}").format(index=index_name)
+
+    if get_index_type(workspace) == VectorIndexType.HNSW.value:
+        statement = sql.SQL(
+            "{create} ON {table} USING hnsw (content_embeddings {index_ops}) "
+            + "WITH (m = %s, ef_construction = %s);"
+        )
+        params = [
+            int(workspace.get("hnsw_m") or HNSW_M),
+            int(workspace.get("hnsw_ef_construction") or HNSW_EF_CONSTRUCTION),
+        ]
+    else:
+        statement = sql.SQL(
+            "{create} ON {table} USING ivfflat (content_embeddings {index_ops}) "
+            + "WITH (lists = %s);"
+        )
+        params = [lists]
+
+    return (
+        statement.format(create=create, table=table_name, index_ops=index_ops),
+        params,
+    )
+
+
+def get_table_layout(workspace: dict) -> str:
+    return workspace.get("table_layout") or TableLayout.TABLE.value
+
+
+def get_partitioned_table(workspace: dict) -> str:
+    vector_precision = genai_core.quantization.get_vector_precision(workspace)
+    vector_type = VECTOR_COLUMN_TYPES[vector_precision]
+    dimensions = int(workspace["embeddings_model_dimensions"])
+
+    return f"workspaces_{vector_type}_{dimensions}"
+
+
+def _get_full_precision_column(enabled: bool) -> sql.Composable:
+    # Not indexed, rescoring reads it for the candidates of the quantized index
+    if not enabled:
+        return sql.SQL("")
+
+    return sql.SQL(", {column} vector(%s)").format(
+        column=sql.Identifier(genai_core.quantization.FULL_PRECISION_FIELD)
+    )
+
+
+def _get_partition_tsvector() -> sql.Composable:
+    # The configuration must be a constant for the column to be generated
+    return sql.SQL("CASE language {cases} END").format(
+        cases=sql.SQL(" ").join(
+            sql.SQL(
+                "WHEN {language} THEN to_tsvector({language}::regconfig, content)"
+            ).format(language=sql.Literal(language))
+            for language in TEXT_SEARCH_LANGUAGES
+        )
+    )
+
+
+def get_tsvector_column(language: str) -> sql.Identifier:
+    return sql.Identifier(f"content_tsv_{language}")
+
+
+def get_language_condition(language: str) -> sql.Composable:
+    # Rows written before languages were detected belong to every language
+    return sql.SQL("(language IS NULL OR language = {language})").format(
+        language=sql.Literal(language)
+    )
+
+
+def add_tsvector_column(cursor, table_name: sql.Identifier, language: str):
+    # Computed once when the row is written, for the rows of the language only
+    cursor.execute(
+        sql.SQL(
+            "ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} tsvector "
+            + "GENERATED ALWAYS AS (CASE WHEN {condition} "
+            + "THEN to_tsvector({config}::regconfig, content) END) STORED;"
+        ).format(
+            table=table_name,
+            column=get_tsvector_column(language),
+            condition=get_language_condition(language),
+            config=sql.Literal(language),
+        )
+    )
+
+
+def get_index_type(workspace: dict) -> str:
+    return workspace.get("index_type") or VectorIndexType.IVFFLAT.value
+
+
+def get_ivfflat_lists(rows: int) -> int:
+    # pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) above
+    if rows > 1000000:
+        return int(math.sqrt(rows))
+
+    return max(IVFFLAT_MIN_LISTS, rows // 1000)
+
+
+def get_ivfflat_probes(lists: int) -> int:
+    return max(1, math.ceil(math.sqrt(lists)))
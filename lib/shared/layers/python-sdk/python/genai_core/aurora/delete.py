@@ -2,6 +2,7 @@ import os
 from aws_lambda_powertools import Logger
 import boto3
 from botocore.exceptions import BotoCoreError, ClientError
+import genai_core.dedup
 import genai_core.utils.delete_files_with_prefix
 import genai_core.utils.delete_files_with_object_key
 import genai_core.types
@@ -98,6 +99,7 @@ def delete_aurora_document(workspace_id: str, document: dict):
     )
 
     deleteAuroraDocument(document_id, table_name)
+    genai_core.dedup.remove_document(workspace_id, document_id)
 
     documents_table = dynamodb.Table(DOCUMENTS_TABLE_NAME)
     workspaces_table = dynamodb.Table(WORKSPACES_TABLE_NAME)
@@ -0,0 +1,366 @@
+from typing import List, Optional
+
+import psycopg2
+import genai_core.quantization
+from aws_lambda_powertools import Logger
+from psycopg2 import sql
+from genai_core.aurora.connection import AuroraConnection
+from genai_core.aurora.create import (
+    PARTITION_INDEX_MIN_ROWS,
+    VECTOR_INDEX_OPS,
+    get_index_type,
+    get_ivfflat_lists,
+    get_language_condition,
+    get_table_layout,
+    get_tsvector_column,
+    get_vector_index_statement,
+)
+from genai_core.types import TableLayout, VectorIndexType
+
+logger = Logger()
+
+# Rebuilt once the lists or the row count drift this far from the build
+IVFFLAT_REBUILD_FACTOR = 2
+# Rows of a migrated table given their tsvector per UPDATE
+TSVECTOR_BACKFILL_BATCH_SIZE = 1000
+NIL_UUID = "00000000-0000-0000-0000-000000000000"
+
+
+def needs_ivfflat_rebuild(
+    current_lists: int, lists: int, built_rows: int, rows: int
+) -> bool:
+    if rows == 0:
+        return False
+    if rows >= IVFFLAT_REBUILD_FACTOR * built_rows:
+        return True
+
+    return max(lists / current_lists, current_lists / lists) >= IVFFLAT_REBUILD_FACTOR
+
+
+def rebuild_ivfflat_index(workspace: dict) -> Optional[dict]:
+    """
+    IVF centroids are trained on the rows present when the index is built, the
+    first index is built on the empty table. The index is rebuilt with lists
+    sized to the row count and swapped in, searches keep using the previous
+    one meanwhile.
+    """
+    if not workspace.get("has_index"):
+        return None
+    if get_index_type(workspace) != VectorIndexType.IVFFLAT.value:
+        return None
+
+    workspace_id = workspace["workspace_id"]
+    table = workspace_id.replace("-", "")
+    table_name = sql.Identifier(table)
+    rebuild_name = sql.Identifier(f"{table}_embeddings_rebuild")
+    vector_precision = genai_core.quantization.get_vector_precision(workspace)
+    index_ops = VECTOR_INDEX_OPS[vector_precision].get(workspace["metric"])
+
+    # Index builds run concurrently, which is not allowed in a transaction
+    with AuroraConnection() as cursor:
+        # Left invalid by a build that did not complete
+        cursor.execute(
+            sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {index};").format(
+                index=rebuild_name
+            )
+        )
+
+        cursor.execute(
+            """SELECT c.relname, c.reloptions
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_am a ON a.oid = c.relam
+            WHERE i.indrelid = quote_ident(%s)::regclass AND a.amname = 'ivfflat';""",
+            [table],
+        )
+        index = cursor.fetchone()
+        if index is None:
+            return None
+
+        index_name, options = index
+        cursor.execute(
+            sql.SQL("SELECT COUNT(*) FROM {table};").format(table=table_name)
+        )
+        rows = cursor.fetchone()[0]
+        current_lists = _get_lists(options)
+        lists = get_ivfflat_lists(rows)
+        built_rows = int(workspace.get("ivfflat_rows") or 0)
+
+        if not needs_ivfflat_rebuild(current_lists, lists, built_rows, rows):
+            return None
+
+        logger.info(
+            "Rebuilding IVF index",
+            workspace_id=workspace_id,
+            rows=rows,
+            current_lists=current_lists,
+            lists=lists,
+        )
+
+        try:
+            cursor.execute(
+                sql.SQL(
+                    "CREATE INDEX CONCURRENTLY {index} ON {table} USING ivfflat "
+                    + "(content_embeddings {index_ops}) WITH (lists = %s);"
+                ).format(
+                    index=rebuild_name,
+                    table=table_name,
+                    index_ops=sql.SQL(index_ops),
+                ),
+                [lists],
+            )
+        except psycopg2.Error:
+            cursor.execute(
+                sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {index};").format(
+                    index=rebuild_name
+                )
+            )
+            raise
+
+        cursor.execute(
+            sql.SQL("DROP INDEX CONCURRENTLY {index};").format(
+                index=sql.Identifier(index_name)
+            )
+        )
+        cursor.execute(
+            sql.SQL("ALTER INDEX {rebuild} RENAME TO {index};").format(
+                rebuild=rebuild_name, index=sql.Identifier(index_name)
+            )
+        )
+
+    return {"lists": lists, "rows": rows}
+
+
+def build_partition_index(workspace: dict) -> Optional[dict]:
+    """
+    Partitions are searched exactly until they reach PARTITION_INDEX_MIN_ROWS
+    rows, their vector index is then built once with IVF lists sized to the
+    rows. Later IVF rebuilds go through rebuild_ivfflat_index.
+    """
+    if not workspace.get("has_index"):
+        return None
+    if get_table_layout(workspace) != TableLayout.PARTITIONED.value:
+        return None
+
+    vector_precision = genai_core.quantization.get_vector_precision(workspace)
+    if not VECTOR_INDEX_OPS[vector_precision].get(workspace["metric"]):
+        return None
+
+    table = workspace["workspace_id"].replace("-", "")
+    table_name = sql.Identifier(table)
+    index_name = f"{table}_embeddings_idx"
+
+    with AuroraConnection() as cursor:
+        if _has_valid_index(cursor, index_name):
+            return None
+
+        cursor.execute(
+            sql.SQL("SELECT COUNT(*) FROM {table};").format(table=table_name)
+        )
+        rows = cursor.fetchone()[0]
+        if rows < PARTITION_INDEX_MIN_ROWS:
+            return None
+
+        lists = None
+        if get_index_type(workspace) == VectorIndexType.IVFFLAT.value:
+            lists = get_ivfflat_lists(rows)
+
+        logger.info(
+            "Building partition vector index",
+            workspace_id=workspace["workspace_id"],
+            rows=rows,
+            lists=lists,
+        )
+        cursor.execute(
+            *get_vector_index_statement(
+                workspace,
+                table_name,
+                lists=lists,
+                index_name=sql.Identifier(index_name),
+            )
+        )
+
+    return {"lists": lists, "rows": rows}
+
+
+def add_tsvector_columns(workspace: dict) -> Optional[List[str]]:
+    """
+    Migrates tables created before the stored tsvector columns, adding a
+    column and its GIN index per workspace language. A generated column would
+    rewrite the table under an ACCESS EXCLUSIVE lock, blocking searches as well
+    as writes. The column is added empty instead, a trigger fills it for new
+    rows and the existing rows are filled by batches of
+    TSVECTOR_BACKFILL_BATCH_SIZE, each one a short transaction. Searches keep
+    using the expression indexes until the workspace lists the columns.
+    """
+    if not workspace.get("hybrid_search"):
+        return None
+    # The shared tables have the column of every language
+    if get_table_layout(workspace) == TableLayout.PARTITIONED.value:
+        return None
+
+    languages = workspace["languages"]
+    if all(
+        language in workspace.get("tsvector_languages", []) for language in languages
+    ):
+        return None
+
+    table = workspace["workspace_id"].replace("-", "")
+    table_name = sql.Identifier(table)
+
+    with AuroraConnection() as cursor:
+        for language in languages:
+            _add_tsvector_trigger_column(cursor, table, language)
+            _backfill_tsvector_column(cursor, table_name, language)
+
+            index_name = f"{table}_content_tsv_{language}_idx"
+            if _has_valid_index(cursor, index_name):
+                continue
+
+            cursor.execute(
+                sql.SQL(
+                    "CREATE INDEX CONCURRENTLY {index} ON {table} "
+                    + "USING GIN ({column}) WHERE {condition};"
+                ).format(
+                    index=sql.Identifier(index_name),
+                    table=table_name,
+                    column=get_tsvector_column(language),
+                    condition=get_language_condition(language),
+                )
+            )
+
+    logger.info(
+        "Added tsvector columns",
+        workspace_id=workspace["workspace_id"],
+        languages=languages,
+    )
+
+    return languages
+
+
+def drop_tsvector_expression_indexes(workspace: dict):
+    """
+    Expression indexes the keyword search used before the stored columns,
+    dropped once the workspace queries the columns.
+    """
+    table = workspace["workspace_id"].replace("-", "")
+
+    with AuroraConnection() as cursor:
+        cursor.execute(
+            """SELECT indexname FROM pg_indexes
+            WHERE tablename = %s AND indexdef LIKE '%%USING gin (to_tsvector(%%';""",
+            [table],
+        )
+
+        for (index_name,) in cursor.fetchall():
+            cursor.execute(
+                sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {index};").format(
+                    index=sql.Identifier(index_name)
+                )
+            )
+
+
+def _add_tsvector_trigger_column(cursor, table: str, language: str):
+    table_name = sql.Identifier(table)
+    column = get_tsvector_column(language)
+    trigger_name = f"{table}_content_tsv_{language}"
+
+    # Without a default, adding the column does not rewrite the table
+    cursor.execute(
+        sql.SQL(
+            "ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} tsvector;"
+        ).format(table=table_name, column=column)
+    )
+    cursor.execute(
+        sql.SQL(
+            "CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$ BEGIN "
+            + "NEW.{column} := CASE WHEN NEW.language IS NULL "
+            + "OR NEW.language = {language} "
+            + "THEN to_tsvector({language}::regconfig, NEW.content) END; "
+            + "RETURN NEW; END $$ LANGUAGE plpgsql;"
+        ).format(
+            function=sql.Identifier(trigger_name),
+            column=column,
+            language=sql.Literal(language),
+        )
+    )
+
+    cursor.execute(
+        """SELECT 1 FROM pg_trigger
+        WHERE tgname = %s AND tgrelid = quote_ident(%s)::regclass;""",
+        [trigger_name, table],
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(
+            sql.SQL(
+                "CREATE TRIGGER {trigger} BEFORE INSERT OR UPDATE OF content, "
+                + "language ON {table} FOR EACH ROW EXECUTE FUNCTION {function}();"
+            ).format(
+                trigger=sql.Identifier(trigger_name),
+                table=table_name,
+                function=sql.Identifier(trigger_name),
+            )
+        )
+
+
+def _backfill_tsvector_column(cursor, table_name: sql.Identifier, language: str):
+    column = get_tsvector_column(language)
+    condition = get_language_condition(language)
+
+    # Batches are ranges of the primary key, rows filled by an interrupted
+    # backfill are skipped when it runs again
+    last = NIL_UUID
+    while last is not None:
+        cursor.execute(
+            sql.SQL(
+                "SELECT chunk_id FROM {table} WHERE chunk_id > %s "
+                + "ORDER BY chunk_id OFFSET %s LIMIT 1;"
+            ).format(table=table_name),
+            [last, TSVECTOR_BACKFILL_BATCH_SIZE - 1],
+        )
+        bound = cursor.fetchone()
+        bound = bound[0] if bound is not None else None
+
+        cursor.execute(
+            sql.SQL(
+                "UPDATE {table} SET {column} = to_tsvector({language}::regconfig, "
+                + "content) WHERE chunk_id > %s AND (%s::uuid IS NULL OR "
+                + "chunk_id <= %s) AND {column} IS NULL AND {condition};"
+            ).format(
+                table=table_name,
+                column=column,
+                language=sql.Literal(language),
+                condition=condition,
+            ),
+            [last, bound, bound],
+        )
+        last = bound
+
+
+def _has_valid_index(cursor, index_name: str) -> bool:
+    cursor.execute(
+        """SELECT i.indisvalid FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s;""",
+        [index_name],
+    )
+    index = cursor.fetchone()
+    if index is not None and not index[0]:
+        # Left invalid by a build that did not complete
+        cursor.execute(
+            sql.SQL("DROP INDEX CONCURRENTLY {index};").format(
+                index=sql.Identifier(index_name)
+            )
+        )
+
+    return index is not None and index[0]
+
+
+def _get_lists(options: Optional[list]) -> int:
+    for option in options or []:
+        name, _, value = option.partition("=")
+        if name == "lists":
+            return int(value)
+
+    # pgvector default
+    return 100
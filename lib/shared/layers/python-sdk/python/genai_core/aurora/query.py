@@ -2,15 +2,44 @@ import numpy as np
 import genai_core.embeddings
 import genai_core.cross_encoder
 import genai_core.utils.comprehend
-from typing import List
+import genai_core.quantization
+import genai_core.aurora.create
+from typing import List, Optional, Tuple
 from psycopg2 import sql
-from genai_core.aurora.connection import AuroraConnection
+from genai_core.aurora.connection import AuroraConnection, use_reader
 from genai_core.aurora.utils import convert_types
 from aws_lambda_powertools import Logger
-from genai_core.types import CommonError, Task
+from genai_core.types import (
+    CommonError,
+    TableLayout,
+    Task,
+    VectorIndexType,
+    VectorPrecision,
+)
 
 logger = Logger()
 
+# Reciprocal rank fusion constant, dampens the weight of the top ranks
+HYBRID_SEARCH_RRF_K = 60
+
+RECORD_FIELDS = [
+    "chunk_id",
+    "workspace_id",
+    "document_id",
+    "document_sub_id",
+    "document_type",
+    "document_sub_type",
+    "path",
+    "language",
+    "title",
+    "content",
+    "content_complement",
+    "metadata",
+]
+# What fusion, thresholds and rescoring read, the other fields are only
+# fetched for the records returned
+CANDIDATE_FIELDS = ["chunk_id", "document_id", "document_sub_id"]
+
 
 def query_workspace_aurora(
     workspace_id: str,
@@ -19,10 +48,10 @@ def query_workspace_aurora(
     limit: int,
     full_response: bool,
     threshold: int = 0,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
 ):
     table_name = sql.Identifier(workspace_id.replace("-", ""))
-    embeddings_model_provider = workspace["embeddings_model_provider"]
-    embeddings_model_name = workspace["embeddings_model_name"]
     cross_encoder_model_provider = workspace["cross_encoder_model_provider"]
     cross_encoder_model_name = workspace["cross_encoder_model_name"]
     metric = workspace["metric"]
@@ -31,9 +60,7 @@ def query_workspace_aurora(
     vector_search_limit = 25
     keyword_search_limit = 25
 
-    selected_model = genai_core.embeddings.get_embeddings_model(
-        embeddings_model_provider, embeddings_model_name
-    )
+    selected_model = genai_core.embeddings.get_workspace_embeddings_model(workspace)
 
     if selected_model is None:
         raise CommonError("Embeddings model not found")
@@ -46,109 +73,107 @@ def query_workspace_aurora(
         query, languages
     )
 
-    items = []
     vector_search_records = []
     keyword_search_records = []
-    with AuroraConnection() as cursor:
-        if metric == "cosine":
-            cursor.execute(
-                sql.SQL(
-                    """SELECT chunk_id,
-                        workspace_id,
-                        document_id,
-                        document_sub_id,
-                        document_type,
-                        document_sub_type,
-                        path,
-                        language,
-                        title,
-                        content,
-                        content_complement,
-                        metadata,
-                        content_embeddings <=> %s AS vector_search_score
-                FROM {table} ORDER BY vector_search_score LIMIT %s;"""
-                ).format(table=table_name),
-                [np.array(query_embeddings), vector_search_limit],
+    vector_precision = genai_core.quantization.get_vector_precision(workspace)
+    vector_search_operator, vector_search_param = _get_vector_search_operator(
+        metric, vector_precision, query_embeddings
+    )
+    rescore = None
+    if genai_core.quantization.is_rescored(workspace):
+        rescore = _get_vector_search_operator(
+            metric, VectorPrecision.FLOAT32.value, query_embeddings
+        )
+    fields = RECORD_FIELDS
+    if not full_response:
+        fields = CANDIDATE_FIELDS
+        if cross_encoder_model_name is not None:
+            fields = fields + ["content"]
+
+    reader = use_reader(workspace)
+    candidates_limit = vector_search_limit
+    if rescore is not None:
+        candidates_limit *= genai_core.quantization.RESCORE_OVERSAMPLING
+
+    # The full response lists both result sets, otherwise both searches are
+    # fused by the database
+    if hybrid_search and not full_response:
+        fused_limit = limit
+        if cross_encoder_model_name is not None:
+            fused_limit = max(limit, vector_search_limit)
+
+        with AuroraConnection(autocommit=False, reader=reader) as cursor:
+            _set_index_search_params(
+                cursor, workspace, candidates_limit, ef_search, probes
             )
-        elif metric == "l2":
-            cursor.execute(
-                sql.SQL(
-                    """SELECT chunk_id,
-                        workspace_id,
-                        document_id,
-                        document_sub_id,
-                        document_type,
-                        document_sub_type,
-                        path,
-                        language,
-                        title,
-                        content,
-                        content_complement,
-                        metadata,
-                        content_embeddings <-> %s AS vector_search_score
-                FROM {table} ORDER BY vector_search_score LIMIT %s;"""
-                ).format(table=table_name),
-                [np.array(query_embeddings), vector_search_limit],
+            items = _fused_search(
+                cursor,
+                table_name,
+                sql.Identifier(language_name),
+                _get_tsvector(workspace, language_name),
+                _get_language_filter(workspace, language_name),
+                _get_vector_candidates(
+                    table_name,
+                    sql.Identifier("chunk_id"),
+                    vector_search_operator,
+                    vector_search_param,
+                    vector_search_limit,
+                    rescore,
+                ),
+                query,
+                keyword_search_limit,
+                fused_limit,
+                fields,
+            )
+    else:
+        with AuroraConnection(autocommit=False, reader=reader) as cursor:
+            _set_index_search_params(
+                cursor, workspace, candidates_limit, ef_search, probes
             )
-        elif metric == "inner":
             cursor.execute(
-                sql.SQL(
-                    """SELECT chunk_id,
-                        workspace_id,
-                        document_id,
-                        document_sub_id,
-                        document_type,
-                        document_sub_type,
-                        path,
-                        language,
-                        title,
-                        content,
-                        content_complement,
-                        metadata,
-                        content_embeddings <#> %s AS vector_search_score
-                FROM {table} ORDER BY vector_search_score LIMIT %s;"""
-                ).format(table=table_name),
-                [np.array(query_embeddings), vector_search_limit],
+                *_get_vector_candidates(
+                    table_name,
+                    _get_columns(fields),
+                    vector_search_operator,
+                    vector_search_param,
+                    vector_search_limit,
+                    rescore,
+                )
             )
-        else:
-            raise Exception("Unknown metric")
 
-        vector_search_records = cursor.fetchall()
-        vector_search_records = _convert_records("vector_search", vector_search_records)
-        items.extend(vector_search_records)
+            vector_search_records = cursor.fetchall()
+            vector_search_records = _convert_records(
+                "vector_search", vector_search_records, fields
+            )
 
-        if hybrid_search:
-            language = sql.Identifier(language_name)
+            if hybrid_search:
+                language = sql.Identifier(language_name)
+
+                cursor.execute(
+                    sql.SQL(
+                        """SELECT {fields},
+                                ts_rank_cd({document}, query) AS keyword_search_score
+                                FROM {table},
+                                plainto_tsquery('{language}', %s) query
+                                WHERE {language_filter} AND {document} @@ query
+                                ORDER BY keyword_search_score DESC
+                                LIMIT %s;"""
+                    ).format(
+                        table=table_name,
+                        language=language,
+                        document=_get_tsvector(workspace, language_name),
+                        language_filter=_get_language_filter(workspace, language_name),
+                        fields=_get_columns(fields),
+                    ),
+                    [query, keyword_search_limit],
+                )
 
-            cursor.execute(
-                sql.SQL(
-                    """SELECT chunk_id,
-                            workspace_id,
-                            document_id,
-                            document_sub_id,
-                            document_type,
-                            document_sub_type,
-                            path,
-                            language,
-                            title,
-                            content,
-                            content_complement,
-                            metadata,
-                            ts_rank_cd(to_tsvector('{language}', content), query) AS keyword_search_score
-                            FROM {table},
-                            plainto_tsquery('{language}', %s) query
-                            WHERE to_tsvector('{language}', content) @@ query
-                            ORDER BY keyword_search_score DESC
-                            LIMIT %s;"""  # noqa:E501
-                ).format(table=table_name, language=language),
-                [query, keyword_search_limit],
-            )
+                keyword_search_records = cursor.fetchall()
+                keyword_search_records = _convert_records(
+                    "keyword_search", keyword_search_records, fields
+                )
 
-            keyword_search_records = cursor.fetchall()
-            keyword_search_records = _convert_records(
-                "keyword_search", keyword_search_records
-            )
-            items.extend(keyword_search_records)
+        items = vector_search_records + keyword_search_records
 
     unique_items = dict({})
     for item in items:
@@ -258,6 +283,7 @@ def query_workspace_aurora(
                     )[: (limit - len(ret_items))]
                 )
 
+        ret_items = _hydrate_records(table_name, ret_items, reader)
         ret_value = {
             "engine": "aurora",
             "query_language": language_name,
@@ -271,31 +297,283 @@ def query_workspace_aurora(
     return ret_value
 
 
-def _convert_records(source: str, records: List[dict]):
+def _get_vector_search_operator(
+    metric: str, vector_precision: str, query_embeddings: List[float]
+):
+    if vector_precision == VectorPrecision.BINARY.value:
+        bits = genai_core.quantization.quantize_binary_bits([query_embeddings])[0]
+        operator = sql.SQL("<~> CAST(%s AS bit({dimensions}))").format(
+            dimensions=sql.Literal(len(bits))
+        )
+
+        return operator, bits
+
+    if metric == "cosine":
+        operator = "<=>"
+    elif metric == "l2":
+        operator = "<->"
+    elif metric == "inner":
+        operator = "<#>"
+    else:
+        raise Exception("Unknown metric")
+
+    if vector_precision == VectorPrecision.FLOAT16.value:
+        return sql.SQL(operator + " %s::halfvec"), np.array(query_embeddings)
+
+    return sql.SQL(operator + " %s"), np.array(query_embeddings)
+
+
+def _get_tsvector(workspace: dict, language_name: str) -> sql.Composable:
+    if _is_partitioned(workspace):
+        return sql.Identifier(genai_core.aurora.create.PARTITION_TSVECTOR_COLUMN)
+    # Tables without the stored column of the language compute it per row
+    if language_name in workspace.get("tsvector_languages", []):
+        return genai_core.aurora.create.get_tsvector_column(language_name)
+
+    return sql.SQL("to_tsvector('{language}', content)").format(
+        language=sql.Identifier(language_name)
+    )
+
+
+def _get_language_filter(workspace: dict, language_name: str) -> sql.Composable:
+    # The rows of the other languages have a tsvector in their own language
+    if _is_partitioned(workspace):
+        return sql.SQL("language = {language}").format(
+            language=sql.Literal(language_name)
+        )
+    # Matches the predicate of the partial index on the stored column
+    if language_name in workspace.get("tsvector_languages", []):
+        return genai_core.aurora.create.get_language_condition(language_name)
+
+    return sql.SQL("TRUE")
+
+
+def _is_partitioned(workspace: dict) -> bool:
+    layout = genai_core.aurora.create.get_table_layout(workspace)
+
+    return layout == TableLayout.PARTITIONED.value
+
+
+def _set_index_search_params(
+    cursor,
+    workspace: dict,
+    candidates_limit: int,
+    ef_search: Optional[int],
+    probes: Optional[int],
+):
+    """
+    Recall of the approximate index for this query only, SET LOCAL ends with
+    the read transaction, which the connection pool rolls back.
+    """
+    if not workspace.get("has_index"):
+        return
+
+    index_type = genai_core.aurora.create.get_index_type(workspace)
+    if index_type == VectorIndexType.HNSW.value:
+        ef_search = ef_search or workspace.get("hnsw_ef_search")
+        ef_search = int(ef_search or genai_core.aurora.create.HNSW_EF_SEARCH)
+        # HNSW returns at most ef_search rows
+        cursor.execute(
+            "SET LOCAL hnsw.ef_search = %s;", [max(ef_search, candidates_limit)]
+        )
+    else:
+        probes = probes or workspace.get("ivfflat_probes")
+        # Workspaces created before index_type keep the server default
+        if not probes and workspace.get("index_type"):
+            lists = workspace.get("ivfflat_lists")
+            probes = genai_core.aurora.create.get_ivfflat_probes(
+                int(lists or genai_core.aurora.create.IVFFLAT_LISTS)
+            )
+        if probes:
+            cursor.execute("SET LOCAL ivfflat.probes = %s;", [int(probes)])
+
+
+def _get_vector_candidates(
+    table_name: sql.Identifier,
+    columns: sql.Composable,
+    operator: sql.Composable,
+    param,
+    limit: int,
+    rescore: Optional[Tuple[sql.Composable, object]] = None,
+) -> Tuple[sql.Composable, list]:
+    """
+    Select of the columns and the distance of the vector search candidates,
+    closest first, and its parameters. With rescore, the operator and query
+    parameter of the full precision column, the quantized index reads
+    oversampled candidates that are ordered again by their full precision
+    distance in the same statement. Rows without one come last.
+    """
+    if rescore is None:
+        return (
+            sql.SQL(
+                "SELECT {columns}, content_embeddings {operator} AS score "
+                + "FROM {table} ORDER BY score LIMIT %s"
+            ).format(columns=columns, operator=operator, table=table_name),
+            [param, limit],
+        )
+
+    rescore_operator, rescore_param = rescore
+    full_precision = sql.Identifier(genai_core.quantization.FULL_PRECISION_FIELD)
+
+    return (
+        sql.SQL(
+            "SELECT {columns}, {full_precision} {rescore_operator} AS score "
+            + "FROM (SELECT {columns}, {full_precision} FROM {table} "
+            + "ORDER BY content_embeddings {operator} LIMIT %s) quantized "
+            + "ORDER BY score LIMIT %s"
+        ).format(
+            columns=columns,
+            full_precision=full_precision,
+            rescore_operator=rescore_operator,
+            table=table_name,
+            operator=operator,
+        ),
+        [
+            rescore_param,
+            param,
+            limit * genai_core.quantization.RESCORE_OVERSAMPLING,
+            limit,
+        ],
+    )
+
+
+def _fused_search(
+    cursor,
+    table_name: sql.Identifier,
+    language: sql.Identifier,
+    document: sql.Composable,
+    language_filter: sql.Composable,
+    vector_candidates: Tuple[sql.Composable, list],
+    query: str,
+    keyword_search_limit: int,
+    limit: int,
+    fields: List[str],
+):
+    """
+    Vector and keyword candidates are ranked by chunk id only and fused with
+    reciprocal rank fusion in one statement. Only the fused top rows are
+    read from the table, with the scores of both searches.
+    """
+    cursor.execute(
+        sql.SQL(
+            """WITH vector_search AS (
+                SELECT chunk_id, score, ROW_NUMBER() OVER (ORDER BY score) AS rank
+                FROM ({vector_candidates}) candidates
+            ),
+            keyword_search AS (
+                SELECT chunk_id, score,
+                    ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+                FROM (
+                    SELECT chunk_id,
+                        ts_rank_cd({document}, query) AS score
+                    FROM {table}, plainto_tsquery('{language}', %s) query
+                    WHERE {language_filter} AND {document} @@ query
+                    ORDER BY score DESC LIMIT %s
+                ) candidates
+            ),
+            fused AS (
+                SELECT COALESCE(v.chunk_id, k.chunk_id) AS chunk_id,
+                    v.score AS vector_search_score,
+                    k.score AS keyword_search_score,
+                    COALESCE(1.0 / (%s + v.rank), 0)
+                        + COALESCE(1.0 / (%s + k.rank), 0) AS fused_score
+                FROM vector_search v
+                FULL OUTER JOIN keyword_search k ON v.chunk_id = k.chunk_id
+                ORDER BY fused_score DESC LIMIT %s
+            )
+            SELECT {fields},
+                f.vector_search_score,
+                f.keyword_search_score,
+                f.fused_score
+            FROM fused f JOIN {table} t ON t.chunk_id = f.chunk_id
+            ORDER BY f.fused_score DESC;"""
+        ).format(
+            table=table_name,
+            vector_candidates=vector_candidates[0],
+            language=language,
+            document=document,
+            language_filter=language_filter,
+            fields=_get_columns(fields, "t"),
+        ),
+        [
+            *vector_candidates[1],
+            query,
+            keyword_search_limit,
+            HYBRID_SEARCH_RRF_K,
+            HYBRID_SEARCH_RRF_K,
+            limit,
+        ],
+    )
+
+    records = []
+    size = len(fields)
+    for record in cursor.fetchall():
+        converted = _convert_records("vector_search", [record[: size + 1]], fields)[0]
+        converted["keyword_search_score"] = record[size + 1]
+        converted["fused_score"] = float(record[size + 2])
+        converted["sources"] = sorted(
+            source
+            for source, score in [
+                ("vector_search", record[size]),
+                ("keyword_search", record[size + 1]),
+            ]
+            if score is not None
+        )
+        records.append(converted)
+
+    return records
+
+
+def _hydrate_records(
+    table_name: sql.Identifier, records: List[dict], reader: bool = False
+):
+    """
+    Reads the fields left out of the candidates for the returned records.
+    Records deleted since the candidates were read are dropped.
+    """
+    if not records:
+        return records
+
+    with AuroraConnection(reader=reader) as cursor:
+        cursor.execute(
+            sql.SQL("SELECT {fields} FROM {table} WHERE chunk_id = ANY(%s);").format(
+                fields=_get_columns(RECORD_FIELDS), table=table_name
+            ),
+            [[record["chunk_id"] for record in records]],
+        )
+        rows = {row[0]: dict(zip(RECORD_FIELDS, row)) for row in cursor.fetchall()}
+
+    hydrated = []
+    for record in records:
+        row = rows.get(record["chunk_id"])
+        if row is not None:
+            record.update(row)
+            hydrated.append(record)
+
+    return hydrated
+
+
+def _get_columns(fields: List[str], table: Optional[str] = None) -> sql.Composable:
+    if table is None:
+        return sql.SQL(", ").join(sql.Identifier(field) for field in fields)
+
+    return sql.SQL(", ").join(sql.Identifier(table, field) for field in fields)
+
+
+def _convert_records(source: str, records: List[dict], fields: List[str]):
     converted_records = []
+    size = len(fields)
     for record in records:
-        converted = {
-            "chunk_id": record[0],
-            "workspace_id": record[1],
-            "document_id": record[2],
-            "document_sub_id": record[3],
-            "document_type": record[4],
-            "document_sub_type": record[5],
-            "path": record[6],
-            "language": record[7],
-            "title": record[8],
-            "content": record[9],
-            "content_complement": record[10],
-            "metadata": record[11],
-            "sources": [source],
-            "score": None,
-        }
+        converted = {field: None for field in RECORD_FIELDS}
+        converted.update(zip(fields, record[:size]))
+        converted["sources"] = [source]
+        converted["score"] = None
 
         if source == "vector_search":
-            converted["vector_search_score"] = record[12]
+            converted["vector_search_score"] = record[size]
             converted["keyword_search_score"] = None
         elif source == "keyword_search":
-            converted["keyword_search_score"] = record[12]
+            converted["keyword_search_score"] = record[size]
             converted["vector_search_score"] = None
         else:
             raise CommonError("Unknown source")
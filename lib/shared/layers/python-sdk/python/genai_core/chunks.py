@@ -1,17 +1,34 @@
+import io
 import os
+import gzip
+import json
 import uuid
+import queue
+import hashlib
+import threading
 import boto3
+import botocore
+import genai_core.dedup
 import genai_core.documents
 import genai_core.embeddings
+import genai_core.quantization
 import genai_core.aurora.chunks
 import genai_core.opensearch.chunks
+import genai_core.utils.language
 from genai_core.types import CommonError, Task
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 PROCESSING_BUCKET_NAME = os.environ.get("PROCESSING_BUCKET_NAME", "")
+# Text held in memory by split_content_stream before chunks are emitted
+STREAM_BUFFER_CHARACTERS = 1024 * 1024
+PIPELINE_BATCH_SIZE = 100
+PIPELINE_MAX_QUEUED_BATCHES = 2
 s3 = boto3.resource("s3")
 
+_PIPELINE_DONE = object()
+
 
 def add_chunks(
     replace: bool,
@@ -23,84 +40,593 @@ def add_chunks(
     path: Optional[str] = None,
 ):
     workspace_id = workspace["workspace_id"]
-    engine = workspace["engine"]
-    embeddings_model_provider = workspace["embeddings_model_provider"]
-    embeddings_model_name = workspace["embeddings_model_name"]
     document_id = document["document_id"]
-    document_type = document["document_type"]
-    document_sub_type = document["document_sub_type"]
     path = path if path else document["path"]
-    title = document["title"]
 
-    embeddings_model = genai_core.embeddings.get_embeddings_model(
-        embeddings_model_provider, embeddings_model_name
+    embeddings_model = genai_core.embeddings.get_workspace_embeddings_model(workspace)
+
+    if embeddings_model is None:
+        raise CommonError("Embeddings model not found")
+
+    manifest = ChunkManifest(
+        workspace_id,
+        document_id,
+        document_sub_id,
+        _get_deduplicator(workspace, document_id, document_sub_id),
     )
+    batch = manifest.select(0, chunks, chunk_complements, len(chunk_complements or []))
+
+    chunks = batch["chunks"]
+    chunk_ids = batch["chunk_ids"]
+    chunk_embeddings = []
+    if chunks:
+        chunk_embeddings = genai_core.embeddings.generate_embeddings(
+            embeddings_model, chunks, Task.STORE.value
+        )
+
+    manifest.add_locations(
+        store_chunks_on_s3(
+            workspace_id, document_id, document_sub_id, chunk_ids, chunks
+        )
+    )
+    manifest.add_pending(chunk_ids)
+
+    added_vectors = 0
+    if chunks or (replace and not manifest.incremental):
+        result = _add_chunks_to_engine(
+            workspace=workspace,
+            document=document,
+            document_sub_id=document_sub_id,
+            path=path,
+            chunk_ids=chunk_ids,
+            chunk_embeddings=chunk_embeddings,
+            chunks=chunks,
+            chunk_complements=batch["chunk_complements"],
+            replace=replace and not manifest.incremental,
+        )
+        added_vectors = result["added_vectors"]
+
+    genai_core.documents.set_document_vectors(
+        workspace_id, document_id, added_vectors + batch["kept"], replace=replace
+    )
+    _remove_vanished_chunks(workspace, document_id, document_sub_id, manifest)
+    manifest.save()
+
+    return {"added_vectors": added_vectors, "skipped_chunks": batch["skipped"]}
+
+
+def add_chunks_pipelined(
+    replace: bool,
+    workspace: dict,
+    document: dict,
+    document_sub_id: Optional[str],
+    chunks: Iterable[str],
+    chunk_complements: Optional[List[str]] = None,
+    path: Optional[str] = None,
+    batch_size: int = PIPELINE_BATCH_SIZE,
+    max_queued_batches: int = PIPELINE_MAX_QUEUED_BATCHES,
+):
+    """
+    Same as add_chunks, but chunk batches flow through embed, store on S3 and
+    index stages running concurrently, connected by bounded queues. Memory
+    stays constant when chunks is a lazy iterable. Document vectors are
+    updated after each indexed batch. With replace, the previous vectors are
+    removed once all batches are indexed, so a failed ingestion leaves them
+    searchable. When the document has a chunk manifest only changed chunks
+    are written and vanished ones removed.
+    Near-duplicate chunks are skipped when the workspace has chunk_dedup.
+    """
+    workspace_id = workspace["workspace_id"]
+    document_id = document["document_id"]
+    path = path if path else document["path"]
+    complements_len = len(chunk_complements) if chunk_complements else 0
+
+    embeddings_model = genai_core.embeddings.get_workspace_embeddings_model(workspace)
 
     if embeddings_model is None:
         raise CommonError("Embeddings model not found")
 
-    chunk_embeddings = genai_core.embeddings.generate_embeddings(
-        embeddings_model, chunks, Task.STORE.value
+    manifest = ChunkManifest(
+        workspace_id,
+        document_id,
+        document_sub_id,
+        _get_deduplicator(workspace, document_id, document_sub_id),
+    )
+    totals = {"added_vectors": 0, "skipped_chunks": 0}
+
+    def embed(batch: dict):
+        batch["chunk_embeddings"] = []
+        if batch["chunks"]:
+            batch["chunk_embeddings"] = genai_core.embeddings.generate_embeddings(
+                embeddings_model, batch["chunks"], Task.STORE.value
+            )
+
+        return batch
+
+    def store(batch: dict):
+        manifest.add_locations(
+            store_chunks_on_s3(
+                workspace_id,
+                document_id,
+                document_sub_id,
+                batch["chunk_ids"],
+                batch["chunks"],
+            )
+        )
+
+        return batch
+
+    def index(batch: dict):
+        batch_replace = replace and batch["offset"] == 0
+
+        added_vectors = 0
+        if batch["chunks"]:
+            manifest.add_pending(batch["chunk_ids"])
+            result = _add_chunks_to_engine(
+                workspace=workspace,
+                document=document,
+                document_sub_id=document_sub_id,
+                path=path,
+                chunk_ids=batch["chunk_ids"],
+                chunk_embeddings=batch["chunk_embeddings"],
+                chunks=batch["chunks"],
+                chunk_complements=batch["chunk_complements"],
+                replace=False,
+            )
+            added_vectors = result["added_vectors"]
+
+        genai_core.documents.set_document_vectors(
+            workspace_id,
+            document_id,
+            added_vectors + batch["kept"],
+            replace=batch_replace,
+        )
+        totals["added_vectors"] += added_vectors
+        totals["skipped_chunks"] += batch["skipped"]
+
+    def batches():
+        offset = 0
+        current = []
+        for chunk in chunks:
+            current.append(chunk)
+            if len(current) == batch_size:
+                yield manifest.select(
+                    offset, current, chunk_complements, complements_len
+                )
+                offset += len(current)
+                current = []
+
+        if current or offset == 0:
+            yield manifest.select(offset, current, chunk_complements, complements_len)
+
+    _run_pipeline(batches(), [embed, store, index], max_queued_batches)
+    if replace and not manifest.incremental:
+        _remove_replaced_chunks(workspace, document_id, manifest)
+    _remove_vanished_chunks(workspace, document_id, document_sub_id, manifest)
+    manifest.save()
+
+    return totals
+
+
+class ChunkManifest:
+    """
+    Content hashes, ids and pack locations of the chunks of a document or
+    sub document, stored next to the chunks on S3. When a previous manifest
+    exists, chunks with a known hash keep their id, vectors and location,
+    only new or changed chunks are selected for embedding and unmatched
+    previous chunks have vanished. With a deduplicator, new chunks that are
+    near-duplicates of other chunks of the workspace are skipped.
+
+    The previous manifest is only replaced by save. Until then, the chunks
+    written to the engine are listed in a pending manifest, so the next
+    ingestion removes them if this one fails.
+    """
+
+    def __init__(
+        self,
+        workspace_id: str,
+        document_id: str,
+        document_sub_id: Optional[str],
+        deduplicator: Optional[genai_core.dedup.ChunkDeduplicator] = None,
+    ):
+        prefix = get_chunks_prefix(workspace_id, document_id, document_sub_id)
+        self.key = f"{prefix}/manifest.json"
+        self.pending_key = f"{prefix}/manifest.pending.json"
+        self.chunks = []
+        self._previous = {}
+        self._locations = {}
+        self._deduplicator = deduplicator
+
+        previous = _get_chunks_manifest(self.key)
+        self.incremental = previous is not None
+        for item in previous or []:
+            self._previous.setdefault(item["hash"], []).append(item)
+
+        # Chunks written by a failed ingestion are not in the previous manifest
+        self._abandoned = _get_chunks_manifest(self.pending_key) or []
+        self._pending = list(self._abandoned)
+
+    def select(
+        self,
+        offset: int,
+        chunks: List[str],
+        chunk_complements: Optional[List[str]],
+        complements_len: int,
+    ) -> dict:
+        batch = {
+            "offset": offset,
+            "kept": 0,
+            "skipped": 0,
+            "chunks": [],
+            "chunk_ids": [],
+            "chunk_complements": [],
+        }
+
+        for idx, chunk in enumerate(chunks):
+            position = offset + idx
+            complement = (
+                chunk_complements[position] if position < complements_len else None
+            )
+            chunk_hash = get_chunk_hash(chunk, complement)
+
+            previous_items = self._previous.get(chunk_hash)
+            if previous_items:
+                self.chunks.append(previous_items.pop())
+                batch["kept"] += 1
+                if self._deduplicator:
+                    self._deduplicator.add(chunk)
+            elif self._deduplicator and self._deduplicator.is_duplicate(chunk):
+                batch["skipped"] += 1
+            else:
+                chunk_id = uuid.uuid4()
+                batch["chunks"].append(chunk)
+                batch["chunk_ids"].append(chunk_id)
+                batch["chunk_complements"].append(complement)
+                self.chunks.append({"chunk_id": str(chunk_id), "hash": chunk_hash})
+
+        # Engines treat missing trailing complements as None
+        complements = batch["chunk_complements"]
+        while complements and complements[-1] is None:
+            complements.pop()
+        batch["chunk_complements"] = complements or None
+
+        return batch
+
+    def add_locations(self, locations: List[dict]):
+        for location in locations:
+            self._locations[location["chunk_id"]] = location
+
+    def add_pending(self, chunk_ids: List[str]):
+        """Record chunks before they are written to the engine"""
+        if not chunk_ids:
+            return
+
+        for chunk_id in chunk_ids:
+            item = {"chunk_id": str(chunk_id)}
+            item.update(self._locations.get(str(chunk_id), {}))
+            self._pending.append(item)
+
+        s3.Object(PROCESSING_BUCKET_NAME, self.pending_key).put(
+            Body=json.dumps({"chunks": self._pending}),
+            ContentType="application/json",
+        )
+
+    def vanished(self) -> List[dict]:
+        previous = [item for items in self._previous.values() for item in items]
+
+        return previous + self._abandoned
+
+    def save(self):
+        for item in self.chunks:
+            item.update(self._locations.get(item["chunk_id"], {}))
+
+        s3.Object(PROCESSING_BUCKET_NAME, self.key).put(
+            Body=json.dumps({"chunks": self.chunks}),
+            ContentType="application/json",
+        )
+        if self._pending:
+            s3.Object(PROCESSING_BUCKET_NAME, self.pending_key).delete()
+        if self._deduplicator:
+            self._deduplicator.save()
+
+
+def _get_deduplicator(
+    workspace: dict, document_id: str, document_sub_id: Optional[str]
+) -> Optional[genai_core.dedup.ChunkDeduplicator]:
+    if not genai_core.dedup.is_dedup_enabled(workspace):
+        return None
+
+    return genai_core.dedup.ChunkDeduplicator(
+        workspace["workspace_id"], document_id, document_sub_id
     )
-    chunk_ids = [uuid.uuid4() for _ in chunks]
 
-    store_chunks_on_s3(workspace_id, document_id, document_sub_id, chunk_ids, chunks)
 
+def get_chunk_hash(chunk: str, chunk_complement: Optional[str] = None) -> str:
+    content = chunk if chunk_complement is None else f"{chunk}\x00{chunk_complement}"
+
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _get_chunks_manifest(key: str) -> Optional[List[dict]]:
+    try:
+        response = s3.Object(PROCESSING_BUCKET_NAME, key).get()
+    except botocore.exceptions.ClientError as error:
+        if error.response.get("Error", {}).get("Code") == "NoSuchKey":
+            return None
+        raise error
+
+    return json.loads(response["Body"].read())["chunks"]
+
+
+def _remove_replaced_chunks(workspace: dict, document_id: str, manifest: ChunkManifest):
+    workspace_id = workspace["workspace_id"]
+    chunk_ids = [item["chunk_id"] for item in manifest.chunks]
+
+    engine = workspace["engine"]
     if engine == "aurora":
-        result = genai_core.aurora.chunks.add_chunks_aurora(
+        genai_core.aurora.chunks.clean_chunks_aurora(
+            workspace_id, document_id, keep_chunk_ids=chunk_ids
+        )
+    elif engine == "opensearch":
+        genai_core.opensearch.chunks.clean_chunks_open_search(
+            workspace_id, document_id, keep_chunk_ids=chunk_ids
+        )
+    else:
+        raise CommonError("Engine not supported")
+
+
+def _remove_vanished_chunks(
+    workspace: dict,
+    document_id: str,
+    document_sub_id: Optional[str],
+    manifest: ChunkManifest,
+):
+    workspace_id = workspace["workspace_id"]
+    vanished = manifest.vanished()
+    if not vanished:
+        return
+
+    chunk_ids = [item["chunk_id"] for item in vanished]
+
+    engine = workspace["engine"]
+    if engine == "aurora":
+        genai_core.aurora.chunks.delete_chunks_aurora(workspace_id, chunk_ids)
+    elif engine == "opensearch":
+        genai_core.opensearch.chunks.delete_chunks_open_search(workspace_id, chunk_ids)
+    else:
+        raise CommonError("Engine not supported")
+
+    # Packs are removed once none of their chunks is left, chunks stored
+    # before packing have one object each
+    prefix = get_chunks_prefix(workspace_id, document_id, document_sub_id)
+    kept_packs = {item["pack"] for item in manifest.chunks if "pack" in item}
+    vanished_packs = {item["pack"] for item in vanished if "pack" in item}
+    keys = list(vanished_packs - kept_packs)
+    keys.extend(
+        f"{prefix}/{item['chunk_id']}.txt" for item in vanished if "pack" not in item
+    )
+
+    for idx in range(0, len(keys), 1000):
+        s3.meta.client.delete_objects(
+            Bucket=PROCESSING_BUCKET_NAME,
+            Delete={
+                "Objects": [{"Key": key} for key in keys[idx : idx + 1000]],
+                "Quiet": True,
+            },
+        )
+
+
+def _run_pipeline(items: Iterable, stages: list, max_queued: int):
+    failed = threading.Event()
+    errors = []
+    queues = [queue.Queue(maxsize=max_queued) for _ in stages]
+
+    def run_stage(func, inbound: queue.Queue, outbound: Optional[queue.Queue]):
+        while True:
+            item = _pipeline_get(inbound, failed)
+            if item is _PIPELINE_DONE:
+                break
+
+            try:
+                result = func(item)
+            except Exception as e:
+                errors.append(e)
+                failed.set()
+                break
+
+            if outbound is not None:
+                _pipeline_put(outbound, result, failed)
+
+        if outbound is not None:
+            _pipeline_put(outbound, _PIPELINE_DONE, failed)
+
+    threads = []
+    for idx, func in enumerate(stages):
+        outbound = queues[idx + 1] if idx + 1 < len(queues) else None
+        thread = threading.Thread(
+            target=run_stage, args=(func, queues[idx], outbound), daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+
+    try:
+        for item in items:
+            if not _pipeline_put(queues[0], item, failed):
+                break
+    finally:
+        _pipeline_put(queues[0], _PIPELINE_DONE, failed)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def _pipeline_put(target: queue.Queue, item, failed: threading.Event) -> bool:
+    while not failed.is_set():
+        try:
+            target.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+
+    return False
+
+
+def _pipeline_get(source: queue.Queue, failed: threading.Event):
+    while not failed.is_set():
+        try:
+            return source.get(timeout=0.5)
+        except queue.Empty:
+            continue
+
+    return _PIPELINE_DONE
+
+
+def _add_chunks_to_engine(
+    workspace: dict,
+    document: dict,
+    document_sub_id: Optional[str],
+    path: Optional[str],
+    chunk_ids: List[str],
+    chunk_embeddings: List[List[float]],
+    chunks: List[str],
+    chunk_complements: Optional[List[str]],
+    replace: bool,
+):
+    workspace_id = workspace["workspace_id"]
+    engine = workspace["engine"]
+    vector_precision = genai_core.quantization.get_vector_precision(workspace)
+    full_precision = genai_core.quantization.is_rescored(workspace)
+
+    if engine == "aurora":
+        chunk_languages = None
+        if workspace.get("hybrid_search"):
+            # Keyword search only reads the rows of the query language
+            chunk_languages = genai_core.utils.language.detect_chunk_languages(
+                chunks, workspace["languages"]
+            )
+
+        return genai_core.aurora.chunks.add_chunks_aurora(
             workspace_id=workspace_id,
-            document_id=document_id,
+            document_id=document["document_id"],
             document_sub_id=document_sub_id,
-            document_type=document_type,
-            document_sub_type=document_sub_type,
+            document_type=document["document_type"],
+            document_sub_type=document["document_sub_type"],
             path=path,
-            title=title,
+            title=document["title"],
             chunk_ids=chunk_ids,
             chunk_embeddings=chunk_embeddings,
             chunks=chunks,
             chunk_complements=chunk_complements,
             replace=replace,
+            vector_precision=vector_precision,
+            full_precision=full_precision,
+            chunk_languages=chunk_languages,
         )
     elif engine == "opensearch":
-        result = genai_core.opensearch.chunks.add_chunks_open_search(
+        return genai_core.opensearch.chunks.add_chunks_open_search(
             workspace_id=workspace_id,
-            document_id=document_id,
+            document_id=document["document_id"],
             document_sub_id=document_sub_id,
-            document_type=document_type,
-            document_sub_type=document_sub_type,
+            document_type=document["document_type"],
+            document_sub_type=document["document_sub_type"],
             path=path,
-            title=title,
+            title=document["title"],
             chunk_ids=chunk_ids,
             chunk_embeddings=chunk_embeddings,
             chunks=chunks,
             chunk_complements=chunk_complements,
             replace=replace,
+            vector_precision=vector_precision,
+            full_precision=full_precision,
         )
-    else:
-        raise CommonError("Engine not supported")
 
-    added_vectors = result["added_vectors"]
-    genai_core.documents.set_document_vectors(
-        workspace_id, document_id, added_vectors, replace=replace
-    )
+    raise CommonError("Engine not supported")
 
 
 def split_content(workspace: dict, content: str):
+    text_splitter = _get_text_splitter(workspace)
+
+    text_data = text_splitter.split_text(content)
+    text_data = [text.replace("\x00", "\uFFFD") for text in text_data]
+
+    return text_data
+
+
+def split_content_stream(workspace: dict, blocks: Iterable[str]) -> Iterator[str]:
+    """
+    Same as split_content for a document read as a sequence of text blocks,
+    e.g. a streamed S3 body. Only about STREAM_BUFFER_CHARACTERS of text are
+    held at a time. The last chunk of every buffer is split again together
+    with the next blocks, so chunks keep their overlap across buffers.
+    """
+    text_splitter = _get_text_splitter(workspace, add_start_index=True)
+
+    buffer = ""
+    for block in blocks:
+        buffer += block
+        if len(buffer) < STREAM_BUFFER_CHARACTERS:
+            continue
+
+        documents = text_splitter.create_documents([buffer])
+        if len(documents) < 2:
+            continue
+
+        for document in documents[:-1]:
+            yield document.page_content.replace("\x00", "\uFFFD")
+        buffer = buffer[documents[-1].metadata["start_index"] :]
+
+    for text in text_splitter.split_text(buffer):
+        yield text.replace("\x00", "\uFFFD")
+
+
+def _get_text_splitter(workspace: dict, add_start_index: bool = False):
     chunking_strategy = workspace["chunking_strategy"]
     chunk_size = workspace["chunk_size"]
     chunk_overlap = workspace["chunk_overlap"]
 
     if chunking_strategy == "recursive":
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len
+        length_function = len
+    elif chunking_strategy == "token":
+        # chunk_size and chunk_overlap are tokens of the embeddings model
+        embeddings_model = genai_core.embeddings.get_workspace_embeddings_model(
+            workspace
         )
+        if embeddings_model is None:
+            raise CommonError("Embeddings model not found")
 
-        text_data = text_splitter.split_text(content)
-        text_data = [text.replace("\x00", "\uFFFD") for text in text_data]
+        length_function = genai_core.embeddings.get_token_length_function(
+            embeddings_model
+        )
+        token_limit = genai_core.embeddings.get_token_limit(embeddings_model)
+        if length_function is genai_core.embeddings.estimate_token_length:
+            # The splitter sums the length of every piece, rounding each
+            # piece up would count short words as whole extra tokens
+            def length_function(text: str) -> float:
+                return len(text) / 4
 
-        return text_data
+            # Estimates run low on text with fewer characters per token
+            token_limit = int(
+                token_limit * genai_core.embeddings.ESTIMATED_TOKEN_LIMIT_RATIO
+            )
 
-    raise CommonError("Chunking strategy not supported")
+        # Larger chunks would be split again and averaged by generate_embeddings
+        chunk_size = min(
+            chunk_size,
+            token_limit,
+            genai_core.embeddings.MAX_INPUT_CHARACTERS // 4,
+        )
+        chunk_overlap = min(chunk_overlap, chunk_size // 2)
+    else:
+        raise CommonError("Chunking strategy not supported")
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function,
+        add_start_index=add_start_index,
+    )
 
 
 def store_chunks_on_s3(
@@ -109,12 +635,94 @@ def store_chunks_on_s3(
     document_sub_id: Optional[str],
     chunk_ids: List[str],
     chunks: List[str],
-):
+) -> List[dict]:
+    """
+    Store chunks as a single pack object of JSON lines. Every line is
+    compressed as its own gzip member, so the pack is a valid .jsonl.gz file
+    and any chunk can be read alone with a byte range request.
+
+    Returns:
+        Location of every chunk: chunk_id, pack key, offset and length
+    """
+    if not chunks:
+        return []
+
+    prefix = get_chunks_prefix(workspace_id, document_id, document_sub_id)
+    pack = f"{prefix}/{uuid.uuid4()}.jsonl.gz"
+
+    body = bytearray()
+    locations = []
     for chunk_id, chunk in zip(chunk_ids, chunks):
-        path = f"{workspace_id}/{document_id}/chunks/{chunk_id}.txt"
-        if document_sub_id:
-            path = (
-                f"{workspace_id}/{document_id}/{document_sub_id}/chunks/{chunk_id}.txt"
-            )
+        line = json.dumps({"chunk_id": str(chunk_id), "content": chunk}) + "\n"
+        record = gzip.compress(line.encode("utf-8"), mtime=0)
+        locations.append(
+            {
+                "chunk_id": str(chunk_id),
+                "pack": pack,
+                "offset": len(body),
+                "length": len(record),
+            }
+        )
+        body += record
+
+    # Managed upload, large packs are sent as concurrent multipart parts
+    s3.Object(PROCESSING_BUCKET_NAME, pack).upload_fileobj(
+        io.BytesIO(body), ExtraArgs={"ContentType": "application/gzip"}
+    )
+
+    return locations
+
+
+def get_chunks_from_s3(
+    workspace_id: str,
+    document_id: str,
+    document_sub_id: Optional[str],
+    chunk_ids: Optional[List[str]] = None,
+) -> Dict[str, str]:
+    """
+    Read chunks of a document from their packs with byte range requests
+
+    Returns:
+        Dictionary of chunk_id to content, all chunks when chunk_ids is None
+    """
+    prefix = get_chunks_prefix(workspace_id, document_id, document_sub_id)
+    manifest = _get_chunks_manifest(f"{prefix}/manifest.json")
+    if manifest is None:
+        raise CommonError("Chunks manifest not found")
+
+    wanted = None if chunk_ids is None else {str(chunk_id) for chunk_id in chunk_ids}
+    locations = [
+        item
+        for item in manifest
+        if "pack" in item and (wanted is None or item["chunk_id"] in wanted)
+    ]
+    if len(locations) == 0:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(16, len(locations))) as pool:
+        contents = list(pool.map(read_chunk, locations))
+
+    return {
+        location["chunk_id"]: content for location, content in zip(locations, contents)
+    }
+
+
+def read_chunk(location: dict) -> str:
+    start = location["offset"]
+    end = start + location["length"] - 1
+    response = s3.Object(PROCESSING_BUCKET_NAME, location["pack"]).get(
+        Range=f"bytes={start}-{end}"
+    )
+    record = json.loads(gzip.decompress(response["Body"].read()))
+
+    return record["content"]
+
+
+def get_chunks_prefix(
+    workspace_id: str, document_id: str, document_sub_id: Optional[str]
+) -> str:
+    prefix = f"{workspace_id}/{document_id}"
+    if document_sub_id:
+        prefix = f"{prefix}/{document_sub_id}"
 
-        s3.Object(PROCESSING_BUCKET_NAME, path).put(Body=chunk)
+    return f"{prefix}/chunks"
@@ -295,10 +295,12 @@ def _get_standard_bedrock_client(service_name: str) -> Any:
     if not region:
         region = "us-east-1"  # Default region
 
+    # Embeddings fan out concurrent requests on a single client
     client_config = Config(
         retries={"max_attempts": 10, "mode": "adaptive"},
         connect_timeout=5,
         read_timeout=60,
+        max_pool_connections=50,
     )
 
     client = boto3.client(service_name, region_name=region, config=client_config)
@@ -1,8 +1,8 @@
 import os
-import json
 import genai_core.types
 import genai_core.clients
 import genai_core.parameters
+import genai_core.utils.sagemaker
 from typing import Optional
 
 
@@ -50,19 +50,15 @@ def _rank_passages_sagemaker(
 ):
     client = genai_core.clients.get_sagemaker_client()
 
-    response = client.invoke_endpoint(
-        EndpointName=SAGEMAKER_RAG_MODELS_ENDPOINT,
-        ContentType="application/json",
-        Body=json.dumps(
-            {
-                "type": "cross-encoder",
-                "model": model.name,
-                "input": input,
-                "passages": passages,
-            }
-        ),
+    ret_value = genai_core.utils.sagemaker.invoke_rag_models_endpoint(
+        client,
+        SAGEMAKER_RAG_MODELS_ENDPOINT,
+        {
+            "type": "cross-encoder",
+            "model": model.name,
+            "input": input,
+            "passages": passages,
+        },
     )
 
-    ret_value = json.loads(response["Body"].read().decode())
-
     return ret_value
@@ -0,0 +1,254 @@
+import io
+import os
+import re
+import hashlib
+import threading
+from typing import Optional
+
+import boto3
+import botocore
+import numpy as np
+from aws_lambda_powertools import Logger
+from genai_core.types import CommonError
+
+PROCESSING_BUCKET_NAME = os.environ.get("PROCESSING_BUCKET_NAME", "")
+# Chunks whose 64 bit SimHash signatures differ in at most this many bits
+# are near-duplicates
+DEDUP_MAX_DISTANCE = 6
+DEDUP_SHINGLE_SIZE = 2
+# More bands than allowed differing bits: near-duplicates share one band
+SIGNATURE_BANDS = 8
+SIGNATURE_BAND_BITS = 64 // SIGNATURE_BANDS
+SAVE_ATTEMPTS = 5
+
+RECORD_DTYPE = np.dtype(
+    [("signature", "<u8"), ("document", "<u8"), ("sub_document", "<u8")]
+)
+
+s3 = boto3.client("s3")
+logger = Logger()
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def is_dedup_enabled(workspace: dict) -> bool:
+    return bool(workspace.get("chunk_dedup", False))
+
+
+def get_signature(text: str) -> int:
+    tokens = re.findall(r"\w+", text.lower())
+    if len(tokens) == 0:
+        return 0
+
+    shingles = [
+        " ".join(tokens[idx : idx + DEDUP_SHINGLE_SIZE])
+        for idx in range(max(1, len(tokens) - DEDUP_SHINGLE_SIZE + 1))
+    ]
+    hashes = np.array([_hash64(shingle) for shingle in shingles], dtype="<u8")
+    bits = np.unpackbits(hashes.view(np.uint8), bitorder="little").reshape(-1, 64)
+    signature_bits = bits.sum(axis=0) * 2 > len(shingles)
+
+    return int.from_bytes(
+        np.packbits(signature_bits, bitorder="little").tobytes(), "little"
+    )
+
+
+def get_distances(signatures: np.ndarray, signature: int) -> np.ndarray:
+    xor = np.bitwise_xor(signatures, np.uint64(signature))
+
+    return np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+
+class SignatureIndex:
+    """
+    SimHash signatures of the chunks of a workspace with the document and
+    sub document they belong to, 24 bytes per chunk. Every band of the
+    signatures is kept sorted, candidates sharing a band are compared bit by
+    bit.
+    """
+
+    def __init__(self, records: np.ndarray, etag: Optional[str] = None):
+        self.records = records
+        self.etag = etag
+        self._bands = []
+
+        for band in range(SIGNATURE_BANDS):
+            values = _get_band(records["signature"], band)
+            order = np.argsort(values, kind="stable")
+            self._bands.append((values[order], order))
+
+    def find_near(self, signature: int, exclude: tuple) -> bool:
+        candidates = []
+        for band, (values, order) in enumerate(self._bands):
+            value = _get_band(np.array([signature], dtype="<u8"), band)[0]
+            start = np.searchsorted(values, value, side="left")
+            end = np.searchsorted(values, value, side="right")
+            candidates.append(order[start:end])
+
+        candidates = np.unique(np.concatenate(candidates))
+        if len(candidates) == 0:
+            return False
+
+        records = self.records[candidates]
+        owned = (records["document"] == exclude[0]) & (
+            records["sub_document"] == exclude[1]
+        )
+        distances = get_distances(records["signature"][~owned], signature)
+
+        return bool(np.any(distances <= DEDUP_MAX_DISTANCE))
+
+
+class ChunkDeduplicator:
+    """
+    Skips chunks of a document or sub document that are near-duplicates of
+    chunks already stored in the workspace or earlier in the same document.
+    The signatures of the document replace its previous ones on save.
+    """
+
+    def __init__(
+        self, workspace_id: str, document_id: str, document_sub_id: Optional[str]
+    ):
+        self.workspace_id = workspace_id
+        self.owner = (_hash64(document_id), _hash64(document_sub_id or ""))
+        self.index = get_signature_index(workspace_id)
+        self.signatures = []
+        self.skipped = 0
+
+    def is_duplicate(self, chunk: str) -> bool:
+        signature = get_signature(chunk)
+        if self.index.find_near(signature, self.owner) or self._find_added(signature):
+            self.skipped += 1
+            return True
+
+        self.signatures.append(signature)
+        return False
+
+    def add(self, chunk: str):
+        self.signatures.append(get_signature(chunk))
+
+    def save(self):
+        records = np.zeros(len(self.signatures), dtype=RECORD_DTYPE)
+        records["signature"] = self.signatures
+        records["document"] = self.owner[0]
+        records["sub_document"] = self.owner[1]
+
+        _update_signature_index(
+            self.workspace_id,
+            lambda current: _is_owned_by(current, *self.owner),
+            records,
+        )
+
+        if self.skipped:
+            logger.info(
+                "Near-duplicate chunks skipped",
+                workspace_id=self.workspace_id,
+                skipped=self.skipped,
+            )
+
+    def _find_added(self, signature: int) -> bool:
+        if not self.signatures:
+            return False
+
+        distances = get_distances(np.array(self.signatures, dtype="<u8"), signature)
+
+        return bool(np.any(distances <= DEDUP_MAX_DISTANCE))
+
+
+def get_signature_index(workspace_id: str) -> SignatureIndex:
+    with _indexes_lock:
+        index = _indexes.get(workspace_id)
+
+    key = _get_index_key(workspace_id)
+    args = {"IfNoneMatch": index.etag} if index and index.etag else {}
+    try:
+        response = s3.get_object(Bucket=PROCESSING_BUCKET_NAME, Key=key, **args)
+    except botocore.exceptions.ClientError as error:
+        code = error.response.get("Error", {}).get("Code")
+        if code in ["304", "NotModified"]:
+            return index
+        if code != "NoSuchKey":
+            raise error
+
+        index = SignatureIndex(np.zeros(0, dtype=RECORD_DTYPE))
+    else:
+        records = np.load(io.BytesIO(response["Body"].read()), allow_pickle=False)
+        index = SignatureIndex(records, response["ETag"])
+
+    with _indexes_lock:
+        _indexes[workspace_id] = index
+
+    return index
+
+
+def remove_document(workspace_id: str, document_id: str):
+    document = _hash64(document_id)
+
+    _update_signature_index(
+        workspace_id,
+        lambda current: current["document"] == document,
+        np.zeros(0, dtype=RECORD_DTYPE),
+    )
+
+
+def _update_signature_index(workspace_id: str, removed, added: np.ndarray):
+    """
+    Conditional writes on the index ETag, a concurrent ingestion of the same
+    workspace makes the write fail and the update is applied again on top.
+    """
+    key = _get_index_key(workspace_id)
+
+    for _ in range(SAVE_ATTEMPTS):
+        index = get_signature_index(workspace_id)
+        current = index.records
+        mask = removed(current)
+        if not np.any(mask) and len(added) == 0:
+            return
+
+        records = np.concatenate([current[~mask], added])
+        body = io.BytesIO()
+        np.save(body, records, allow_pickle=False)
+
+        condition = {"IfMatch": index.etag} if index.etag else {"IfNoneMatch": "*"}
+        try:
+            response = s3.put_object(
+                Bucket=PROCESSING_BUCKET_NAME,
+                Key=key,
+                Body=body.getvalue(),
+                **condition,
+            )
+        except botocore.exceptions.ClientError as error:
+            code = error.response.get("Error", {}).get("Code")
+            if code not in ["PreconditionFailed", "ConditionalRequestConflict"]:
+                raise error
+
+            logger.info("Signature index changed, retrying", workspace_id=workspace_id)
+            continue
+
+        with _indexes_lock:
+            _indexes[workspace_id] = SignatureIndex(records, response["ETag"])
+
+        return
+
+    raise CommonError("Signature index update failed, too many concurrent writes")
+
+
+def _is_owned_by(records: np.ndarray, document: int, sub_document: int) -> np.ndarray:
+    return (records["document"] == document) & (records["sub_document"] == sub_document)
+
+
+def _get_band(signatures: np.ndarray, band: int) -> np.ndarray:
+    shift = np.uint64(band * SIGNATURE_BAND_BITS)
+    mask = np.uint64((1 << SIGNATURE_BAND_BITS) - 1)
+
+    return (signatures >> shift) & mask
+
+
+def _get_index_key(workspace_id: str) -> str:
+    return f"{workspace_id}/dedup/signatures.npy"
+
+
+def _hash64(value: str) -> int:
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+
+    return int.from_bytes(digest, "little")
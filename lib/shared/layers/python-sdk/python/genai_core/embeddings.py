@@ -1,22 +1,61 @@
 import json
+import math
 import os
 import random
+import threading
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 
 import botocore
 import numpy as np
 from aws_lambda_powertools import Logger
 
 import genai_core.clients
+import genai_core.embeddings_cache
+import genai_core.local_embeddings
 import genai_core.parameters
+import genai_core.utils.sagemaker
 from genai_core.model_providers import get_model_provider
 from genai_core.types import CommonError, Task
+from genai_core.types import EmbeddingsBatch, EmbeddingsBatchPlan
 from genai_core.types import EmbeddingsModel, Provider
 
 SAGEMAKER_RAG_MODELS_ENDPOINT = os.environ.get("SAGEMAKER_RAG_MODELS_ENDPOINT")
+BEDROCK_EMBEDDINGS_MAX_CONCURRENCY = int(
+    os.environ.get("BEDROCK_EMBEDDINGS_MAX_CONCURRENCY", 8)
+)
+# Longer texts are split and their embeddings averaged
+MAX_INPUT_CHARACTERS = 10000
+# Share of the model window used by chunks measured with estimated tokens
+ESTIMATED_TOKEN_LIMIT_RATIO = 0.75
 logger = Logger()
 
+# Maximum texts and total tokens sent in a single provider call
+# https://docs.cohere.com/v2/reference/embed
+# https://platform.openai.com/docs/api-reference/embeddings/create
+EMBEDDINGS_BATCH_LIMITS = {
+    # Titan takes one text per request, a batch is fanned out concurrently
+    Provider.AMAZON.value: {"max_items": 100, "max_tokens": None},
+    Provider.COHERE.value: {"max_items": 96, "max_tokens": 96 * 512},
+    Provider.OPENAI.value: {"max_items": 2048, "max_tokens": 300000},
+    Provider.SAGEMAKER.value: {"max_items": 64, "max_tokens": 64 * 512},
+    # Sub-batched again by LOCAL_EMBEDDINGS_BATCH_SIZE inside the session
+    Provider.LOCAL.value: {"max_items": 256, "max_tokens": None},
+    "default": {"max_items": 50, "max_tokens": None},
+}
+
+# Output sizes the provider can generate natively, other reduced sizes are
+# produced by truncating and re-normalizing the full size vectors
+# https://docs.aws.amazon.com/bedrock/latest/userguide/model-parameters-titan-embed-text.html
+# https://platform.openai.com/docs/api-reference/embeddings/create#embeddings-create-dimensions
+NATIVE_OUTPUT_DIMENSIONS = {
+    "amazon.titan-embed-text-v2:0": [256, 512, 1024],
+}
+NATIVE_OUTPUT_DIMENSIONS_PREFIXES = ["text-embedding-3-"]
+
+_tiktoken_encoding = None
+
 
 def get_model_token_limit(model_name):
     # Extract provider from model name
@@ -35,13 +74,158 @@ def get_model_token_limit(model_name):
     return PROVIDER_TOKEN_LIMITS.get(model_provider, PROVIDER_TOKEN_LIMITS["default"])
 
 
+def get_token_limit(model: EmbeddingsModel) -> int:
+    """Tokens of a text the model reads"""
+    if model.provider == Provider.LOCAL.value:
+        return genai_core.local_embeddings.get_local_token_limit(model.name)
+
+    return get_model_token_limit(model.name)
+
+
+def estimate_token_length(text: str) -> int:
+    return math.ceil(len(text) / 4)
+
+
+def get_token_length_function(model: EmbeddingsModel) -> Callable[[str], int]:
+    """
+    Get a function returning the number of tokens of a text for the model.
+    OpenAI models are measured with tiktoken and local models with their own
+    tokenizer. The tokenizers of Bedrock and SageMaker models are not available
+    here, their lengths are estimated at 4 characters per token. This is only
+    an approximation, code and non-Latin scripts use more tokens.
+    """
+    if model.provider == Provider.OPENAI.value:
+        encoding = _get_tiktoken_encoding()
+        if encoding is not None:
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+    if model.provider == Provider.LOCAL.value:
+        tokenizer = genai_core.local_embeddings.get_local_tokenizer(model.name)
+
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    return estimate_token_length
+
+
+def _get_tiktoken_encoding():
+    global _tiktoken_encoding
+    if _tiktoken_encoding is None:
+        try:
+            import tiktoken
+
+            _tiktoken_encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The encoding files may not be reachable, e.g. in a private subnet
+            logger.warning(f"tiktoken is not available: {str(e)}")
+            _tiktoken_encoding = False
+
+    return _tiktoken_encoding or None
+
+
+def get_batch_limits(model: EmbeddingsModel) -> dict:
+    if model.provider == Provider.BEDROCK.value:
+        model_provider = model.name.split(".")[0]
+    else:
+        model_provider = model.provider
+
+    return EMBEDDINGS_BATCH_LIMITS.get(
+        model_provider, EMBEDDINGS_BATCH_LIMITS["default"]
+    )
+
+
+def plan_embeddings_batches(
+    model: EmbeddingsModel,
+    input: list[str],
+    max_items: Optional[int] = None,
+    length_function: Optional[Callable[[str], int]] = None,
+) -> EmbeddingsBatchPlan:
+    """
+    Pack texts, in order, into as few provider calls as the provider's item
+    and token limits allow. A text above the token limit gets its own batch.
+    """
+    limits = get_batch_limits(model)
+    max_items = min(max_items or limits["max_items"], limits["max_items"])
+    max_tokens = limits["max_tokens"]
+    if length_function is None and max_tokens is None:
+        # Counts are only logged, local models are not tokenized twice
+        length_function = estimate_token_length
+    length_function = length_function or get_token_length_function(model)
+
+    batches = []
+    current = EmbeddingsBatch(indices=[], tokens=0)
+    for idx, text in enumerate(input):
+        tokens = length_function(text)
+        if current.indices and (
+            len(current.indices) >= max_items
+            or (max_tokens is not None and current.tokens + tokens > max_tokens)
+        ):
+            batches.append(current)
+            current = EmbeddingsBatch(indices=[], tokens=0)
+
+        current.indices.append(idx)
+        current.tokens += tokens
+
+    if current.indices:
+        batches.append(current)
+
+    return EmbeddingsBatchPlan(
+        max_items=max_items,
+        max_tokens=max_tokens,
+        batches=batches,
+        total_tokens=sum(batch.tokens for batch in batches),
+    )
+
+
 def generate_embeddings(
-    model: EmbeddingsModel, input: list[str], task: str = "store", batch_size: int = 50
+    model: EmbeddingsModel,
+    input: list[str],
+    task: str = "store",
+    batch_size: Optional[int] = None,
+) -> list[list[float]]:
+    cache = genai_core.embeddings_cache.get_embeddings_cache()
+    if cache is None:
+        return _generate_embeddings(model, input, task, batch_size)
+
+    task_name = task.value if isinstance(task, Task) else task
+    model_name = model.name
+    if model.output_dimensions:
+        model_name = f"{model.name}@{model.output_dimensions}"
+    keys = [
+        genai_core.embeddings_cache.get_cache_key(
+            model.provider, model_name, task_name, text
+        )
+        for text in input
+    ]
+    cached = cache.get_many(list(dict.fromkeys(keys)))
+
+    # Only texts that are not cached yet are sent to the provider, once each
+    missing = {}
+    for key, text in zip(keys, input):
+        if key not in cached and key not in missing:
+            missing[key] = text
+
+    if missing:
+        embeddings = _generate_embeddings(
+            model, list(missing.values()), task, batch_size
+        )
+        generated = dict(zip(missing.keys(), embeddings))
+        cache.put_many(generated)
+        cached.update(generated)
+
+    logger.debug(
+        f"Embeddings cache: {len(input) - len(missing)} hits, {len(missing)} misses"
+    )
+
+    return [cached[key] for key in keys]
+
+
+def _generate_embeddings(
+    model: EmbeddingsModel, input: list[str], task: str, batch_size: Optional[int]
 ) -> list[list[float]]:
     try:
         # Get model-specific token limit
         token_limit = get_model_token_limit(model.name)
-        char_limit = min(token_limit * 4, 10000)  # Use existing 10000 char limit as max
+        char_limit = min(token_limit * 4, MAX_INPUT_CHARACTERS)
 
         # Chunk inputs and track mapping
         chunked_input = []
@@ -64,19 +248,27 @@ def generate_embeddings(
 
             chunked_input.extend(chunks)
 
-        ret_value = []
-        batch_split = [
-            chunked_input[i : i + batch_size]
-            for i in range(0, len(chunked_input), batch_size)
-        ]
+        plan = plan_embeddings_batches(model, chunked_input, max_items=batch_size)
+        logger.debug(
+            f"Embeddings batch plan: {len(chunked_input)} texts, "
+            f"{len(plan.batches)} batches, {plan.total_tokens} estimated tokens"
+        )
 
-        for batch in batch_split:
+        ret_value = []
+        for planned_batch in plan.batches:
+            batch = [chunked_input[idx] for idx in planned_batch.indices]
             if model.provider == Provider.OPENAI.value:
                 ret_value.extend(_generate_embeddings_openai(model, batch))
             elif model.provider == Provider.BEDROCK.value:
                 ret_value.extend(_generate_embeddings_bedrock(model, batch, task))
             elif model.provider == Provider.SAGEMAKER.value:
                 ret_value.extend(_generate_embeddings_sagemaker(model, batch))
+            elif model.provider == Provider.LOCAL.value:
+                ret_value.extend(
+                    genai_core.local_embeddings.generate_embeddings_local(
+                        model.name, batch
+                    )
+                )
             else:
                 raise CommonError(f"Unknown provider: {model.provider}")
 
@@ -93,7 +285,7 @@ def generate_embeddings(
                 ]
                 final_embeddings.append(avg_embedding)
 
-        return final_embeddings
+        return reduce_dimensions(final_embeddings, model.output_dimensions)
     except Exception as e:
         logger.error(f"Error in generate_embeddings: {str(e)}")
         raise CommonError(f"Failed to generate embeddings: {str(e)}")
@@ -107,13 +299,70 @@ def get_embeddings_model(provider: Provider, name: str) -> Optional[EmbeddingsMo
     return get_model_provider().get_embeddings_model(provider, name)
 
 
+def get_workspace_embeddings_model(workspace: dict) -> Optional[EmbeddingsModel]:
+    """
+    Get the embeddings model of a workspace, with output_dimensions set when
+    the workspace was created with fewer dimensions than the model produces
+    """
+    model = get_embeddings_model(
+        workspace["embeddings_model_provider"], workspace["embeddings_model_name"]
+    )
+    if model is None:
+        return None
+
+    dimensions = int(workspace["embeddings_model_dimensions"])
+    if dimensions < model.dimensions:
+        model = model.model_copy(update={"output_dimensions": dimensions})
+
+    return model
+
+
+def get_native_output_dimensions(model: EmbeddingsModel) -> Optional[int]:
+    """Reduced size to request from the provider, None when it is not supported"""
+    dimensions = model.output_dimensions
+    if not dimensions:
+        return None
+
+    if dimensions in NATIVE_OUTPUT_DIMENSIONS.get(model.name, []):
+        return dimensions
+
+    if model.provider == Provider.OPENAI.value and any(
+        model.name.startswith(prefix) for prefix in NATIVE_OUTPUT_DIMENSIONS_PREFIXES
+    ):
+        return dimensions
+
+    return None
+
+
+def reduce_dimensions(
+    embeddings: list[list[float]], dimensions: Optional[int]
+) -> list[list[float]]:
+    """Truncate embeddings to the first dimensions and re-normalize them"""
+    if not dimensions or not embeddings:
+        return embeddings
+    if all(len(embedding) <= dimensions for embedding in embeddings):
+        return embeddings
+
+    ret_value = np.array(embeddings, dtype=np.float64)[:, :dimensions]
+    norms = np.linalg.norm(ret_value, axis=1, keepdims=True)
+    ret_value = ret_value / np.maximum(norms, 1e-12)
+
+    return ret_value.tolist()
+
+
 def _generate_embeddings_openai(model: EmbeddingsModel, input: list[str]):
     openai = genai_core.clients.get_openai_client()
 
     if not openai:
         raise CommonError("OpenAI API is not available. Please set OPENAI_API_KEY.")
 
-    data = openai.embeddings.create(input=input, model=model.name).data
+    dimensions = get_native_output_dimensions(model)
+    if dimensions:
+        data = openai.embeddings.create(
+            input=input, model=model.name, dimensions=dimensions
+        ).data
+    else:
+        data = openai.embeddings.create(input=input, model=model.name).data
     ret_value = [x.embedding for x in data]
 
     return ret_value
@@ -134,25 +383,114 @@ def _generate_embeddings_bedrock(model: EmbeddingsModel, input: list[str], task:
         raise CommonError(f'Unknown embeddings provider "{model_provider}"')
 
 
-def _generate_embeddings_amazon(model: EmbeddingsModel, input: list[str], bedrock):
-    ret_value = []
-    for value in input:
-        body = json.dumps({"inputText": value})
+class _AdaptiveConcurrencyLimiter(object):
+    """
+    Caps the number of in-flight requests. The cap is halved when a request
+    is throttled and grows back by one after a full window of successes.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.successes = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool):
+        with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self.successes = 0
+            elif self.limit < self.max_concurrency:
+                self.successes += 1
+                if self.successes >= self.limit:
+                    self.limit += 1
+                    self.successes = 0
+            self.condition.notify_all()
+
+
+# One limiter per model and cap, shared by the calls of the execution
+# environment so that throttling slows down the following calls too
+_amazon_limiters: dict[tuple[str, int], _AdaptiveConcurrencyLimiter] = {}
+_amazon_limiters_lock = threading.Lock()
+
+
+def _get_amazon_limiter(
+    model: EmbeddingsModel, max_concurrency: int
+) -> _AdaptiveConcurrencyLimiter:
+    key = (model.name, max_concurrency)
+    with _amazon_limiters_lock:
+        limiter = _amazon_limiters.get(key)
+        if limiter is None:
+            limiter = _AdaptiveConcurrencyLimiter(max_concurrency)
+            _amazon_limiters[key] = limiter
+
+    return limiter
+
+
+def _generate_embeddings_amazon(
+    model: EmbeddingsModel,
+    input: list[str],
+    bedrock,
+    max_concurrency: int = BEDROCK_EMBEDDINGS_MAX_CONCURRENCY,
+):
+    # Titan accepts a single text per request, the client is shared by all workers
+    limiter = _get_amazon_limiter(model, max_concurrency)
+    max_workers = min(limiter.max_concurrency, len(input))
+
+    def invoke(value: str):
+        return _invoke_amazon_model(model, value, bedrock, limiter)
+
+    if max_workers <= 1:
+        ret_value = [invoke(value) for value in input]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            ret_value = list(pool.map(invoke, input))
+
+    ret_value = np.array(ret_value)
+    ret_value = ret_value / np.linalg.norm(ret_value, axis=1, keepdims=True)
+    ret_value = ret_value.tolist()
+    return ret_value
+
+
+def _invoke_amazon_model(
+    model: EmbeddingsModel, value: str, bedrock, limiter: _AdaptiveConcurrencyLimiter
+):
+    request = {"inputText": value}
+    dimensions = get_native_output_dimensions(model)
+    if dimensions:
+        request["dimensions"] = dimensions
+    body = json.dumps(request)
+
+    # Throttled requests are retried with backoff by the client's adaptive
+    # retry mode, a retried request only lowers the in-flight cap
+    throttled = False
+    limiter.acquire()
+    try:
         response = bedrock.invoke_model(
             body=body,
             modelId=model.name,
             accept="application/json",
             contentType="application/json",
         )
+        retry_attempts = response.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        throttled = retry_attempts > 0
         response_body = json.loads(response.get("body").read())
-        embedding = response_body.get("embedding")
 
-        ret_value.append(embedding)
-
-    ret_value = np.array(ret_value)
-    ret_value = ret_value / np.linalg.norm(ret_value, axis=1, keepdims=True)
-    ret_value = ret_value.tolist()
-    return ret_value
+        return response_body.get("embedding")
+    except botocore.exceptions.ClientError as error:
+        error_code = error.response.get("Error", {}).get("Code")
+        throttled = error_code == "ThrottlingException"
+        raise error
+    finally:
+        limiter.release(throttled)
 
 
 def _generate_embeddings_cohere(
@@ -180,16 +518,12 @@ def _generate_embeddings_sagemaker(model: EmbeddingsModel, input: list[str]):
     max_retries = 5
     for attempt in range(max_retries):
         try:
-            response = client.invoke_endpoint(
-                EndpointName=SAGEMAKER_RAG_MODELS_ENDPOINT,
-                ContentType="application/json",
-                Body=json.dumps(
-                    {"type": "embeddings", "model": model.name, "input": input}
-                ),
+            ret_value = genai_core.utils.sagemaker.invoke_rag_models_endpoint(
+                client,
+                SAGEMAKER_RAG_MODELS_ENDPOINT,
+                {"type": "embeddings", "model": model.name, "input": input},
             )
 
-            ret_value = json.loads(response["Body"].read().decode())
-
             return ret_value
         except botocore.exceptions.ClientError as error:
             # Check if the error is due to a 500 server error
@@ -0,0 +1,273 @@
+import hashlib
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import boto3
+import botocore
+import numpy as np
+from aws_lambda_powertools import Logger
+
+EMBEDDINGS_CACHE_MAX_BYTES = int(
+    os.environ.get("EMBEDDINGS_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+)
+EMBEDDINGS_CACHE_DIR = os.environ.get("EMBEDDINGS_CACHE_DIR")
+EMBEDDINGS_CACHE_BUCKET_NAME = os.environ.get("EMBEDDINGS_CACHE_BUCKET_NAME")
+EMBEDDINGS_CACHE_PREFIX = os.environ.get("EMBEDDINGS_CACHE_PREFIX", "embeddings-cache")
+
+logger = Logger()
+
+
+def get_cache_key(provider: str, model_name: str, task: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    return f"{provider}:{model_name}:{task}:{digest}"
+
+
+def _encode(embedding: list[float]) -> bytes:
+    return np.asarray(embedding, dtype=np.float64).tobytes()
+
+
+def _decode(data: bytes) -> list[float]:
+    return np.frombuffer(data, dtype=np.float64).tolist()
+
+
+def _storage_name(key: str) -> str:
+    # Model names may contain "/" or ":" so persistent stores use a flat digest
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class EmbeddingsCacheStore(ABC):
+    """Interface for embeddings cache tiers"""
+
+    @abstractmethod
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """
+        Look up embeddings by cache key
+
+        Returns:
+            Dictionary with the keys that were found, missing keys are omitted
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        raise NotImplementedError
+
+
+class LRUEmbeddingsCacheStore(EmbeddingsCacheStore):
+    """In-process tier, evicts least recently used entries above max_bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_in_bytes = 0
+        self._items: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        ret_value = {}
+        with self._lock:
+            for key in keys:
+                value = self._items.get(key)
+                if value is not None:
+                    self._items.move_to_end(key)
+                    ret_value[key] = value.tolist()
+
+        return ret_value
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        with self._lock:
+            for key, embedding in items.items():
+                value = np.asarray(embedding, dtype=np.float64)
+                if value.nbytes > self.max_bytes:
+                    continue
+
+                current = self._items.pop(key, None)
+                if current is not None:
+                    self.size_in_bytes -= current.nbytes
+
+                self._items[key] = value
+                self.size_in_bytes += value.nbytes
+
+            while self.size_in_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size_in_bytes -= evicted.nbytes
+
+
+class FileEmbeddingsCacheStore(EmbeddingsCacheStore):
+    """Persistent tier backed by a local directory (e.g. EFS or /tmp)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        name = _storage_name(key)
+
+        return os.path.join(self.directory, name[:2], f"{name}.bin")
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        ret_value = {}
+        for key in keys:
+            try:
+                with open(self._path(key), "rb") as f:
+                    ret_value[key] = _decode(f.read())
+            except FileNotFoundError:
+                continue
+
+        return ret_value
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        for key, embedding in items.items():
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Write to a temporary file first so readers never see partial data
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_encode(embedding))
+            os.replace(tmp_path, path)
+
+
+class S3EmbeddingsCacheStore(EmbeddingsCacheStore):
+    """Persistent tier backed by an S3 bucket, shared across functions and jobs"""
+
+    def __init__(self, bucket_name: str, prefix: str, client=None, max_workers=16):
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.client = client if client else boto3.client("s3")
+        self.max_workers = max_workers
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{_storage_name(key)}"
+
+    def _get(self, key: str) -> Optional[list[float]]:
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket_name, Key=self._object_key(key)
+            )
+        except botocore.exceptions.ClientError as error:
+            error_code = error.response.get("Error", {}).get("Code")
+            if error_code in ("NoSuchKey", "404"):
+                return None
+            raise error
+
+        return _decode(response["Body"].read())
+
+    def _put(self, key: str, embedding: list[float]):
+        self.client.put_object(
+            Bucket=self.bucket_name, Key=self._object_key(key), Body=_encode(embedding)
+        )
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        if len(keys) == 0:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(keys))) as pool:
+            values = list(pool.map(self._get, keys))
+
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        if len(items) == 0:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            list(pool.map(lambda item: self._put(*item), items.items()))
+
+
+class EmbeddingsCache(object):
+    """
+    Two tier embeddings cache, an in-process LRU in front of an optional
+    persistent store. Persistent store failures are logged and treated as misses.
+    """
+
+    def __init__(
+        self,
+        memory: Optional[EmbeddingsCacheStore],
+        persistent: Optional[EmbeddingsCacheStore] = None,
+    ):
+        self.memory = memory
+        self.persistent = persistent
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        ret_value = self.memory.get_many(keys) if self.memory is not None else {}
+
+        missing = [key for key in keys if key not in ret_value]
+        if missing and self.persistent is not None:
+            try:
+                found = self.persistent.get_many(missing)
+            except Exception as e:
+                logger.warning(f"Embeddings cache read failed: {str(e)}")
+                found = {}
+
+            if found and self.memory is not None:
+                self.memory.put_many(found)
+            ret_value.update(found)
+
+        self.hits += len(ret_value)
+        self.misses += len(keys) - len(ret_value)
+
+        return ret_value
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        if self.memory is not None:
+            self.memory.put_many(items)
+
+        if self.persistent is not None:
+            try:
+                self.persistent.put_many(items)
+            except Exception as e:
+                logger.warning(f"Embeddings cache write failed: {str(e)}")
+
+
+_embeddings_cache = None
+_embeddings_cache_initialized = False
+
+
+def get_embeddings_cache() -> Optional[EmbeddingsCache]:
+    """
+    Get the process-wide embeddings cache, configured from the environment
+
+    Returns:
+        EmbeddingsCache or None when caching is disabled
+    """
+    global _embeddings_cache, _embeddings_cache_initialized
+    if not _embeddings_cache_initialized:
+        _embeddings_cache = _create_embeddings_cache()
+        _embeddings_cache_initialized = True
+
+    return _embeddings_cache
+
+
+def set_embeddings_cache(cache: Optional[EmbeddingsCache]):
+    """Replace the process-wide embeddings cache, None disables caching"""
+    global _embeddings_cache, _embeddings_cache_initialized
+    _embeddings_cache = cache
+    _embeddings_cache_initialized = True
+
+
+def _create_embeddings_cache() -> Optional[EmbeddingsCache]:
+    memory = None
+    if EMBEDDINGS_CACHE_MAX_BYTES > 0:
+        memory = LRUEmbeddingsCacheStore(EMBEDDINGS_CACHE_MAX_BYTES)
+
+    persistent = None
+    if EMBEDDINGS_CACHE_BUCKET_NAME:
+        persistent = S3EmbeddingsCacheStore(
+            EMBEDDINGS_CACHE_BUCKET_NAME, EMBEDDINGS_CACHE_PREFIX
+        )
+    elif EMBEDDINGS_CACHE_DIR:
+        persistent = FileEmbeddingsCacheStore(EMBEDDINGS_CACHE_DIR)
+
+    if memory is None and persistent is None:
+        return None
+
+    return EmbeddingsCache(memory, persistent)
@@ -0,0 +1,215 @@
+import os
+import threading
+from typing import Optional
+
+import boto3
+import numpy as np
+from aws_lambda_powertools import Logger
+
+from genai_core.types import CommonError
+
+# Exported models are read from {path}/{model name}/, e.g.
+# /opt/models/sentence-transformers/all-MiniLM-L6-v2/model_quantized.onnx
+LOCAL_EMBEDDINGS_MODELS_PATH = os.environ.get(
+    "LOCAL_EMBEDDINGS_MODELS_PATH", "/opt/models"
+)
+# Optional bucket the models are downloaded from when they are not on disk, the
+# deployment points it at {prefix}/ of the processing bucket
+LOCAL_EMBEDDINGS_MODELS_BUCKET_NAME = os.environ.get(
+    "LOCAL_EMBEDDINGS_MODELS_BUCKET_NAME"
+)
+LOCAL_EMBEDDINGS_MODELS_PREFIX = os.environ.get(
+    "LOCAL_EMBEDDINGS_MODELS_PREFIX", "models"
+)
+LOCAL_EMBEDDINGS_DOWNLOAD_PATH = os.environ.get(
+    "LOCAL_EMBEDDINGS_DOWNLOAD_PATH", "/tmp/models"  # nosec B108
+)
+LOCAL_EMBEDDINGS_BATCH_SIZE = int(os.environ.get("LOCAL_EMBEDDINGS_BATCH_SIZE", 32))
+LOCAL_EMBEDDINGS_MAX_LENGTH = int(os.environ.get("LOCAL_EMBEDDINGS_MAX_LENGTH", 256))
+# 0 lets ONNX Runtime use every available core
+LOCAL_EMBEDDINGS_THREADS = int(os.environ.get("LOCAL_EMBEDDINGS_THREADS", 0))
+
+# Quantized exports are preferred when both are present
+MODEL_FILE_NAMES = ["model_quantized.onnx", "model.onnx"]
+TOKENIZER_FILE_NAME = "tokenizer.json"
+
+logger = Logger()
+
+
+class LocalEmbeddingsModel(object):
+    """Sentence transformer running in process with ONNX Runtime"""
+
+    def __init__(self, session, tokenizer, batch_size: int):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.input_names = [value.name for value in session.get_inputs()]
+
+    def embed(self, input: list[str]) -> list[list[float]]:
+        ret_value = []
+        for i in range(0, len(input), self.batch_size):
+            ret_value.extend(self._embed_batch(input[i : i + self.batch_size]))
+
+        return ret_value
+
+    def _embed_batch(self, input: list[str]) -> list[list[float]]:
+        encodings = self.tokenizer.encode_batch(input)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array(
+                [e.type_ids for e in encodings], dtype=np.int64
+            )
+
+        output = self.session.run(None, inputs)[0]
+        if output.ndim == 3:
+            # Mean pooling over the tokens that are not padding
+            mask = attention_mask[:, :, None].astype(output.dtype)
+            output = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        output = output / np.maximum(norms, 1e-12)
+
+        return output.tolist()
+
+
+_models: dict[str, LocalEmbeddingsModel] = {}
+_tokenizers: dict = {}
+_models_lock = threading.Lock()
+
+
+def get_local_embeddings_model(model_name: str) -> LocalEmbeddingsModel:
+    """
+    Get a loaded model, the first call loads it and later calls (including
+    later Lambda invocations of the same container) reuse the session
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = _load_model(model_name)
+            _models[model_name] = model
+
+    return model
+
+
+def get_local_tokenizer(model_name: str):
+    """
+    Get the tokenizer of a model without truncation or padding, used to count
+    the tokens of a text
+    """
+    tokenizer = _tokenizers.get(model_name)
+    if tokenizer is not None:
+        return tokenizer
+
+    with _models_lock:
+        tokenizer = _tokenizers.get(model_name)
+        if tokenizer is None:
+            tokenizer = _load_tokenizer(_get_model_dir(model_name))
+            _tokenizers[model_name] = tokenizer
+
+    return tokenizer
+
+
+def get_local_token_limit(model_name: str) -> int:
+    """Tokens of a text the session reads, the rest is truncated"""
+    tokenizer = get_local_tokenizer(model_name)
+
+    return LOCAL_EMBEDDINGS_MAX_LENGTH - tokenizer.num_special_tokens_to_add(False)
+
+
+def generate_embeddings_local(model_name: str, input: list[str]) -> list[list[float]]:
+    return get_local_embeddings_model(model_name).embed(input)
+
+
+def _load_model(model_name: str) -> LocalEmbeddingsModel:
+    try:
+        import onnxruntime
+    except ImportError:
+        raise CommonError(
+            "Local embeddings require the onnxruntime and tokenizers packages"
+        )
+
+    model_dir = _get_model_dir(model_name)
+    model_path = _find_model_file(model_dir)
+    if model_path is None:
+        raise CommonError(f"Local embeddings model {model_name} not found")
+
+    logger.info(f"Loading local embeddings model from {model_path}")
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = LOCAL_EMBEDDINGS_THREADS
+    session = onnxruntime.InferenceSession(
+        model_path, sess_options=options, providers=["CPUExecutionProvider"]
+    )
+
+    tokenizer = _load_tokenizer(model_dir)
+    tokenizer.enable_truncation(max_length=LOCAL_EMBEDDINGS_MAX_LENGTH)
+    tokenizer.enable_padding()
+
+    return LocalEmbeddingsModel(session, tokenizer, LOCAL_EMBEDDINGS_BATCH_SIZE)
+
+
+def _load_tokenizer(model_dir: str):
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        raise CommonError(
+            "Local embeddings require the onnxruntime and tokenizers packages"
+        )
+
+    return Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE_NAME))
+
+
+def _find_model_file(model_dir: str) -> Optional[str]:
+    for file_name in MODEL_FILE_NAMES:
+        path = os.path.join(model_dir, file_name)
+        if os.path.exists(path):
+            return path
+
+    return None
+
+
+def _get_model_dir(model_name: str) -> str:
+    model_dir = os.path.join(LOCAL_EMBEDDINGS_MODELS_PATH, model_name)
+    if _find_model_file(model_dir) is not None:
+        return model_dir
+
+    if not LOCAL_EMBEDDINGS_MODELS_BUCKET_NAME:
+        return model_dir
+
+    model_dir = os.path.join(LOCAL_EMBEDDINGS_DOWNLOAD_PATH, model_name)
+    if _find_model_file(model_dir) is None:
+        _download_model(model_name, model_dir)
+
+    return model_dir
+
+
+def _download_model(model_name: str, model_dir: str):
+    s3 = boto3.client("s3")
+    prefix = f"{LOCAL_EMBEDDINGS_MODELS_PREFIX}/{model_name}"
+    os.makedirs(model_dir, exist_ok=True)
+
+    response = s3.list_objects_v2(
+        Bucket=LOCAL_EMBEDDINGS_MODELS_BUCKET_NAME, Prefix=f"{prefix}/"
+    )
+    keys = [item["Key"] for item in response.get("Contents", [])]
+    names = [key.split("/")[-1] for key in keys]
+
+    for file_name in MODEL_FILE_NAMES:
+        if file_name in names:
+            break
+    else:
+        raise CommonError(f"Local embeddings model {model_name} not found")
+
+    # The model file is moved in place last, it marks a complete download
+    for name in [TOKENIZER_FILE_NAME, file_name]:
+        logger.info(f"Downloading {prefix}/{name}")
+        path = os.path.join(model_dir, name)
+        s3.download_file(
+            LOCAL_EMBEDDINGS_MODELS_BUCKET_NAME, f"{prefix}/{name}", f"{path}.tmp"
+        )
+        os.replace(f"{path}.tmp", path)
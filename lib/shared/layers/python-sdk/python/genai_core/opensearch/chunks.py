@@ -1,6 +1,20 @@
+import genai_core.quantization
+from aws_lambda_powertools import Logger
+from opensearchpy import helpers
 from typing import List, Optional
+from genai_core.types import CommonError, VectorPrecision
 from .client import get_open_search_client
 
+logger = Logger()
+
+# Chunks are indexed with _bulk requests bounded by documents and bytes
+BULK_CHUNK_SIZE = 500
+BULK_MAX_CHUNK_BYTES = 5 * 1024 * 1024
+# Throttled (429) documents are sent again with exponential backoff
+BULK_MAX_RETRIES = 5
+BULK_INITIAL_BACKOFF = 1
+BULK_MAX_BACKOFF = 30
+
 
 def add_chunks_open_search(
     workspace_id: str,
@@ -15,41 +29,90 @@ def add_chunks_open_search(
     chunks: List[str],
     chunk_complements: List[str],
     replace: bool,
+    vector_precision: str = VectorPrecision.FLOAT32.value,
+    full_precision: bool = False,
 ):
     index_name = workspace_id.replace("-", "")
     complements_len = len(chunk_complements) if chunk_complements else 0
     removed_vectors = 0
 
+    full_precision_embeddings = chunk_embeddings if full_precision else None
+
+    # float16 vectors are sent as floats and encoded by the faiss engine
+    if vector_precision == VectorPrecision.INT8.value:
+        chunk_embeddings = genai_core.quantization.quantize_int8(chunk_embeddings)
+    elif vector_precision == VectorPrecision.BINARY.value:
+        chunk_embeddings = genai_core.quantization.quantize_binary_packed(
+            chunk_embeddings
+        )
+
     client = get_open_search_client()
 
     if replace:
         removed_vectors = clean_chunks_open_search(workspace_id, document_id)
 
-    for idx in range(len(chunk_ids)):
-        chunk_id = chunk_ids[idx]
-        content = chunks[idx]
-        content_complement = chunk_complements[idx] if idx < complements_len else None
-
-        add_body = {
-            "chunk_id": chunk_id,
-            "workspace_id": workspace_id,
-            "document_id": document_id,
-            "document_sub_id": document_sub_id,
-            "document_type": document_type,
-            "document_sub_type": document_sub_type,
-            "path": path,
-            "title": title,
-            "content": content,
-            "content_complement": content_complement,
-            "content_embeddings": chunk_embeddings[idx],
-        }
+    def actions():
+        for idx in range(len(chunk_ids)):
+            chunk_id = chunk_ids[idx]
+            content = chunks[idx]
+            content_complement = (
+                chunk_complements[idx] if idx < complements_len else None
+            )
 
-        client.index(index=index_name, body=add_body)
+            source = {
+                "chunk_id": chunk_id,
+                "workspace_id": workspace_id,
+                "document_id": document_id,
+                "document_sub_id": document_sub_id,
+                "document_type": document_type,
+                "document_sub_type": document_sub_type,
+                "path": path,
+                "title": title,
+                "content": content,
+                "content_complement": content_complement,
+                "content_embeddings": chunk_embeddings[idx],
+            }
+            if full_precision_embeddings is not None:
+                source[genai_core.quantization.FULL_PRECISION_FIELD] = (
+                    full_precision_embeddings[idx]
+                )
 
-    return {"removed_vectors": removed_vectors, "added_vectors": len(chunk_ids)}
+            # Document ids are assigned by the vector search collection
+            yield {"_op_type": "index", "_index": index_name, "_source": source}
 
+    errors = []
+    added_vectors = 0
+    for ok, item in helpers.streaming_bulk(
+        client,
+        actions(),
+        chunk_size=BULK_CHUNK_SIZE,
+        max_chunk_bytes=BULK_MAX_CHUNK_BYTES,
+        max_retries=BULK_MAX_RETRIES,
+        initial_backoff=BULK_INITIAL_BACKOFF,
+        max_backoff=BULK_MAX_BACKOFF,
+        raise_on_error=False,
+    ):
+        if ok:
+            added_vectors += 1
+        else:
+            errors.append(item)
 
-def clean_chunks_open_search(workspace_id: str, document_id: str):
+    if errors:
+        logger.error(
+            "Failed to index chunks",
+            workspace_id=workspace_id,
+            document_id=document_id,
+            failed=len(errors),
+            errors=errors[:5],
+        )
+        raise CommonError(f"Failed to index {len(errors)} of {len(chunk_ids)} chunks")
+
+    return {"removed_vectors": removed_vectors, "added_vectors": added_vectors}
+
+
+def clean_chunks_open_search(
+    workspace_id: str, document_id: str, keep_chunk_ids: Optional[List[str]] = None
+):
     index_name = workspace_id.replace("-", "")
     client = get_open_search_client()
 
@@ -63,6 +126,10 @@ def clean_chunks_open_search(workspace_id: str, document_id: str):
             }
         }
     }
+    if keep_chunk_ids:
+        query["query"]["bool"]["must_not"] = [
+            {"terms": {"chunk_id": [str(chunk_id) for chunk_id in keep_chunk_ids]}}
+        ]
 
     response = client.search(index=index_name, body=query)
     docs = response["hits"]["hits"]
@@ -72,3 +139,26 @@ def clean_chunks_open_search(workspace_id: str, document_id: str):
         client.delete(index=index_name, id=doc["_id"], ignore=[400, 404])
 
     return removed_vectors
+
+
+def delete_chunks_open_search(workspace_id: str, chunk_ids: List[str]):
+    index_name = workspace_id.replace("-", "")
+    client = get_open_search_client()
+    removed_vectors = 0
+
+    for idx in range(0, len(chunk_ids), 1000):
+        batch = [str(chunk_id) for chunk_id in chunk_ids[idx : idx + 1000]]
+        query = {
+            "size": len(batch),
+            "_source": False,
+            "query": {"terms": {"chunk_id": batch}},
+        }
+
+        response = client.search(index=index_name, body=query)
+        docs = response["hits"]["hits"]
+        removed_vectors += len(docs)
+
+        for doc in docs:
+            client.delete(index=index_name, id=doc["_id"], ignore=[400, 404])
+
+    return removed_vectors
@@ -1,4 +1,6 @@
+import genai_core.quantization
 from aws_lambda_powertools import Logger
+from genai_core.types import VectorPrecision
 from .client import get_open_search_client
 
 logger = Logger()
@@ -21,16 +23,10 @@ def create_workspace_index(workspace: dict):
         },
         "mappings": {
             "properties": {
-                "content_embeddings": {
-                    "type": "knn_vector",
-                    "dimension": int(embeddings_model_dimensions),
-                    "method": {
-                        "name": "hnsw",
-                        "space_type": "l2",
-                        "engine": "nmslib",
-                        "parameters": {"ef_construction": 512, "m": 16},
-                    },
-                },
+                "content_embeddings": _get_vector_mapping(
+                    genai_core.quantization.get_vector_precision(workspace),
+                    int(embeddings_model_dimensions),
+                ),
                 "chunk_id": {"type": "keyword"},
                 "workspace_id": {"type": "keyword"},
                 "document_id": {"type": "keyword"},
@@ -50,7 +46,45 @@ def create_workspace_index(workspace: dict):
             }
         },
     }
+    if genai_core.quantization.is_rescored(workspace):
+        # Only kept in _source, rescoring reads it with the candidates
+        index_body["mappings"]["properties"][
+            genai_core.quantization.FULL_PRECISION_FIELD
+        ] = {"type": "float", "index": False, "doc_values": False}
 
     response = client.indices.create(index_name, body=index_body)
 
     logger.info("Response for create_workspace_index", response=response)
+
+
+def _get_vector_mapping(vector_precision: str, dimensions: int):
+    parameters = {"ef_construction": 512, "m": 16}
+    mapping = {"type": "knn_vector", "dimension": dimensions}
+
+    if vector_precision == VectorPrecision.FLOAT16.value:
+        parameters["encoder"] = {"name": "sq", "parameters": {"type": "fp16"}}
+        engine = "faiss"
+    elif vector_precision == VectorPrecision.INT8.value:
+        mapping["data_type"] = "byte"
+        engine = "lucene"
+    elif vector_precision == VectorPrecision.BINARY.value:
+        mapping["data_type"] = "binary"
+        mapping["method"] = {
+            "name": "hnsw",
+            "space_type": "hamming",
+            "engine": "faiss",
+            "parameters": parameters,
+        }
+
+        return mapping
+    else:
+        engine = "nmslib"
+
+    mapping["method"] = {
+        "name": "hnsw",
+        "space_type": "l2",
+        "engine": engine,
+        "parameters": parameters,
+    }
+
+    return mapping
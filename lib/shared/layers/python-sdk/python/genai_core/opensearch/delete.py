@@ -3,6 +3,7 @@ from aws_lambda_powertools import Logger
 import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 from .client import get_open_search_client
+import genai_core.dedup
 import genai_core.utils.delete_files_with_prefix
 import genai_core.utils.delete_files_with_object_key
 import genai_core.types
@@ -99,6 +100,7 @@ def delete_open_search_document(workspace_id: str, document: dict):
     )
 
     deleteOpenSearchDocument(document_id, index_name)
+    genai_core.dedup.remove_document(workspace_id, document_id)
 
     documents_table = dynamodb.Table(DOCUMENTS_TABLE_NAME)
     workspaces_table = dynamodb.Table(WORKSPACES_TABLE_NAME)
@@ -1,12 +1,32 @@
 import genai_core.embeddings
 import genai_core.cross_encoder
+import genai_core.quantization
 from typing import List
 from .client import get_open_search_client
 from aws_lambda_powertools import Logger
-from genai_core.types import CommonError, Task
+from genai_core.types import CommonError, Task, VectorPrecision
 
 logger = Logger()
 
+# Every field but content_embeddings, which is never read back
+RECORD_FIELDS = [
+    "chunk_id",
+    "workspace_id",
+    "document_id",
+    "document_sub_id",
+    "document_type",
+    "document_sub_type",
+    "path",
+    "language",
+    "title",
+    "content",
+    "content_complement",
+    "metadata",
+]
+# What fusion, thresholds and rescoring read, the other fields are only
+# fetched for the records returned
+CANDIDATE_FIELDS = ["chunk_id", "document_id", "document_sub_id"]
+
 
 def query_workspace_open_search(
     workspace_id: str,
@@ -18,8 +38,6 @@ def query_workspace_open_search(
 ):
     index_name = workspace_id.replace("-", "")
 
-    embeddings_model_provider = workspace["embeddings_model_provider"]
-    embeddings_model_name = workspace["embeddings_model_name"]
     cross_encoder_model_provider = workspace["cross_encoder_model_provider"]
     cross_encoder_model_name = workspace["cross_encoder_model_name"]
     hybrid_search = workspace["hybrid_search"]
@@ -30,9 +48,7 @@ def query_workspace_open_search(
     vector_search_records = []
     keyword_search_records = []
 
-    selected_model = genai_core.embeddings.get_embeddings_model(
-        embeddings_model_provider, embeddings_model_name
-    )
+    selected_model = genai_core.embeddings.get_workspace_embeddings_model(workspace)
 
     if selected_model is None:
         raise CommonError("Embeddings model not found")
@@ -42,17 +58,53 @@ def query_workspace_open_search(
     )[0]
 
     items = []
+    vector_precision = genai_core.quantization.get_vector_precision(workspace)
+    vector_rescore = genai_core.quantization.is_rescored(workspace)
+
+    query_vector = query_embeddings
+    if vector_precision == VectorPrecision.INT8.value:
+        query_vector = genai_core.quantization.quantize_int8([query_embeddings])[0]
+    elif vector_precision == VectorPrecision.BINARY.value:
+        query_vector = genai_core.quantization.quantize_binary_packed(
+            [query_embeddings]
+        )[0]
+
+    fields = RECORD_FIELDS
+    if not full_response:
+        fields = CANDIDATE_FIELDS
+        if cross_encoder_model_name is not None:
+            fields = fields + ["content"]
 
     client = get_open_search_client()
-    vector_search_records = vector_query(
-        client, index_name, query_embeddings, vector_search_limit
-    )
+    if vector_rescore:
+        candidates_limit = (
+            vector_search_limit * genai_core.quantization.RESCORE_OVERSAMPLING
+        )
+        vector_search_records = vector_query(
+            client,
+            index_name,
+            query_vector,
+            candidates_limit,
+            k=candidates_limit,
+            fields=fields + [genai_core.quantization.FULL_PRECISION_FIELD],
+        )
+    else:
+        vector_search_records = vector_query(
+            client, index_name, query_vector, vector_search_limit, fields=fields
+        )
     vector_search_records = _convert_records("vector_search", vector_search_records)
+    if vector_rescore:
+        vector_search_records = genai_core.quantization.rescore_records(
+            query_embeddings,
+            vector_search_records,
+            "l2",
+            similarity=True,
+        )[:vector_search_limit]
     items.extend(vector_search_records)
 
     if hybrid_search:
         keyword_search_records = keyword_query(
-            client, index_name, query, keyword_search_limit
+            client, index_name, query, keyword_search_limit, fields=fields
         )
 
         keyword_search_records = _convert_records(
@@ -154,6 +206,7 @@ def query_workspace_open_search(
                 )[: (limit - len(ret_items))]
             )
 
+        ret_items = _hydrate_records(client, index_name, ret_items)
         ret_value = {
             "engine": "opensearch",
             "supported_languages": languages,
@@ -188,6 +241,10 @@ def _convert_records(source: str, records: List[dict]):
             "sources": [source],
             "score": None,
         }
+        # Only requested for rescoring, which removes it from the record
+        full_precision = current.get(genai_core.quantization.FULL_PRECISION_FIELD)
+        if full_precision is not None:
+            converted[genai_core.quantization.FULL_PRECISION_FIELD] = full_precision
 
         if source == "vector_search":
             converted["vector_search_score"] = current_score
@@ -203,8 +260,48 @@ def _convert_records(source: str, records: List[dict]):
     return converted_records
 
 
-def vector_query(client, index_name: str, vector: List[float], size: int = 25):
-    query = {"query": {"knn": {"content_embeddings": {"vector": vector, "k": 5}}}}
+def _hydrate_records(client, index_name: str, records: List[dict]):
+    """
+    Reads the fields left out of the candidates for the returned records.
+    Records deleted since the candidates were read are dropped.
+    """
+    if not records:
+        return records
+
+    chunk_ids = [record["chunk_id"] for record in records]
+    query = {
+        "size": len(chunk_ids),
+        "_source": RECORD_FIELDS,
+        "query": {"terms": {"chunk_id": chunk_ids}},
+    }
+
+    response = client.search(index=index_name, body=query)
+    sources = {
+        hit["_source"]["chunk_id"]: hit["_source"] for hit in response["hits"]["hits"]
+    }
+
+    hydrated = []
+    for record in records:
+        source = sources.get(record["chunk_id"])
+        if source is not None:
+            record.update({field: source.get(field) for field in RECORD_FIELDS})
+            hydrated.append(record)
+
+    return hydrated
+
+
+def vector_query(
+    client,
+    index_name: str,
+    vector: List[float],
+    size: int = 25,
+    k: int = 5,
+    fields: List[str] = RECORD_FIELDS,
+):
+    query = {
+        "_source": fields,
+        "query": {"knn": {"content_embeddings": {"vector": vector, "k": k}}},
+    }
 
     response = client.search(index=index_name, body=query, size=size)
 
@@ -214,8 +311,14 @@ def vector_query(client, index_name: str, vector: List[float], size: int = 25):
     return ret_value
 
 
-def keyword_query(client, index_name: str, text: str, size: int = 25):
-    query = {"query": {"match": {"content": text}}}
+def keyword_query(
+    client,
+    index_name: str,
+    text: str,
+    size: int = 25,
+    fields: List[str] = RECORD_FIELDS,
+):
+    query = {"_source": fields, "query": {"match": {"content": text}}}
 
     response = client.search(index=index_name, body=query, size=size)
 
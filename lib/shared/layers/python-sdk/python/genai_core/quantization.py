@@ -0,0 +1,136 @@
+from typing import List
+
+import numpy as np
+from aws_lambda_powertools import Logger
+
+from genai_core.types import CommonError, VectorPrecision
+
+# Quantized searches fetch this many times more candidates before rescoring
+RESCORE_OVERSAMPLING = 4
+# Not indexed column or field holding the float32 embeddings of the chunks
+# of workspaces with rescoring, read back with the candidates
+FULL_PRECISION_FIELD = "content_embeddings_full"
+
+SUPPORTED_VECTOR_PRECISIONS = {
+    "aurora": [
+        VectorPrecision.FLOAT32.value,
+        VectorPrecision.FLOAT16.value,
+        VectorPrecision.BINARY.value,
+    ],
+    "opensearch": [
+        VectorPrecision.FLOAT32.value,
+        VectorPrecision.FLOAT16.value,
+        VectorPrecision.INT8.value,
+        VectorPrecision.BINARY.value,
+    ],
+}
+
+logger = Logger()
+
+
+def get_vector_precision(workspace: dict) -> str:
+    return workspace.get("vector_precision") or VectorPrecision.FLOAT32.value
+
+
+def is_quantized(workspace: dict) -> bool:
+    return get_vector_precision(workspace) != VectorPrecision.FLOAT32.value
+
+
+def is_rescored(workspace: dict) -> bool:
+    return is_quantized(workspace) and bool(workspace.get("vector_rescore"))
+
+
+def validate_vector_precision(engine: str, vector_precision: str, dimensions: int):
+    if vector_precision not in SUPPORTED_VECTOR_PRECISIONS.get(engine, []):
+        raise CommonError(
+            f"Vector precision {vector_precision} is not supported by {engine}"
+        )
+
+    if vector_precision == VectorPrecision.BINARY.value and dimensions % 8 != 0:
+        raise CommonError("Binary vectors require dimensions divisible by 8")
+
+
+def quantize_float16(embeddings: List[List[float]]) -> List[np.ndarray]:
+    return list(np.asarray(embeddings, dtype=np.float32).astype(np.float16))
+
+
+def quantize_int8(embeddings: List[List[float]]) -> List[List[int]]:
+    # Embeddings are normalized, so every component is within [-1, 1]
+    values = np.clip(np.rint(np.asarray(embeddings) * 127), -128, 127)
+
+    return values.astype(np.int8).tolist()
+
+
+def quantize_binary_bits(embeddings: List[List[float]]) -> List[str]:
+    bits = np.asarray(embeddings) > 0
+
+    return ["".join("1" if bit else "0" for bit in row) for row in bits]
+
+
+def quantize_binary_packed(embeddings: List[List[float]]) -> List[List[int]]:
+    bits = np.asarray(embeddings) > 0
+
+    return np.packbits(bits, axis=1).view(np.int8).tolist()
+
+
+def get_vector_distances(
+    query_embedding: List[float], embeddings: np.ndarray, metric: str
+) -> np.ndarray:
+    """Distances with the semantics of the pgvector operators, lower is closer"""
+    query = np.asarray(query_embedding, dtype=np.float32)
+
+    if metric == "cosine":
+        norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query)
+        return 1 - (embeddings @ query) / np.maximum(norms, 1e-12)
+    elif metric == "l2":
+        return np.linalg.norm(embeddings - query, axis=1)
+    elif metric == "inner":
+        return -(embeddings @ query)
+
+    raise CommonError("Unknown metric")
+
+
+def rescore_records(
+    query_embedding: List[float],
+    records: List[dict],
+    metric: str,
+    similarity: bool = False,
+) -> List[dict]:
+    """
+    Replace the quantized vector_search_score of the records with the score of
+    their full precision embeddings, read with the records. Scores are
+    distances, or OpenSearch l2 similarities (1 / (1 + d^2)) when similarity
+    is set. Records are returned best first, records without a full precision
+    embedding are moved last.
+    """
+    embeddings = {}
+    for record in records:
+        embedding = record.pop(FULL_PRECISION_FIELD, None)
+        if embedding is not None:
+            embeddings[record["chunk_id"]] = np.asarray(embedding, dtype=np.float32)
+
+    rescored = [record for record in records if record["chunk_id"] in embeddings]
+    missing = [record for record in records if record["chunk_id"] not in embeddings]
+
+    if missing:
+        logger.warning(f"{len(missing)} records have no full precision embedding")
+
+    if not rescored:
+        return records
+
+    distances = get_vector_distances(
+        query_embedding,
+        np.stack([embeddings[record["chunk_id"]] for record in rescored]),
+        metric,
+    )
+
+    for record, distance in zip(rescored, distances.tolist()):
+        record["vector_search_score"] = (
+            1 / (1 + distance**2) if similarity else distance
+        )
+
+    rescored = sorted(
+        rescored, key=lambda record: record["vector_search_score"], reverse=similarity
+    )
+
+    return rescored + missing
@@ -1,3 +1,4 @@
+from typing import Optional
 import genai_core.types
 import genai_core.workspaces
 import genai_core.embeddings
@@ -8,7 +9,12 @@ from genai_core.bedrock_kb import query_workspace_bedrock_kb
 
 
 def semantic_search(
-    workspace_id: str, query: str, limit: int = 5, full_response: bool = False
+    workspace_id: str,
+    query: str,
+    limit: int = 5,
+    full_response: bool = False,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
 ):
     workspace = genai_core.workspaces.get_workspace(workspace_id)
 
@@ -20,7 +26,13 @@ def semantic_search(
 
     if workspace["engine"] == "aurora":
         return query_workspace_aurora(
-            workspace_id, workspace, query, limit, full_response
+            workspace_id,
+            workspace,
+            query,
+            limit,
+            full_response,
+            ef_search=ef_search,
+            probes=probes,
         )
     elif workspace["engine"] == "opensearch":
         return query_workspace_open_search(
@@ -15,6 +15,20 @@ class EmbeddingsModel(BaseModel):
     dimensions: int
     max_input_length: Optional[int] = None
     original_provider: Optional[str] = None
+    # Reduced (Matryoshka) size requested by a workspace, None for full size
+    output_dimensions: Optional[int] = None
+
+
+class EmbeddingsBatch(BaseModel):
+    indices: list[int]
+    tokens: int
+
+
+class EmbeddingsBatchPlan(BaseModel):
+    max_items: int
+    max_tokens: Optional[int] = None
+    batches: list[EmbeddingsBatch]
+    total_tokens: int
 
 
 class CrossEncoderModel(BaseModel):
@@ -35,6 +49,29 @@ class WorkspaceStatus(Enum):
     CREATING = "creating"
 
 
+class VectorPrecision(Enum):
+    FLOAT32 = "float32"
+    FLOAT16 = "float16"
+    INT8 = "int8"
+    BINARY = "binary"
+
+
+class VectorIndexType(Enum):
+    IVFFLAT = "ivfflat"
+    HNSW = "hnsw"
+
+
+class TableLayout(Enum):
+    TABLE = "table"
+    PARTITIONED = "partitioned"
+
+
+class ReadConsistency(Enum):
+    EVENTUAL = "eventual"
+    READ_YOUR_WRITES = "read_your_writes"
+    STRONG = "strong"
+
+
 class Provider(Enum):
     BEDROCK = "bedrock"
     OPENAI = "openai"
@@ -42,6 +79,7 @@ class Provider(Enum):
     SAGEMAKER = "sagemaker"
     AMAZON = "amazon"
     COHERE = "cohere"
+    LOCAL = "local"
 
 
 class Modality(Enum):
@@ -3,6 +3,9 @@ from typing import Optional, List
 
 comprehend = boto3.client("comprehend")
 
+COMPREHEND_BATCH_SIZE = 25
+COMPREHEND_MAX_TEXT_BYTES = 5000
+
 aws_to_pg = {
     # Afrikaans closely related to Dutch. Might not be accurate. Better than nothing.
     "af": "dutch",
@@ -41,7 +44,11 @@ def comprehend_language_code_to_postgres(language_code: str) -> Optional[str]:
 
 
 def get_query_language(query: str, languages: List[str]):
+    # Queries that can't be detected are searched in the first workspace
+    # language, as undetected chunks are stored, unless english is configured
     language_name = "english"
+    if languages and "english" not in languages:
+        language_name = languages[0]
     comprehend_response = comprehend.detect_dominant_language(Text=query)
     comprehend_languages = comprehend_response["Languages"]
     detected_languages = [
@@ -58,3 +65,25 @@ def get_query_language(query: str, languages: List[str]):
             language_name = postgres_language_name
 
     return [language_name, detected_languages]
+
+
+def get_dominant_languages(texts: List[str]) -> List[Optional[str]]:
+    """Postgres language of each text, None when it has no configuration"""
+    languages = []
+    for idx in range(0, len(texts), COMPREHEND_BATCH_SIZE):
+        batch = [
+            # Comprehend reads at most 5000 bytes of every text
+            text.encode("utf-8")[:COMPREHEND_MAX_TEXT_BYTES].decode("utf-8", "ignore")
+            for text in texts[idx : idx + COMPREHEND_BATCH_SIZE]
+        ]
+        response = comprehend.batch_detect_dominant_language(TextList=batch)
+
+        batch_languages = [None] * len(batch)
+        for result in response["ResultList"]:
+            if result["Languages"]:
+                batch_languages[result["Index"]] = comprehend_language_code_to_postgres(
+                    result["Languages"][0]["LanguageCode"]
+                )
+        languages.extend(batch_languages)
+
+    return languages
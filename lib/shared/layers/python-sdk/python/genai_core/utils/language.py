@@ -0,0 +1,234 @@
+import os
+import string
+from collections import Counter
+from typing import List, Optional
+
+from aws_lambda_powertools import Logger
+
+import genai_core.utils.comprehend
+
+# Chunks the local model can't tell apart are sent to Comprehend when enabled,
+# this needs comprehend:BatchDetectDominantLanguage
+LANGUAGE_DETECTION_COMPREHEND = (
+    os.environ.get("LANGUAGE_DETECTION_COMPREHEND", "false") == "true"
+)
+# Leading words of a chunk that are looked at
+LANGUAGE_DETECTION_TOKENS = 200
+LANGUAGE_DETECTION_MIN_HITS = 2
+
+SCRIPTS = {
+    "latin": [(0x0041, 0x024F)],
+    "greek": [(0x0370, 0x03FF)],
+    "cyrillic": [(0x0400, 0x04FF)],
+    "armenian": [(0x0530, 0x058F)],
+    "arabic": [(0x0600, 0x06FF), (0x0750, 0x077F)],
+    "devanagari": [(0x0900, 0x097F)],
+}
+
+# Scripts and most frequent function words of the Postgres text search
+# configurations that can be selected for a workspace
+LANGUAGE_PROFILES = {
+    "arabic": (
+        ["arabic"],
+        "في من على إلى أن عن هذا التي الذي مع كان لا ما هذه أو بين كل ذلك قد و",
+    ),
+    "armenian": (
+        ["armenian"],
+        "և է որ ու են այն իր մեջ համար հետ էր նա չի այս կամ",
+    ),
+    "basque": (
+        ["latin"],
+        "eta da ez bat du dira ere baina zen beste hau edo izan dute egin bere oso "
+        "dago hori baita gisa zuen bezala arte",
+    ),
+    "catalan": (
+        ["latin"],
+        "el la els les de i que en un una és per amb del no es al com més però seu "
+        "són dels aquesta",
+    ),
+    "danish": (
+        ["latin"],
+        "og i det som en er af for på med til den ikke om har de et var jeg men sig "
+        "så kan fra at",
+    ),
+    "dutch": (
+        ["latin"],
+        "de het een en van is dat die niet in op te zijn met voor er ook maar aan "
+        "worden wordt als bij naar",
+    ),
+    "english": (
+        ["latin"],
+        "the and of to is in that it for with as was on are be this by not or from "
+        "have which an at",
+    ),
+    "finnish": (
+        ["latin"],
+        "ja on ei se että oli kun mutta niin joka ovat tai myös hän ole sen jos kuin "
+        "vain nyt tämä ne mitä jotka",
+    ),
+    "french": (
+        ["latin"],
+        "le la les de des et est un une du en que qui dans pour pas sur au avec ce "
+        "il elle sont ne se",
+    ),
+    "german": (
+        ["latin"],
+        "der die das und ist nicht ein eine zu den von mit sich des auf für im dem "
+        "auch es wird sind werden oder",
+    ),
+    "greek": (
+        ["greek"],
+        "και το να του η της σε με που τα την για ο από είναι οι στο των δεν θα",
+    ),
+    "hindi": (
+        ["devanagari"],
+        "के है में की और से का को एक यह पर भी नहीं हैं लिए था कि जो कर तो",
+    ),
+    "hungarian": (
+        ["latin"],
+        "a az és hogy nem is egy meg van ez de csak már mint volt még ki el azt vagy "
+        "lesz minden kell ezt",
+    ),
+    "indonesian": (
+        ["latin"],
+        "yang dan di ini itu dengan untuk tidak dari dalam akan pada juga ke karena "
+        "ada bisa oleh atau adalah mereka kami sudah telah",
+    ),
+    "irish": (
+        ["latin"],
+        "agus an na is ar le a bhí go sé ní sí don ag ach mar atá seo sin leis ina "
+        "siad gach níos",
+    ),
+    "italian": (
+        ["latin"],
+        "il di che e la le un una per non sono con del della gli è si da nel come "
+        "anche ma alla dei",
+    ),
+    "lithuanian": (
+        ["latin"],
+        "ir yra kad bet į su ne o iš tai jis buvo kaip jo ar per dėl taip nuo apie "
+        "kuris savo jau tik",
+    ),
+    "nepali": (
+        ["devanagari"],
+        "छ र को मा पनि हो गर्न भएको लागि थियो छन् गरेको यो त्यो भने हुन्छ तर एक का ले",
+    ),
+    "norwegian": (
+        ["latin"],
+        "og i det som en er av for på med til den ikke om har de et var jeg men seg "
+        "så kan fra å",
+    ),
+    "portuguese": (
+        ["latin"],
+        "o a os as de que e do da em um uma para com não no na por mais dos das se "
+        "é ao",
+    ),
+    "romanian": (
+        ["latin"],
+        "și în de la cu nu o un să din pe care este pentru a mai sau ce ca fi sunt "
+        "fost sa si",
+    ),
+    "russian": (
+        ["cyrillic"],
+        "и в не на что я с он как это по но из к у за от же так его для все она были",
+    ),
+    "serbian": (
+        ["cyrillic", "latin"],
+        "je i u da se na su za od sa ne koji kao ili što biti ali bio će је и у да "
+        "се на су за од са не који као или што бити али био ће",
+    ),
+    "spanish": (
+        ["latin"],
+        "el la los las de y que en un una es por con para del se no al lo como más "
+        "pero su son",
+    ),
+    "swedish": (
+        ["latin"],
+        "och att det som en är av för på med till den inte om har de ett var jag men "
+        "sig så kan från",
+    ),
+}
+_STOPWORDS = {
+    language: frozenset(words.split())
+    for language, (_, words) in LANGUAGE_PROFILES.items()
+}
+_PUNCTUATION = string.punctuation + "“”‘’«»¿¡…–—"
+
+logger = Logger()
+
+
+def detect_chunk_languages(chunks: List[str], languages: List[str]) -> List[str]:
+    """
+    Language of every chunk among the workspace languages. Chunks that can't
+    be detected get the first workspace language.
+    """
+    if len(languages) == 1:
+        return [languages[0]] * len(chunks)
+
+    detected = [detect_language(chunk, languages) for chunk in chunks]
+
+    undetected = [idx for idx, language in enumerate(detected) if language is None]
+    if undetected and LANGUAGE_DETECTION_COMPREHEND:
+        dominant = genai_core.utils.comprehend.get_dominant_languages(
+            [chunks[idx] for idx in undetected]
+        )
+        for idx, language in zip(undetected, dominant):
+            if language in languages:
+                detected[idx] = language
+
+    return [language or languages[0] for language in detected]
+
+
+def detect_language(text: str, languages: List[str]) -> Optional[str]:
+    """
+    Picks the workspace language whose script and function words match the
+    text. Returns None when no language stands out.
+    """
+    candidates = [language for language in languages if language in _STOPWORDS]
+    if not candidates:
+        return None
+
+    tokens = []
+    for token in text.lower().split()[:LANGUAGE_DETECTION_TOKENS]:
+        token = token.strip(_PUNCTUATION)
+        if token:
+            tokens.append(token)
+
+    script = _get_dominant_script(tokens)
+    candidates = [
+        language
+        for language in candidates
+        if script is None or script in LANGUAGE_PROFILES[language][0]
+    ]
+    if len(candidates) == 1:
+        return candidates[0]
+
+    hits = Counter(
+        {
+            language: sum(token in _STOPWORDS[language] for token in tokens)
+            for language in candidates
+        }
+    )
+    ranked = hits.most_common(2)
+    if not ranked or ranked[0][1] < LANGUAGE_DETECTION_MIN_HITS:
+        return None
+    if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+        return None
+
+    return ranked[0][0]
+
+
+def _get_dominant_script(tokens: List[str]) -> Optional[str]:
+    counts = Counter()
+    for token in tokens:
+        for char in token:
+            code = ord(char)
+            for script, ranges in SCRIPTS.items():
+                if any(start <= code <= end for start, end in ranges):
+                    counts[script] += 1
+                    break
+
+    if not counts:
+        return None
+
+    return counts.most_common(1)[0][0]
@@ -0,0 +1,57 @@
+import io
+import json
+
+import botocore
+import numpy as np
+from aws_lambda_powertools import Logger
+
+# float32 .npy responses from the RAG models endpoint, JSON is the fallback
+NPY_CONTENT_TYPE = "application/x-npy"
+JSON_CONTENT_TYPE = "application/json"
+
+logger = Logger()
+
+# Cleared when the endpoint rejects the binary Accept header (older deployments)
+_binary_responses_supported = True
+
+
+def invoke_rag_models_endpoint(client, endpoint_name: str, request: dict) -> list:
+    global _binary_responses_supported
+
+    if _binary_responses_supported:
+        try:
+            response = client.invoke_endpoint(
+                EndpointName=endpoint_name,
+                ContentType=JSON_CONTENT_TYPE,
+                Accept=NPY_CONTENT_TYPE,
+                Body=json.dumps(request),
+            )
+
+            return decode_response(response)
+        except botocore.exceptions.ClientError as error:
+            error_code = error.response.get("Error", {}).get("Code")
+            if error_code != "ModelError":
+                raise error
+
+            logger.warning(
+                f"Binary response rejected, falling back to JSON: {str(error)}"
+            )
+            _binary_responses_supported = False
+
+    response = client.invoke_endpoint(
+        EndpointName=endpoint_name,
+        ContentType=JSON_CONTENT_TYPE,
+        Accept=JSON_CONTENT_TYPE,
+        Body=json.dumps(request),
+    )
+
+    return decode_response(response)
+
+
+def decode_response(response) -> list:
+    body = response["Body"].read()
+
+    if response.get("ContentType", "").startswith(NPY_CONTENT_TYPE):
+        return np.load(io.BytesIO(body), allow_pickle=False).tolist()
+
+    return json.loads(body.decode())
@@ -44,7 +44,8 @@ def crawl_urls(
 
         idx += 1
 
-        document_sub_id = str(uuid.uuid4())
+        # Stable per url, so a re-crawl only re-embeds the chunks that changed
+        document_sub_id = str(uuid.uuid5(uuid.NAMESPACE_URL, current_url))
         processed_urls.append(current_url)
         print(f"Processing url {document_sub_id}: {current_url}")
 
@@ -65,7 +66,7 @@ def crawl_urls(
 
         chunks = genai_core.chunks.split_content(workspace, content)
 
-        genai_core.chunks.add_chunks(
+        result = genai_core.chunks.add_chunks(
             replace=False,
             workspace=workspace,
             document=document,
@@ -74,6 +75,8 @@ def crawl_urls(
             chunk_complements=None,
             path=current_url,
         )
+        if result["skipped_chunks"]:
+            print(f"Skipped {result['skipped_chunks']} near-duplicate chunks")
         if follow_links:
             for link in local_links:
                 if link not in processed_urls:
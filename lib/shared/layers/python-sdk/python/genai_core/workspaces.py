@@ -1,12 +1,14 @@
 import os
 import json
 import uuid
+from typing import Optional
 from aws_lambda_powertools import Logger
 import boto3
 import genai_core.embeddings
+import genai_core.quantization
 from datetime import datetime
 from .types import WorkspaceStatus
-from genai_core.types import Task
+from genai_core.types import Task, TableLayout, VectorIndexType, VectorPrecision
 
 dynamodb = boto3.resource("dynamodb")
 sfn_client = boto3.client("stepfunctions")
@@ -29,6 +31,14 @@ DELETE_WORKSPACE_WORKFLOW_ARN = os.environ.get("DELETE_WORKSPACE_WORKFLOW_ARN")
 
 WORKSPACE_OBJECT_TYPE = "workspace"
 
+# OpenSearch k-NN engine used for each vector precision
+AOSS_ENGINES = {
+    VectorPrecision.FLOAT32.value: "nmslib",
+    VectorPrecision.FLOAT16.value: "faiss",
+    VectorPrecision.INT8.value: "lucene",
+    VectorPrecision.BINARY.value: "faiss",
+}
+
 if WORKSPACES_TABLE_NAME:
     table = dynamodb.Table(WORKSPACES_TABLE_NAME)
 
@@ -92,6 +102,39 @@ def set_status(workspace_id: str, status: str):
     return response
 
 
+def set_tsvector_languages(workspace_id: str, languages: list[str]):
+    timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    response = table.update_item(
+        Key={"workspace_id": workspace_id, "object_type": WORKSPACE_OBJECT_TYPE},
+        UpdateExpression="SET tsvector_languages=:languages, "
+        + "updated_at=:timestampValue",
+        ExpressionAttributeValues={
+            ":languages": languages,
+            ":timestampValue": timestamp,
+        },
+    )
+
+    return response
+
+
+def set_ivfflat_index(workspace_id: str, lists: int, rows: int):
+    timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    response = table.update_item(
+        Key={"workspace_id": workspace_id, "object_type": WORKSPACE_OBJECT_TYPE},
+        UpdateExpression="SET ivfflat_lists=:lists, ivfflat_rows=:rows, "
+        + "updated_at=:timestampValue",
+        ExpressionAttributeValues={
+            ":lists": lists,
+            ":rows": rows,
+            ":timestampValue": timestamp,
+        },
+    )
+
+    return response
+
+
 def create_workspace_aurora(
     workspace_name: str,
     embeddings_model_provider: str,
@@ -106,6 +149,15 @@ def create_workspace_aurora(
     chunking_strategy: str,
     chunk_size: int,
     chunk_overlap: int,
+    vector_precision: str = VectorPrecision.FLOAT32.value,
+    vector_rescore: bool = False,
+    chunk_dedup: bool = False,
+    index_type: str = VectorIndexType.IVFFLAT.value,
+    hnsw_m: Optional[int] = None,
+    hnsw_ef_construction: Optional[int] = None,
+    hnsw_ef_search: Optional[int] = None,
+    ivfflat_probes: Optional[int] = None,
+    table_layout: str = TableLayout.TABLE.value,
 ):
     workspace_id = str(uuid.uuid4())
     timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
@@ -115,6 +167,9 @@ def create_workspace_aurora(
     )
     if not embeddings_model:
         raise genai_core.types.CommonError("Invalid embeddings model")
+    genai_core.quantization.validate_vector_precision(
+        "aurora", vector_precision, embeddings_model_dimensions
+    )
     # Verify that the embeddings model
     genai_core.embeddings.generate_embeddings(embeddings_model, ["test"], Task.STORE)
 
@@ -133,10 +188,20 @@ def create_workspace_aurora(
         "languages": languages,
         "metric": metric,
         "has_index": has_index,
+        "index_type": index_type,
+        "hnsw_m": hnsw_m,
+        "hnsw_ef_construction": hnsw_ef_construction,
+        "hnsw_ef_search": hnsw_ef_search,
+        "ivfflat_probes": ivfflat_probes,
+        "table_layout": table_layout,
         "hybrid_search": hybrid_search,
+        "tsvector_languages": languages if hybrid_search else [],
+        "vector_precision": vector_precision,
+        "vector_rescore": vector_rescore,
         "chunking_strategy": chunking_strategy,
         "chunk_size": chunk_size,
         "chunk_overlap": chunk_overlap,
+        "chunk_dedup": chunk_dedup,
         "documents": 0,
         "vectors": 0,
         "size_in_bytes": 0,
@@ -176,6 +241,9 @@ def create_workspace_open_search(
     chunking_strategy: str,
     chunk_size: int,
     chunk_overlap: int,
+    vector_precision: str = VectorPrecision.FLOAT32.value,
+    vector_rescore: bool = False,
+    chunk_dedup: bool = False,
 ):
     workspace_id = str(uuid.uuid4())
     timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
@@ -185,6 +253,9 @@ def create_workspace_open_search(
     )
     if not embeddings_model:
         raise genai_core.types.CommonError("Invalid embeddings model")
+    genai_core.quantization.validate_vector_precision(
+        "opensearch", vector_precision, embeddings_model_dimensions
+    )
     # Verify that the embeddings model
     genai_core.embeddings.generate_embeddings(embeddings_model, ["test"], Task.STORE)
 
@@ -202,11 +273,14 @@ def create_workspace_open_search(
         "cross_encoder_model_name": cross_encoder_model_name,
         "languages": languages,
         "metric": "l2",
-        "aoss_engine": "nmslib",
+        "aoss_engine": AOSS_ENGINES[vector_precision],
         "hybrid_search": hybrid_search,
+        "vector_precision": vector_precision,
+        "vector_rescore": vector_rescore,
         "chunking_strategy": chunking_strategy,
         "chunk_size": chunk_size,
         "chunk_overlap": chunk_overlap,
+        "chunk_dedup": chunk_dedup,
         "documents": 0,
         "vectors": 0,
         "size_in_bytes": 0,
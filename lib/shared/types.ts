@@ -1,6 +1,11 @@
 import * as sagemaker from "aws-cdk-lib/aws-sagemaker";
 
-export type ModelProvider = "sagemaker" | "bedrock" | "openai" | "nexus";
+export type ModelProvider =
+  | "sagemaker"
+  | "bedrock"
+  | "openai"
+  | "nexus"
+  | "local";
 
 export enum SupportedSageMakerModels {
   FalconLite = "FalconLite [ml.g5.12xlarge]",
@@ -157,6 +162,8 @@ export interface SystemConfig {
     engines: {
       aurora: {
         enabled: boolean;
+        // Serverless v2 read replicas serving the semantic search queries
+        readers?: number;
       };
       opensearch: {
         enabled: boolean;
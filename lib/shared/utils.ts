@@ -36,6 +36,12 @@ export abstract class Utils {
     return `${defaultModel.provider}::${defaultModel.dimensions}::${defaultModel.name}`;
   }
 
+  static hasLocalEmbeddingsModels(config: SystemConfig): boolean {
+    return config.rag.embeddingsModels.some(
+      (model) => model.provider === "local"
+    );
+  }
+
   static getDefaultCrossEncoderModel(config: SystemConfig): string {
     const defaultModel = config.rag.crossEncoderModels.find(
       (model) => model.default === true
@@ -0,0 +1,150 @@
+"""
+Rows per second of Aurora chunk ingestion with one INSERT per chunk (the
+previous add_chunks_aurora) and with the binary COPY path, against any
+PostgreSQL database with the pgvector extension.
+
+Connections go to --dsn instead of the IAM authenticated cluster endpoint.
+A temporary workspace table is created and dropped at the end.
+
+Usage:
+    python scripts/benchmarks/aurora_ingestion.py \\
+        --dsn postgresql://postgres@localhost:5432/postgres --rows 5000
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+import psycopg2
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, "../../lib/shared/layers/python-sdk/python"))
+# Nothing is read from AWS, the names only satisfy module level clients
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import genai_core.aurora.chunks  # noqa: E402
+import genai_core.aurora.connection  # noqa: E402
+import genai_core.aurora.create  # noqa: E402
+import genai_core.quantization  # noqa: E402
+from psycopg2 import sql  # noqa: E402
+
+
+def insert_row_by_row(table_name, rows, embeddings, vector_precision):
+    if vector_precision == "binary":
+        embeddings = genai_core.quantization.quantize_binary_bits(embeddings)
+
+    with genai_core.aurora.connection.AuroraConnection(autocommit=False) as cursor:
+        for row, embedding in zip(rows, embeddings):
+            cursor.execute(
+                sql.SQL(
+                    """INSERT INTO {table} (
+                        chunk_id, workspace_id, document_id, document_sub_id,
+                        document_type, document_sub_type, path, title, content,
+                        content_complement, content_embeddings
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);"""
+                ).format(table=table_name),
+                [*row, embedding],
+            )
+
+        cursor.connection.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dsn", required=True)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument(
+        "--precision", choices=["float32", "float16", "binary"], default="float32"
+    )
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    genai_core.aurora.connection._open_connection = lambda host: psycopg2.connect(
+        args.dsn
+    )
+
+    workspace_id = str(uuid.uuid4())
+    table_name = sql.Identifier(workspace_id.replace("-", ""))
+    genai_core.aurora.create.create_workspace_table(
+        {
+            "workspace_id": workspace_id,
+            "embeddings_model_dimensions": args.dimensions,
+            "hybrid_search": False,
+            "languages": [],
+            "has_index": False,
+            "metric": "cosine",
+            "vector_precision": args.precision,
+        }
+    )
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((args.rows, args.dimensions)).astype(np.float32)
+    contents = [
+        f"chunk {i} " + "lorem ipsum dolor sit amet " * 30 for i in range(args.rows)
+    ]
+
+    try:
+        document_id = str(uuid.uuid4())
+        rows = [
+            (
+                uuid.uuid4(),
+                workspace_id,
+                document_id,
+                None,
+                "file",
+                None,
+                "file.txt",
+                "file.txt",
+                content,
+                None,
+            )
+            for content in contents
+        ]
+        start = time.perf_counter()
+        for idx in range(0, args.rows, args.batch_size):
+            insert_row_by_row(
+                table_name,
+                rows[idx : idx + args.batch_size],
+                embeddings[idx : idx + args.batch_size].tolist(),
+                args.precision,
+            )
+        row_by_row = args.rows / (time.perf_counter() - start)
+
+        document_id = str(uuid.uuid4())
+        start = time.perf_counter()
+        for idx in range(0, args.rows, args.batch_size):
+            genai_core.aurora.chunks.add_chunks_aurora(
+                workspace_id=workspace_id,
+                document_id=document_id,
+                document_sub_id=None,
+                document_type="file",
+                document_sub_type=None,
+                path="file.txt",
+                title="file.txt",
+                chunk_ids=[uuid.uuid4() for _ in contents[idx : idx + args.batch_size]],
+                chunk_embeddings=embeddings[idx : idx + args.batch_size].tolist(),
+                chunks=contents[idx : idx + args.batch_size],
+                chunk_complements=None,
+                replace=False,
+                vector_precision=args.precision,
+            )
+        bulk = args.rows / (time.perf_counter() - start)
+    finally:
+        with genai_core.aurora.connection.AuroraConnection() as cursor:
+            cursor.execute(
+                sql.SQL("DROP TABLE IF EXISTS {table};").format(table=table_name)
+            )
+
+    print(f"{args.rows} rows, {args.dimensions} dimensions, {args.precision}")
+    print(f"{'path':>12} {'rows/s':>10}")
+    print(f"{'row by row':>12} {row_by_row:>10.0f}")
+    print(f"{'binary COPY':>12} {bulk:>10.0f}")
+    print(f"{'speedup':>12} {bulk / row_by_row:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
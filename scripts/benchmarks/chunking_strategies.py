@@ -0,0 +1,125 @@
+"""
+Chunk count, embeddings calls, model window fill and split time of the
+"recursive" (characters) and "token" chunking strategies.
+
+Usage:
+    python scripts/benchmarks/chunking_strategies.py --file document.txt
+    python scripts/benchmarks/chunking_strategies.py --model cohere.embed-english-v3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, "../../lib/shared/layers/python-sdk/python"))
+# Nothing is read from AWS, the names only satisfy module level clients
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("DOCUMENTS_TABLE_NAME", "Documents")
+os.environ.setdefault("WORKSPACES_TABLE_NAME", "Workspaces")
+
+import genai_core.chunks  # noqa: E402
+import genai_core.embeddings  # noqa: E402
+from genai_core.types import EmbeddingsModel  # noqa: E402
+
+MODELS = {
+    "amazon.titan-embed-text-v1": ("bedrock", 1536),
+    "cohere.embed-english-v3": ("bedrock", 1024),
+    "text-embedding-3-small": ("openai", 1536),
+}
+
+
+def synthetic_document(words: int) -> str:
+    vocabulary = (
+        "retrieval augmented generation splits documents into chunks that are "
+        "embedded and indexed so that questions can be answered with context"
+    ).split()
+    paragraphs = []
+    for i in range(0, words, 120):
+        paragraph = " ".join(vocabulary[(i + j) % len(vocabulary)] for j in range(120))
+        paragraphs.append(paragraph + ".")
+
+    return "\n\n".join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", help="text file to split")
+    parser.add_argument("--words", type=int, default=200000)
+    parser.add_argument("--model", choices=list(MODELS), default=list(MODELS)[1])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--token-chunk-size", type=int, default=8192)
+    parser.add_argument("--token-chunk-overlap", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            content = f.read()
+    else:
+        content = synthetic_document(args.words)
+
+    provider, dimensions = MODELS[args.model]
+    model = EmbeddingsModel(provider=provider, name=args.model, dimensions=dimensions)
+    # Offline run, the model is not looked up in the deployment config
+    genai_core.embeddings.get_embeddings_model = lambda provider, name: model
+
+    token_limit = genai_core.embeddings.get_model_token_limit(model.name)
+    char_limit = min(token_limit * 4, genai_core.embeddings.MAX_INPUT_CHARACTERS)
+    # Tokens that reach the model in one piece, fill is measured against it
+    window = min(token_limit, char_limit // 4)
+    length_function = genai_core.embeddings.get_token_length_function(model)
+
+    workspace = {
+        "embeddings_model_provider": provider,
+        "embeddings_model_name": model.name,
+        "embeddings_model_dimensions": dimensions,
+    }
+    strategies = [
+        ("recursive", args.chunk_size, args.chunk_overlap),
+        ("token", args.token_chunk_size, args.token_chunk_overlap),
+    ]
+
+    print(f"{len(content)} characters, {args.model} window {window} tokens")
+    print(
+        f"{'strategy':>10} {'chunks':>8} {'calls':>6} {'fill':>6} "
+        f"{'over window':>12} {'split s':>8}"
+    )
+    for strategy, chunk_size, chunk_overlap in strategies:
+        start = time.perf_counter()
+        chunks = genai_core.chunks.split_content(
+            {
+                **workspace,
+                "chunking_strategy": strategy,
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+            },
+            content,
+        )
+        elapsed = time.perf_counter() - start
+
+        # generate_embeddings splits texts above the character limit again
+        texts = []
+        for chunk in chunks:
+            texts.extend(
+                chunk[i : i + char_limit] for i in range(0, len(chunk), char_limit)
+            )
+        plan = genai_core.embeddings.plan_embeddings_batches(model, texts)
+        calls = len(plan.batches)
+        if model.provider == "bedrock" and model.name.startswith("amazon."):
+            # Titan embeds one text per request
+            calls = len(texts)
+
+        tokens = [length_function(chunk) for chunk in chunks]
+        fill = sum(min(value, window) for value in tokens) / (len(tokens) * window)
+        over = sum(1 for value in tokens if value > window)
+
+        print(
+            f"{strategy:>10} {len(chunks):>8} {calls:>6} {fill:>6.1%} "
+            f"{over:>12} {elapsed:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Throughput of Titan embeddings generation against a stubbed Bedrock client.
+
+Usage:
+    python scripts/benchmarks/embeddings_concurrency.py --items 200 --latency 0.05
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, "../../lib/shared/layers/python-sdk/python"))
+
+import genai_core.embeddings  # noqa: E402
+from genai_core.embeddings import _generate_embeddings_amazon  # noqa: E402
+from genai_core.types import EmbeddingsModel  # noqa: E402
+
+
+class StubBedrock:
+    def __init__(self, latency: float, dimensions: int, throttle_every: int):
+        self.latency = latency
+        self.dimensions = dimensions
+        self.throttle_every = throttle_every
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def invoke_model(self, body, modelId, accept, contentType):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+
+        # A throttled call is retried by the client, which takes another round trip
+        retried = bool(self.throttle_every and call % self.throttle_every == 0)
+        time.sleep(self.latency * (2 if retried else 1))
+
+        embedding = [1.0] * self.dimensions
+        return {
+            "ResponseMetadata": {"RetryAttempts": int(retried)},
+            "body": io.BytesIO(json.dumps({"embedding": embedding}).encode()),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    model = EmbeddingsModel(
+        provider="bedrock",
+        name="amazon.titan-embed-text-v1",
+        dimensions=args.dimensions,
+    )
+    input = [f"text {i}" for i in range(args.items)]
+
+    print(f"{'concurrency':>12} {'seconds':>10} {'items/s':>10} {'calls':>8}")
+    for concurrency in args.concurrency:
+        bedrock = StubBedrock(args.latency, args.dimensions, args.throttle_every)
+        # Each run starts without the throttling state of the previous one
+        genai_core.embeddings._amazon_limiters.clear()
+        start = time.perf_counter()
+        _generate_embeddings_amazon(model, input, bedrock, max_concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{concurrency:>12} {elapsed:>10.2f} "
+            f"{args.items / elapsed:>10.1f} {bedrock.calls:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Recall and exact kNN latency of reduced-dimension embeddings against the full
+size vectors. Reduced vectors are truncated and re-normalized the same way
+workspaces with a smaller embeddings dimension are.
+
+Embeddings can be loaded from a .npy file (one row per chunk). Without one a
+synthetic corpus with decaying per-dimension variance is used, which only
+approximates a Matryoshka trained model.
+
+Usage:
+    python scripts/benchmarks/matryoshka_recall.py --embeddings corpus.npy
+    python scripts/benchmarks/matryoshka_recall.py --dimensions 1024 512 256
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, "../../lib/shared/layers/python-sdk/python"))
+
+from genai_core.embeddings import reduce_dimensions  # noqa: E402
+
+
+def synthetic_corpus(items: int, dimensions: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    scale = 1 / np.sqrt(np.arange(1, dimensions + 1))
+    corpus = rng.standard_normal((items, dimensions)) * scale
+
+    return corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    scores = queries @ corpus.T
+    ret_value = np.argpartition(-scores, k, axis=1)[:, :k]
+    elapsed = time.perf_counter() - start
+
+    return ret_value, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embeddings", help=".npy file with the corpus embeddings")
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--full-dimensions", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--dimensions", type=int, nargs="+", default=[1024, 768, 512, 256, 128]
+    )
+    args = parser.parse_args()
+
+    if args.embeddings:
+        corpus = np.load(args.embeddings).astype(np.float32)
+        corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    else:
+        corpus = synthetic_corpus(args.items, args.full_dimensions, args.seed)
+        corpus = corpus.astype(np.float32)
+
+    # Queries are perturbed corpus vectors so every query has real neighbours
+    rng = np.random.default_rng(args.seed + 1)
+    queries = corpus[rng.choice(len(corpus), args.queries, replace=False)]
+    queries = queries + rng.standard_normal(queries.shape) * 0.05 / np.sqrt(
+        corpus.shape[1]
+    )
+    queries = queries.astype(np.float32)
+
+    expected, _ = top_k(corpus, queries, args.k)
+    expected = [set(row) for row in expected.tolist()]
+
+    print(
+        f"{'dimensions':>10} {'recall@' + str(args.k):>10} "
+        f"{'ms/query':>10} {'index MiB':>10}"
+    )
+    for dimensions in args.dimensions:
+        if dimensions > corpus.shape[1]:
+            continue
+
+        reduced_corpus = np.array(
+            reduce_dimensions(corpus.tolist(), dimensions), dtype=np.float32
+        )
+        reduced_queries = np.array(
+            reduce_dimensions(queries.tolist(), dimensions), dtype=np.float32
+        )
+        found, elapsed = top_k(reduced_corpus, reduced_queries, args.k)
+        recall = np.mean(
+            [
+                len(expected[i].intersection(row)) / args.k
+                for i, row in enumerate(found.tolist())
+            ]
+        )
+
+        print(
+            f"{dimensions:>10} {recall:>10.3f} "
+            f"{elapsed * 1000 / args.queries:>10.3f} "
+            f"{reduced_corpus.nbytes / 1024 / 1024:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Documents per second of OpenSearch chunk ingestion with one index request
+per chunk (the previous add_chunks_open_search) and with _bulk requests.
+
+The client talks to a local OpenSearch compatible stub that answers the
+index and _bulk APIs after --latency-ms, standing in for the network round
+trip, SigV4 signing and request overhead of OpenSearch Serverless. Nothing
+is indexed, only the request pattern of the client is measured.
+
+Usage:
+    python scripts/benchmarks/opensearch_ingestion.py --docs 2000 --latency-ms 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, "../../lib/shared/layers/python-sdk/python"))
+# Nothing is read from AWS, the names only satisfy module level clients
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import genai_core.opensearch.chunks  # noqa: E402
+from opensearchpy import OpenSearch  # noqa: E402
+
+
+class OpenSearchStub(BaseHTTPRequestHandler):
+    latency = 0.0
+    requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+
+        if self.path.split("?")[0].endswith("/_bulk"):
+            lines = [line for line in body.split(b"\n") if line]
+            items = [
+                {"index": {"_id": str(uuid.uuid4()), "status": 201}} for _ in lines[::2]
+            ]
+            status = 200
+            response = {"took": 1, "errors": False, "items": items}
+        else:
+            status = 201
+            response = {"_id": str(uuid.uuid4()), "result": "created"}
+
+        with self.lock:
+            OpenSearchStub.requests += 1
+
+        data = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def index_one_by_one(client, index_name, workspace_id, chunks, embeddings):
+    document_id = str(uuid.uuid4())
+    for chunk, embedding in zip(chunks, embeddings):
+        client.index(
+            index=index_name,
+            body={
+                "chunk_id": str(uuid.uuid4()),
+                "workspace_id": workspace_id,
+                "document_id": document_id,
+                "document_sub_id": None,
+                "document_type": "file",
+                "document_sub_type": None,
+                "path": "file.txt",
+                "title": "file.txt",
+                "content": chunk,
+                "content_complement": None,
+                "content_embeddings": embedding,
+            },
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--latency-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    OpenSearchStub.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OpenSearchStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = OpenSearch(hosts=[{"host": "127.0.0.1", "port": server.server_port}])
+    genai_core.opensearch.chunks.get_open_search_client = lambda: client
+
+    workspace_id = str(uuid.uuid4())
+    index_name = workspace_id.replace("-", "")
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((args.docs, args.dimensions)).tolist()
+    chunks = [
+        f"chunk {i} " + "lorem ipsum dolor sit amet " * 30 for i in range(args.docs)
+    ]
+
+    try:
+        start = time.perf_counter()
+        index_one_by_one(client, index_name, workspace_id, chunks, embeddings)
+        one_by_one = args.docs / (time.perf_counter() - start)
+        one_by_one_requests = OpenSearchStub.requests
+
+        OpenSearchStub.requests = 0
+        start = time.perf_counter()
+        genai_core.opensearch.chunks.add_chunks_open_search(
+            workspace_id=workspace_id,
+            document_id=str(uuid.uuid4()),
+            document_sub_id=None,
+            document_type="file",
+            document_sub_type=None,
+            path="file.txt",
+            title="file.txt",
+            chunk_ids=[str(uuid.uuid4()) for _ in chunks],
+            chunk_embeddings=embeddings,
+            chunks=chunks,
+            chunk_complements=None,
+            replace=False,
+        )
+        bulk = args.docs / (time.perf_counter() - start)
+        bulk_requests = OpenSearchStub.requests
+    finally:
+        server.shutdown()
+
+    print(f"{args.docs} docs, {args.dimensions} dimensions, {args.latency_ms} ms")
+    print(f"{'path':>12} {'docs/s':>10} {'requests':>10}")
+    print(f"{'one by one':>12} {one_by_one:>10.0f} {one_by_one_requests:>10}")
+    print(f"{'bulk':>12} {bulk:>10.0f} {bulk_requests:>10}")
+    print(f"{'speedup':>12} {bulk / one_by_one:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
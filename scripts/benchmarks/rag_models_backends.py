@@ -0,0 +1,106 @@
+"""
+Startup time, peak RSS and throughput of the SageMaker RAG models inference
+code with the torch and int8 ONNX Runtime backends. Each backend runs in its
+own process so memory numbers are not shared.
+
+The model directory has the layout of the endpoint model data, one folder per
+model id (e.g. all-MiniLM-L6-v2/). The first ONNX run includes exporting and
+quantizing the model into --onnx-dir, later runs reuse the quantized graph.
+
+Usage:
+    python scripts/benchmarks/rag_models_backends.py --model-dir ./model \\
+        --model sentence-transformers/all-MiniLM-L6-v2 --type embeddings
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess  # nosec B404
+import sys
+import time
+
+here = os.path.dirname(__file__)
+inference_dir = os.path.join(here, "../../lib/rag-engines/sagemaker-rag-models/model")
+
+
+def run_worker(args):
+    os.environ["INFERENCE_BACKEND"] = args.worker
+    os.environ["WARMUP_MODELS"] = args.model
+    os.environ["ONNX_MODELS_DIR"] = args.onnx_dir
+    sys.path.append(inference_dir)
+    import inference  # noqa: E402
+
+    start = time.perf_counter()
+    config = inference.model_fn(args.model_dir)
+    startup = time.perf_counter() - start
+
+    words = "the quick brown fox jumps over the lazy dog".split()
+    texts = [
+        " ".join(words[j % len(words)] for j in range(8 + (i * 7) % 120))
+        for i in range(args.items)
+    ]
+    if args.type == "embeddings":
+        request = {"type": "embeddings", "model": args.model, "input": texts}
+    else:
+        request = {
+            "type": "cross-encoder",
+            "model": args.model,
+            "input": "where does the fox jump",
+            "passages": texts,
+        }
+
+    # One request to warm up kernels, then timed requests
+    inference.predict_fn(request, config)
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        inference.predict_fn(request, config)
+    elapsed = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "backend": args.worker,
+                "startup": startup,
+                "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                "throughput": args.items * args.requests / elapsed,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", required=True)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument(
+        "--type", choices=["embeddings", "cross-encoder"], default="embeddings"
+    )
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--items", type=int, default=256)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--onnx-dir", default="/tmp/onnx-models")  # nosec B108
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    print(f"{'backend':>8} {'startup s':>10} {'peak RSS MiB':>13} {'items/s':>10}")
+    for backend in args.backends:
+        output = subprocess.run(  # nosec B603
+            [sys.executable, __file__, *sys.argv[1:], "--worker", backend],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{backend:>8} {result['startup']:>10.2f} "
+            f"{result['rss']:>13.0f} {result['throughput']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
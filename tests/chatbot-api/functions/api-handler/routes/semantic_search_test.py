@@ -42,6 +42,8 @@ def test_semantic_search(mocker):
         limit=25,
         query=input.get("query"),
         full_response=True,
+        ef_search=None,
+        probes=None,
     )
 
     assert response.get("engine") == search_response.get("engine")
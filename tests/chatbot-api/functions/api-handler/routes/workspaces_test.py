@@ -165,9 +165,33 @@ def test_create_aurora_workspace_invalid_input(mocker):
     input["metric"] = "invalid"
     with pytest.raises(CommonError, match="Invalid metric"):
         create_aurora_workspace(input)
+    input = create_base_input.copy()
+    input["tableLayout"] = "invalid"
+    with pytest.raises(CommonError, match="Invalid table layout"):
+        create_aurora_workspace(input)
+    # The shared tables only index the Postgres text search configurations
+    input["tableLayout"] = "partitioned"
+    with pytest.raises(CommonError, match="Invalid languages"):
+        create_aurora_workspace(input)
     verifiy_common_invalid_inputs(create_aurora_workspace)
 
 
+def test_create_partitioned_aurora_workspace(mocker):
+    mocker.patch("genai_core.parameters.get_config", return_value=config)
+    mock = mocker.patch(
+        "genai_core.workspaces.create_workspace_aurora", return_value=workspace
+    )
+    mocker.patch("genai_core.auth.get_user_roles", return_value=["user", "admin"])
+    input = {
+        **create_base_input,
+        "languages": ["english"],
+        "tableLayout": "partitioned",
+    }
+
+    create_aurora_workspace(input)
+    assert mock.call_args.kwargs["table_layout"] == "partitioned"
+
+
 def test_create_open_search_workspace(mocker):
     mocker.patch("genai_core.parameters.get_config", return_value=config)
     mock = mocker.patch(
@@ -0,0 +1,155 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+# The model container ships torch and transformers, the test runner may not
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+import inference  # noqa: E402
+
+
+class FakeTokenizer:
+    """Each word is a token, the token ids are the word lengths"""
+
+    def __init__(self):
+        self.padded_lengths = []
+
+    def __call__(self, inputs, truncation=True):
+        input_ids = []
+        for value in inputs:
+            text = " ".join(value) if isinstance(value, list) else value
+            input_ids.append([len(word) for word in text.split()])
+
+        return {
+            "input_ids": input_ids,
+            "attention_mask": [[1] * len(ids) for ids in input_ids],
+        }
+
+    def pad(self, encoded, return_tensors):
+        length = max(len(ids) for ids in encoded["input_ids"])
+        self.padded_lengths.append(length)
+        padded = {
+            key: [values + [0] * (length - len(values)) for values in encoded[key]]
+            for key in encoded.keys()
+        }
+
+        return transformers.BatchEncoding(padded, tensor_type=return_tensors)
+
+
+def sum_tokens(features):
+    return features["input_ids"].sum(dim=1).numpy()
+
+
+def test_batches_stay_within_max_tokens():
+    lengths = [5, 40, 3, 12, 40, 7, 25, 1, 9, 30]
+    batches = inference.get_length_sorted_batches(lengths, 64, 128)
+
+    assert sorted(idx for batch in batches for idx in batch) == list(range(10))
+    for batch in batches:
+        assert len(batch) * max(lengths[idx] for idx in batch) <= 64
+
+    # Sequences are grouped by length, so short ones are not padded to long ones
+    order = [lengths[idx] for batch in batches for idx in batch]
+    assert order == sorted(lengths)
+
+
+def test_batch_is_flushed_at_max_size():
+    batches = inference.get_length_sorted_batches([2] * 10, 1000, 4)
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+
+
+def test_batch_is_flushed_when_the_next_sequence_exceeds_max_tokens():
+    batches = inference.get_length_sorted_batches([4, 4, 4, 8], 16, 128)
+
+    # Adding the 8 token sequence would pad the batch to 4 * 8 tokens
+    assert batches == [[0, 1, 2], [3]]
+
+
+def test_sequence_longer_than_max_tokens_runs_alone():
+    batches = inference.get_length_sorted_batches([2, 100, 2], 16, 128)
+
+    assert batches == [[0, 2], [1]]
+
+
+def test_run_batched_returns_results_in_input_order(mocker):
+    mocker.patch.object(inference, "MAX_BATCH_TOKENS", 8)
+    tokenizer = FakeTokenizer()
+    inputs = ["aaaa b cc", "a", "aaa aaa aaa aaa aaa", "bb bb", "c c c"]
+
+    ret_value = inference.run_batched(tokenizer, inputs, sum_tokens, "cpu")
+
+    assert len(tokenizer.padded_lengths) > 1
+    assert ret_value.dtype == np.float32
+    assert ret_value.tolist() == [7, 1, 15, 4, 3]
+
+
+def test_run_batched_without_inputs():
+    ret_value = inference.run_batched(FakeTokenizer(), [], sum_tokens, "cpu")
+
+    assert ret_value.shape == (0,)
+
+
+def test_predict_fn_cross_encoder_keeps_passage_order(mocker):
+    mocker.patch.object(inference, "MAX_BATCH_TOKENS", 8)
+    tokenizer = FakeTokenizer()
+
+    def model(input_ids, attention_mask):
+        # One logit per pair, the sum of its token ids
+        return mocker.Mock(logits=input_ids.sum(dim=1, keepdim=True).float())
+
+    config = mocker.Mock(device=torch.device("cpu"))
+    config.get.return_value = {"model": model, "tokenizer": tokenizer}
+    passages = ["aaaaaa aaaaaa aaaaaa", "a", "bb bb bb", "ccc"]
+
+    ret_value = inference.predict_fn(
+        {
+            "type": "cross-encoder",
+            "model": "cross-encoder/ms-marco-MiniLM-L-12-v2",
+            "input": "q",
+            "passages": passages,
+        },
+        config,
+    )
+
+    assert len(tokenizer.padded_lengths) > 1
+    assert ret_value.tolist() == [19, 2, 7, 4]
+
+
+def test_concurrent_first_calls_load_the_model_once(mocker):
+    registry = inference.ModelRegistry("/opt/ml/model", torch.device("cpu"), "torch")
+    loaded = []
+    barrier = threading.Barrier(8)
+
+    def load(model_id):
+        loaded.append(model_id)
+        # Keep the lock held while the other callers arrive
+        time.sleep(0.05)
+
+        return {"model": object(), "tokenizer": object()}
+
+    mocker.patch.object(registry, "_load", side_effect=load)
+
+    def get():
+        barrier.wait()
+        return registry.get("all-MiniLM-L6-v2")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: get(), range(8)))
+
+    assert loaded == ["all-MiniLM-L6-v2"]
+    assert all(result is results[0] for result in results)
+    assert registry.get("all-MiniLM-L6-v2") is results[0]
+    assert loaded == ["all-MiniLM-L6-v2"]
+
+
+def test_unknown_model_is_not_loaded(mocker):
+    registry = inference.ModelRegistry("/opt/ml/model", torch.device("cpu"), "torch")
+    load = mocker.patch.object(registry, "_load")
+
+    assert registry.get("unknown-model") is None
+    load.assert_not_called()
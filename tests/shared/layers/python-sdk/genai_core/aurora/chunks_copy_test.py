@@ -0,0 +1,98 @@
+import struct
+
+import numpy as np
+from genai_core.aurora.chunks import (
+    COPY_HEADER,
+    COPY_TRAILER,
+    _encode_vector,
+    add_chunks_aurora,
+)
+
+
+def test_encode_vector():
+    assert _encode_vector([1.0, -2.0], "float32") == struct.pack(">HHff", 2, 0, 1, -2)
+    assert (
+        _encode_vector([0.5, 1.0], "float16")
+        == struct.pack(">HH", 2, 0) + np.array([0.5, 1.0], ">f2").tobytes()
+    )
+    # 10 bits, packed most significant bit first
+    bits = [1.0, -1, 1, -1, -1, -1, -1, -1, 1, 1]
+    assert _encode_vector(bits, "binary") == struct.pack(">i", 10) + bytes(
+        [0b10100000, 0b11000000]
+    )
+
+
+def test_replace_and_copy_in_one_transaction(mocker):
+    connection = mocker.patch("genai_core.aurora.chunks.AuroraConnection")
+    cursor = connection.return_value.__enter__.return_value
+    cursor.rowcount = 3
+    copied = {}
+    cursor.copy_expert.side_effect = lambda statement, data: copied.update(
+        statement=statement, data=data.read()
+    )
+    mocker.patch("genai_core.aurora.chunks.sql.Composed.as_string", return_value="COPY")
+
+    result = add_chunks_aurora(
+        workspace_id="6c0e3a3e-8a3b-4d1e-9a55-0a4b0b7e2f10",
+        document_id="0d6e7c1f-3f0a-4c8a-8f6d-3c1b8a2e5d47",
+        document_sub_id=None,
+        document_type="file",
+        document_sub_type=None,
+        path="file.txt",
+        title="file.txt",
+        chunk_ids=["9b2f4c8e-1d3a-4e5b-8c7d-6f1a2b3c4d5e"],
+        chunk_embeddings=[[0.1, 0.2]],
+        chunks=["content"],
+        chunk_complements=None,
+        replace=True,
+        chunk_languages=["english"],
+    )
+
+    connection.assert_called_once_with(autocommit=False)
+    assert "DELETE" in str(cursor.execute.call_args.args[0])
+    assert copied["data"].startswith(COPY_HEADER)
+    assert copied["data"].endswith(COPY_TRAILER)
+    assert b"content" in copied["data"]
+    assert b"english" in copied["data"]
+    cursor.connection.commit.assert_called_once()
+    assert result == {"removed_vectors": 3, "added_vectors": 1}
+
+
+def test_full_precision_embeddings_are_copied(mocker):
+    connection = mocker.patch("genai_core.aurora.chunks.AuroraConnection")
+    cursor = connection.return_value.__enter__.return_value
+    copied = {}
+    cursor.copy_expert.side_effect = lambda statement, data: copied.update(
+        data=data.read()
+    )
+    as_string = mocker.patch(
+        "genai_core.aurora.chunks.sql.Composed.as_string",
+        autospec=True,
+        return_value="COPY",
+    )
+
+    add_chunks_aurora(
+        workspace_id="6c0e3a3e-8a3b-4d1e-9a55-0a4b0b7e2f10",
+        document_id="0d6e7c1f-3f0a-4c8a-8f6d-3c1b8a2e5d47",
+        document_sub_id=None,
+        document_type="file",
+        document_sub_type=None,
+        path="file.txt",
+        title="file.txt",
+        chunk_ids=["9b2f4c8e-1d3a-4e5b-8c7d-6f1a2b3c4d5e"],
+        chunk_embeddings=[[0.5, -0.25]],
+        chunks=["content"],
+        chunk_complements=None,
+        replace=False,
+        vector_precision="float16",
+        full_precision=True,
+    )
+
+    assert "Identifier('content_embeddings_full')" in str(as_string.call_args.args[0])
+    # halfvec then vector, in the same row
+    assert copied["data"].endswith(
+        _encode_vector([0.5, -0.25], "float16")
+        + struct.pack(">i", 12)
+        + _encode_vector([0.5, -0.25], "float32")
+        + COPY_TRAILER
+    )
@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+import genai_core.aurora.connection
+from genai_core.aurora.connection import (
+    AuroraConnection,
+    AuroraConnectionPool,
+    use_reader,
+)
+
+
+@pytest.fixture
+def connect(mocker):
+    mocker.patch("genai_core.aurora.connection.client")
+    mocker.patch("genai_core.aurora.connection.register_vector")
+    mocker.patch.object(
+        genai_core.aurora.connection, "_pool", AuroraConnectionPool(max_size=2)
+    )
+    mocker.patch.object(
+        genai_core.aurora.connection,
+        "_reader_pool",
+        AuroraConnectionPool(max_size=2, host="reader"),
+    )
+
+    def new_connection(**kwargs):
+        connection = mocker.MagicMock()
+        connection.closed = 0
+        connection.cursor.return_value.connection = connection
+        connection.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        return connection
+
+    return mocker.patch(
+        "genai_core.aurora.connection.psycopg2.connect", side_effect=new_connection
+    )
+
+
+def test_connection_is_reused(connect):
+    with AuroraConnection() as cursor:
+        cursor.execute("SELECT 1;")
+    with AuroraConnection(autocommit=False) as cursor:
+        connection = cursor.connection
+
+    assert connect.call_count == 1
+    assert connection.autocommit is False
+
+
+def test_vector_types_are_registered_outside_a_transaction(connect):
+    autocommit = []
+    register_vector = genai_core.aurora.connection.register_vector
+    register_vector.side_effect = lambda connection: autocommit.append(
+        connection.autocommit
+    )
+
+    with AuroraConnection():
+        pass
+    # The pooled connection can switch to a transaction afterwards
+    with AuroraConnection(autocommit=False) as cursor:
+        connection = cursor.connection
+
+    assert autocommit == [True]
+    assert connection.autocommit is False
+    assert connect.call_count == 1
+
+
+def test_open_transaction_is_rolled_back(connect):
+    with AuroraConnection(autocommit=False) as cursor:
+        connection = cursor.connection
+        connection.info.transaction_status = (
+            psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        )
+
+    connection.rollback.assert_called_once()
+
+
+def test_broken_connection_is_replaced(connect):
+    with pytest.raises(psycopg2.OperationalError):
+        with AuroraConnection() as cursor:
+            broken = cursor.connection
+            raise psycopg2.OperationalError("server closed the connection")
+
+    with AuroraConnection() as cursor:
+        assert cursor.connection is not broken
+
+    broken.close.assert_called_once()
+    assert connect.call_count == 2
+
+
+def test_stale_idle_connection_is_replaced(connect, mocker):
+    mocker.patch("genai_core.aurora.connection.AURORA_POOL_CHECK_IDLE_SECONDS", 0)
+    with AuroraConnection() as cursor:
+        stale = cursor.connection
+    stale.cursor.return_value.__enter__.return_value.execute.side_effect = (
+        psycopg2.OperationalError("terminating connection")
+    )
+
+    with AuroraConnection() as cursor:
+        assert cursor.connection is not stale
+
+    assert connect.call_count == 2
+
+
+def test_pool_limits_connections(connect, mocker):
+    mocker.patch("genai_core.aurora.connection.AURORA_POOL_WAIT_SECONDS", 0.1)
+
+    with AuroraConnection(), AuroraConnection():
+        with pytest.raises(TimeoutError):
+            with AuroraConnection():
+                pass
+
+    assert connect.call_count == 2
+
+
+def test_reads_use_the_reader_endpoint(connect, mocker):
+    mocker.patch("genai_core.aurora.connection.AURORA_DB_HOST", "writer")
+    mocker.patch.object(genai_core.aurora.connection._pool, "host", "writer")
+    mocker.patch.object(AuroraConnection, "tokens", {})
+    logger = mocker.patch("genai_core.aurora.connection.logger")
+
+    # Without a reader endpoint reads use the writer
+    with AuroraConnection(reader=True):
+        pass
+    assert connect.call_args.kwargs["host"] == "writer"
+
+    mocker.patch("genai_core.aurora.connection.AURORA_DB_READER_HOST", "reader")
+    with AuroraConnection(reader=True):
+        pass
+    with AuroraConnection():
+        pass
+
+    assert [call.kwargs["host"] for call in connect.call_args_list] == [
+        "writer",
+        "reader",
+    ]
+    # IAM tokens are signed per endpoint
+    assert set(AuroraConnection.tokens) == {"writer", "reader"}
+    endpoints = [call.kwargs["endpoint"] for call in logger.info.call_args_list]
+    assert endpoints == ["writer", "reader", "writer"]
+
+
+def test_use_reader(mocker):
+    timestamp = "%Y-%m-%dT%H:%M:%S.%fZ"
+    updated = {"updated_at": datetime.utcnow().strftime(timestamp)}
+    ingested = {
+        "updated_at": (datetime.utcnow() - timedelta(minutes=5)).strftime(timestamp)
+    }
+
+    assert use_reader(ingested) is False
+    mocker.patch("genai_core.aurora.connection.AURORA_DB_READER_HOST", "reader")
+    # Recent writes are read from the writer
+    assert use_reader(updated) is False
+    assert use_reader(ingested) is True
+    assert use_reader({}) is True
+
+    mocker.patch("genai_core.aurora.connection.AURORA_READ_CONSISTENCY", "eventual")
+    assert use_reader(updated) is True
+    mocker.patch("genai_core.aurora.connection.AURORA_READ_CONSISTENCY", "strong")
+    assert use_reader(ingested) is False
+
+
+@pytest.mark.parametrize("consistency", ["eventual", "read_your_writes", "strong"])
+def test_reads_fall_back_to_the_writer(connect, mocker, consistency):
+    mocker.patch("genai_core.aurora.connection.AURORA_DB_READER_HOST", None)
+    mocker.patch("genai_core.aurora.connection.AURORA_READ_CONSISTENCY", consistency)
+    mocker.patch.object(genai_core.aurora.connection._pool, "host", "writer")
+    ingested = {"updated_at": "2020-01-01T00:00:00.000000Z"}
+
+    reader = use_reader(ingested)
+    with AuroraConnection(reader=True), AuroraConnection(reader=reader):
+        pass
+
+    assert reader is False
+    assert [call.kwargs["host"] for call in connect.call_args_list] == [
+        "writer",
+        "writer",
+    ]
@@ -0,0 +1,36 @@
+from genai_core.aurora.create import create_workspace_table, get_partitioned_table
+
+workspace = {
+    "workspace_id": "6c0e3a3e-8a3b-4d1e-9a55-0a4b0b7e2f10",
+    "embeddings_model_dimensions": 1024,
+    "hybrid_search": True,
+    "languages": ["english"],
+    "has_index": True,
+    "metric": "cosine",
+    "table_layout": "partitioned",
+}
+
+
+def test_partitions_share_a_table(mocker):
+    connection = mocker.patch("genai_core.aurora.create.AuroraConnection")
+    cursor = connection.return_value.__enter__.return_value
+    cursor.fetchone.side_effect = [(None,), ("workspaces_vector_1024",)]
+
+    assert get_partitioned_table(workspace) == "workspaces_vector_1024"
+    assert (
+        get_partitioned_table({**workspace, "vector_precision": "float16"})
+        == "workspaces_halfvec_1024"
+    )
+
+    create_workspace_table(workspace)
+    statements = [str(call.args[0]) for call in cursor.execute.call_args_list]
+    assert "PARTITION BY LIST" in statements[2]
+    assert "PARTITION OF" in statements[-1]
+    # The vector index is built by the maintenance job
+    assert not any("ivfflat" in statement for statement in statements)
+
+    cursor.execute.reset_mock()
+    create_workspace_table(workspace)
+    statements = [str(call.args[0]) for call in cursor.execute.call_args_list]
+    assert len(statements) == 3
+    assert "PARTITION OF" in statements[-1]
@@ -0,0 +1,119 @@
+from genai_core.aurora.create import get_ivfflat_lists, get_ivfflat_probes
+from genai_core.aurora.maintenance import (
+    NIL_UUID,
+    add_tsvector_columns,
+    build_partition_index,
+    needs_ivfflat_rebuild,
+    rebuild_ivfflat_index,
+)
+
+workspace = {
+    "workspace_id": "6c0e3a3e-8a3b-4d1e-9a55-0a4b0b7e2f10",
+    "metric": "cosine",
+    "has_index": True,
+}
+
+
+def test_ivfflat_lists_follow_row_count():
+    assert get_ivfflat_lists(0) == 10
+    assert get_ivfflat_lists(500000) == 500
+    assert get_ivfflat_lists(4000000) == 2000
+    assert get_ivfflat_probes(100) == 10
+
+
+def test_needs_ivfflat_rebuild():
+    # Built on the empty table
+    assert needs_ivfflat_rebuild(100, 10, 0, 5000)
+    assert not needs_ivfflat_rebuild(100, 10, 0, 0)
+    assert not needs_ivfflat_rebuild(10, 12, 8000, 12000)
+    assert needs_ivfflat_rebuild(10, 20, 8000, 20000)
+
+
+def test_rebuild_swaps_index(mocker):
+    connection = mocker.patch("genai_core.aurora.maintenance.AuroraConnection")
+    cursor = connection.return_value.__enter__.return_value
+    cursor.fetchone.side_effect = [("table_idx", ["lists=100"]), (50000,)]
+
+    result = rebuild_ivfflat_index(workspace)
+
+    statements = [str(call.args[0]) for call in cursor.execute.call_args_list]
+    assert result == {"lists": 50, "rows": 50000}
+    assert "CREATE INDEX CONCURRENTLY" in statements[-3]
+    assert cursor.execute.call_args_list[-3].args[1] == [50]
+    assert "DROP INDEX CONCURRENTLY" in statements[-2]
+    assert "RENAME" in statements[-1]
+
+
+def test_rebuild_skips_hnsw(mocker):
+    connection = mocker.patch("genai_core.aurora.maintenance.AuroraConnection")
+
+    assert rebuild_ivfflat_index({**workspace, "index_type": "hnsw"}) is None
+    connection.assert_not_called()
+
+
+def test_add_tsvector_columns(mocker):
+    connection = mocker.patch("genai_core.aurora.maintenance.AuroraConnection")
+    cursor = connection.return_value.__enter__.return_value
+    cursor.fetchone.side_effect = [
+        # english: no trigger, the backfill fits one batch, invalid index
+        None,
+        None,
+        (False,),
+        # french: trigger left by an interrupted run, two batches, no index
+        (1,),
+        ("chunk",),
+        None,
+        None,
+    ]
+    hybrid = {**workspace, "hybrid_search": True, "languages": ["english", "french"]}
+
+    assert add_tsvector_columns(hybrid) == ["english", "french"]
+
+    statements = [str(call.args[0]) for call in cursor.execute.call_args_list]
+    # Generated columns would rewrite the table and block searches
+    assert not any("GENERATED" in statement for statement in statements)
+    assert sum("ADD COLUMN" in statement for statement in statements) == 2
+    assert sum("CREATE TRIGGER" in statement for statement in statements) == 1
+    updates = [
+        call.args[1]
+        for call in cursor.execute.call_args_list
+        if " SET " in str(call.args[0])
+    ]
+    assert [update[0] for update in updates] == [NIL_UUID, NIL_UUID, "chunk"]
+    assert sum("DROP INDEX" in statement for statement in statements) == 1
+    assert (
+        sum("CREATE INDEX CONCURRENTLY" in statement for statement in statements) == 2
+    )
+
+    cursor.execute.reset_mock()
+    migrated = {**hybrid, "tsvector_languages": ["english", "french"]}
+    assert add_tsvector_columns(migrated) is None
+    cursor.execute.assert_not_called()
+
+
+def test_build_partition_index(mocker):
+    connection = mocker.patch("genai_core.aurora.maintenance.AuroraConnection")
+    cursor = connection.return_value.__enter__.return_value
+    partitioned = {**workspace, "table_layout": "partitioned"}
+
+    assert build_partition_index(workspace) is None
+    connection.assert_not_called()
+
+    # Small partitions are scanned exactly
+    cursor.fetchone.side_effect = [None, (500,)]
+    assert build_partition_index(partitioned) is None
+
+    cursor.fetchone.side_effect = [None, (50000,)]
+    assert build_partition_index(partitioned) == {"lists": 50, "rows": 50000}
+    statement, params = cursor.execute.call_args.args
+    assert "CREATE INDEX CONCURRENTLY" in str(statement)
+    assert "ivfflat" in str(statement)
+    assert params == [50]
+
+    cursor.fetchone.side_effect = [None, (50000,)]
+    hnsw = {**partitioned, "index_type": "hnsw"}
+    assert build_partition_index(hnsw) == {"lists": None, "rows": 50000}
+    assert "hnsw" in str(cursor.execute.call_args.args[0])
+
+    cursor.fetchone.side_effect = [(True,)]
+    assert build_partition_index(partitioned) is None
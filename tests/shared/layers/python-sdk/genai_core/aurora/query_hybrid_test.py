@@ -0,0 +1,206 @@
+import pytest
+from genai_core.aurora.query import query_workspace_aurora
+from genai_core.utils.comprehend import get_query_language
+
+workspace_id = "6c0e3a3e-8a3b-4d1e-9a55-0a4b0b7e2f10"
+workspace = {
+    "cross_encoder_model_provider": None,
+    "cross_encoder_model_name": None,
+    "metric": "cosine",
+    "hybrid_search": True,
+    "languages": ["english"],
+}
+
+
+def record(chunk_id, *scores):
+    columns = (workspace_id, "doc", None, "file", None, "file.txt", "english")
+
+    return (chunk_id, *columns, "file.txt", f"content {chunk_id}", None, {}, *scores)
+
+
+@pytest.fixture
+def cursor(mocker):
+    mocker.patch(
+        "genai_core.embeddings.get_workspace_embeddings_model", return_value=object()
+    )
+    mocker.patch("genai_core.embeddings.generate_embeddings", return_value=[[0.1, 0.2]])
+    mocker.patch(
+        "genai_core.utils.comprehend.get_query_language",
+        return_value=("english", []),
+    )
+    connection = mocker.patch("genai_core.aurora.query.AuroraConnection")
+
+    return connection.return_value.__enter__.return_value
+
+
+def candidate(chunk_id, *scores):
+    return (chunk_id, "doc", None, *scores)
+
+
+def test_hybrid_search_is_fused_in_one_statement(cursor):
+    cursor.fetchall.side_effect = [
+        [
+            candidate("a", 0.1, 0.4, 1 / 61 + 1 / 62),
+            candidate("b", None, 0.5, 1 / 61),
+        ],
+        [record("b"), record("a")],
+    ]
+
+    result = query_workspace_aurora(workspace_id, workspace, "query", 2, False)
+
+    fused, hydrate = cursor.execute.call_args_list
+    assert fused.args[1][-1] == 2
+    assert "Identifier('t', 'content')" not in str(fused.args[0])
+    # Only the returned records are read in full
+    assert hydrate.args[1] == [["a", "b"]]
+    assert [item["chunk_id"] for item in result["items"]] == ["a", "b"]
+    assert result["items"][0]["content"] == "content a"
+    assert result["items"][0]["sources"] == ["keyword_search", "vector_search"]
+    assert result["items"][1]["sources"] == ["keyword_search"]
+    assert result["items"][1]["vector_search_score"] is None
+    assert result["items"][1]["keyword_search_score"] == 0.5
+
+
+def test_full_response_keeps_both_result_sets(cursor):
+    cursor.fetchall.side_effect = [
+        [record("a", 0.1), record("c", 0.2)],
+        [record("b", 0.5), record("a", 0.4)],
+    ]
+
+    result = query_workspace_aurora(workspace_id, workspace, "query", 3, True)
+
+    assert cursor.execute.call_count == 2
+    assert [item["chunk_id"] for item in result["vector_search_items"]] == ["a", "c"]
+    assert [item["chunk_id"] for item in result["keyword_search_items"]] == ["b", "a"]
+    assert result["items"][0]["sources"] == ["keyword_search", "vector_search"]
+
+
+def test_index_search_params_are_set_per_query(cursor):
+    cursor.fetchall.return_value = []
+    hnsw = {**workspace, "has_index": True, "index_type": "hnsw", "hnsw_ef_search": 10}
+
+    query_workspace_aurora(workspace_id, hnsw, "query", 2, False)
+    # Raised to the candidates the query reads
+    assert cursor.execute.call_args_list[0].args == (
+        "SET LOCAL hnsw.ef_search = %s;",
+        [25],
+    )
+
+    cursor.execute.reset_mock()
+    query_workspace_aurora(workspace_id, hnsw, "query", 2, False, ef_search=100)
+    assert cursor.execute.call_args_list[0].args[1] == [100]
+
+    cursor.execute.reset_mock()
+    ivfflat = {
+        **workspace,
+        "has_index": True,
+        "index_type": "ivfflat",
+        "ivfflat_lists": 400,
+    }
+    query_workspace_aurora(workspace_id, ivfflat, "query", 2, False)
+    assert cursor.execute.call_args_list[0].args == (
+        "SET LOCAL ivfflat.probes = %s;",
+        [20],
+    )
+
+
+def test_workspaces_without_index_type_keep_server_probes(cursor):
+    cursor.fetchall.return_value = []
+    legacy = {**workspace, "has_index": True, "ivfflat_lists": 400}
+
+    query_workspace_aurora(workspace_id, legacy, "query", 2, False)
+    statements = [str(call.args[0]) for call in cursor.execute.call_args_list]
+    assert not any("ivfflat.probes" in statement for statement in statements)
+
+    cursor.execute.reset_mock()
+    query_workspace_aurora(workspace_id, legacy, "query", 2, False, probes=8)
+    assert cursor.execute.call_args_list[0].args == (
+        "SET LOCAL ivfflat.probes = %s;",
+        [8],
+    )
+
+
+def test_keyword_search_uses_stored_tsvector(cursor):
+    cursor.fetchall.return_value = []
+    stored = {**workspace, "tsvector_languages": ["english"]}
+
+    query_workspace_aurora(workspace_id, stored, "query", 2, False)
+    statement = cursor.execute.call_args.args[0]
+    assert "content_tsv_english" in str(statement)
+    assert "to_tsvector" not in str(statement)
+    # Same predicate as the partial index of the column
+    assert "language IS NULL OR language = " in str(statement)
+
+    # Tables created before the stored columns
+    query_workspace_aurora(workspace_id, workspace, "query", 2, False)
+    statement = cursor.execute.call_args.args[0]
+    assert "content_tsv_english" not in str(statement)
+    assert "language IS NULL" not in str(statement)
+
+
+def test_partitioned_keyword_search_filters_language(cursor):
+    cursor.fetchall.return_value = []
+    partitioned = {**workspace, "table_layout": "partitioned"}
+
+    query_workspace_aurora(workspace_id, partitioned, "query", 2, False)
+    statement = str(cursor.execute.call_args.args[0])
+    assert "Identifier('content_tsv')" in statement
+    assert "language = " in statement
+    assert "language IS NULL" not in statement
+
+
+@pytest.mark.parametrize("comprehend_languages", [[], [{"LanguageCode": "fr"}]])
+def test_undetected_query_uses_workspace_language(cursor, mocker, comprehend_languages):
+    mocker.patch("genai_core.utils.comprehend.get_query_language", get_query_language)
+    comprehend = mocker.patch("genai_core.utils.comprehend.comprehend")
+    comprehend.detect_dominant_language.return_value = {
+        "Languages": [{**language, "Score": 0.9} for language in comprehend_languages]
+    }
+    cursor.fetchall.return_value = []
+    german = {**workspace, "languages": ["german"], "table_layout": "partitioned"}
+
+    result = query_workspace_aurora(workspace_id, german, "query", 2, False)
+
+    statement = str(cursor.execute.call_args.args[0])
+    assert "Literal('german')" in statement
+    assert "english" not in statement
+    assert result["query_language"] == "german"
+
+
+def test_rescoring_runs_in_the_fused_statement(cursor):
+    cursor.fetchall.side_effect = [[candidate("a", 0.1, None, 1 / 61)], [record("a")]]
+    binary = {**workspace, "vector_precision": "binary", "vector_rescore": True}
+
+    result = query_workspace_aurora(workspace_id, binary, "query", 2, False)
+
+    fused, hydrate = cursor.execute.call_args_list
+    statement = str(fused.args[0])
+    # Hamming distance reads the candidates, the float32 column ranks them
+    assert "<~> CAST(%s AS bit(" in statement
+    assert statement.index("Identifier('content_embeddings_full')") < (
+        statement.index("<~>")
+    )
+    rescore_param, bits, candidates, limit = fused.args[1][:4]
+    assert rescore_param.tolist() == [0.1, 0.2]
+    assert bits == "11"
+    assert (candidates, limit) == (100, 25)
+    assert result["items"][0]["vector_search_score"] == 0.1
+
+
+def test_rescoring_without_fusion(cursor):
+    cursor.fetchall.side_effect = [[record("a", 0.1)], []]
+    float16 = {
+        **workspace,
+        "hybrid_search": False,
+        "vector_precision": "float16",
+        "vector_rescore": True,
+    }
+
+    result = query_workspace_aurora(workspace_id, float16, "query", 2, True)
+
+    assert cursor.execute.call_count == 1
+    statement = str(cursor.execute.call_args.args[0])
+    assert "Identifier('content_embeddings_full')" in statement
+    assert "::halfvec" in statement
+    assert cursor.execute.call_args.args[1][2:] == [100, 25]
+    assert [item["chunk_id"] for item in result["vector_search_items"]] == ["a"]
@@ -0,0 +1,142 @@
+import io
+import json
+import math
+import threading
+import time
+import botocore
+import numpy as np
+import pytest
+import genai_core.embeddings
+from genai_core.embeddings import (
+    _AdaptiveConcurrencyLimiter,
+    _generate_embeddings_amazon,
+)
+from genai_core.types import EmbeddingsModel
+
+model = EmbeddingsModel(
+    provider="bedrock", name="amazon.titan-embed-text-v1", dimensions=2
+)
+
+
+class StubBedrock:
+    def __init__(self, retried=(), throttled=(), latency=0.0):
+        # Calls that the client retried before succeeding or gave up on
+        self.retried = retried
+        self.throttled = throttled
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def invoke_model(self, body, modelId, accept, contentType):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            time.sleep(self.latency)
+            if call in self.throttled:
+                raise botocore.exceptions.ClientError(
+                    {"Error": {"Code": "ThrottlingException"}}, "InvokeModel"
+                )
+
+            # Distinct directions, so that normalization keeps the order visible
+            text = json.loads(body)["inputText"]
+            embedding = [float(len(text)), 1.0]
+            return {
+                "ResponseMetadata": {"RetryAttempts": 1 if call in self.retried else 0},
+                "body": io.BytesIO(json.dumps({"embedding": embedding}).encode()),
+            }
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def normalized(x, y):
+    norm = math.sqrt(x * x + y * y)
+    return [x / norm, y / norm]
+
+
+@pytest.fixture(autouse=True)
+def reset_limiters():
+    genai_core.embeddings._amazon_limiters.clear()
+    yield
+    genai_core.embeddings._amazon_limiters.clear()
+
+
+def test_amazon_concurrent_keeps_order():
+    bedrock = StubBedrock(latency=0.01)
+    input = ["a" * (i + 1) for i in range(20)]
+
+    result = _generate_embeddings_amazon(model, input, bedrock, max_concurrency=4)
+
+    expected = [normalized(i + 1, 1) for i in range(20)]
+    assert np.allclose(result, expected)
+    assert bedrock.calls == 20
+    assert 1 < bedrock.max_in_flight <= 4
+
+
+def test_amazon_retried_requests_lower_the_cap():
+    bedrock = StubBedrock(retried={1})
+
+    result = _generate_embeddings_amazon(model, ["a"], bedrock, max_concurrency=8)
+
+    # The client retried the throttled request, it is sent once from here
+    assert np.allclose(result, [normalized(1, 1)])
+    assert bedrock.calls == 1
+    assert genai_core.embeddings._get_amazon_limiter(model, 8).limit == 4
+
+
+def test_amazon_limiter_is_shared_across_calls():
+    _generate_embeddings_amazon(
+        model, ["a", "b"], StubBedrock(retried={1, 2}), max_concurrency=8
+    )
+    assert genai_core.embeddings._get_amazon_limiter(model, 8).limit == 2
+
+    # The next call starts at the lowered cap and grows it back one by one
+    bedrock = StubBedrock(latency=0.01)
+    _generate_embeddings_amazon(model, ["a"] * 8, bedrock, max_concurrency=8)
+
+    assert 1 < bedrock.max_in_flight <= 4
+
+
+def test_amazon_raises_throttling_once_retries_are_exhausted():
+    bedrock = StubBedrock(throttled={1})
+
+    with pytest.raises(botocore.exceptions.ClientError) as error:
+        _generate_embeddings_amazon(model, ["a"], bedrock, max_concurrency=8)
+
+    assert error.value.response["Error"]["Code"] == "ThrottlingException"
+    assert bedrock.calls == 1
+    assert genai_core.embeddings._get_amazon_limiter(model, 8).limit == 4
+
+
+def test_amazon_raises_other_errors(mocker):
+    bedrock = mocker.MagicMock()
+    bedrock.invoke_model.side_effect = botocore.exceptions.ClientError(
+        {"Error": {"Code": "ValidationException"}}, "InvokeModel"
+    )
+
+    try:
+        _generate_embeddings_amazon(model, ["a"], bedrock)
+        assert False
+    except botocore.exceptions.ClientError as error:
+        assert error.response["Error"]["Code"] == "ValidationException"
+
+    assert bedrock.invoke_model.call_count == 1
+
+
+def test_limiter_backs_off_and_recovers():
+    limiter = _AdaptiveConcurrencyLimiter(8)
+
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(throttled=False)
+    assert limiter.limit == 5
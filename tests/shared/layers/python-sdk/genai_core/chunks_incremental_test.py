@@ -0,0 +1,207 @@
+import json
+
+import pytest
+from genai_core.chunks import add_chunks, add_chunks_pipelined, get_chunk_hash
+from genai_core.types import CommonError
+
+workspace = {
+    "workspace_id": "workspace",
+    "engine": "aurora",
+    "embeddings_model_provider": "bedrock",
+    "embeddings_model_name": "amazon.titan-embed",
+}
+document = {
+    "document_id": "document",
+    "document_type": "file",
+    "document_sub_type": None,
+    "path": "file.txt",
+    "title": "file.txt",
+}
+previous_manifest = [
+    {"chunk_id": "id-a", "hash": get_chunk_hash("chunk a")},
+    {"chunk_id": "id-b", "hash": get_chunk_hash("chunk b")},
+    {"chunk_id": "id-c", "hash": get_chunk_hash("chunk c")},
+]
+
+
+@pytest.fixture
+def mocks(mocker):
+    mocker.patch("genai_core.embeddings.get_workspace_embeddings_model")
+    embeddings = mocker.patch(
+        "genai_core.embeddings.generate_embeddings",
+        side_effect=lambda model, input, task: [[float(len(x))] for x in input],
+    )
+    mocker.patch("genai_core.chunks.store_chunks_on_s3")
+    aurora = mocker.patch(
+        "genai_core.aurora.chunks.add_chunks_aurora",
+        side_effect=lambda **kwargs: {
+            "removed_vectors": 0,
+            "added_vectors": len(kwargs["chunk_ids"]),
+        },
+    )
+    delete = mocker.patch("genai_core.aurora.chunks.delete_chunks_aurora")
+    clean = mocker.patch("genai_core.aurora.chunks.clean_chunks_aurora")
+    vectors = mocker.patch("genai_core.documents.set_document_vectors")
+    manifests = {"manifest.json": previous_manifest}
+    manifest = mocker.patch(
+        "genai_core.chunks._get_chunks_manifest",
+        side_effect=lambda key: manifests.get(key.split("/")[-1]),
+    )
+    s3 = mocker.patch("genai_core.chunks.s3")
+
+    return {
+        "embeddings": embeddings,
+        "aurora": aurora,
+        "delete": delete,
+        "clean": clean,
+        "vectors": vectors,
+        "manifest": manifest,
+        "manifests": manifests,
+        "s3": s3,
+    }
+
+
+def saved_manifest(s3):
+    body = s3.Object.return_value.put.call_args.kwargs["Body"]
+
+    return json.loads(body)["chunks"]
+
+
+def test_only_changed_chunks_are_written(mocks):
+    add_chunks_pipelined(
+        replace=True,
+        workspace=workspace,
+        document=document,
+        document_sub_id=None,
+        chunks=["chunk a", "chunk b changed", "chunk c", "chunk d"],
+        batch_size=2,
+    )
+
+    embedded = [
+        text for call in mocks["embeddings"].call_args_list for text in call.args[1]
+    ]
+    assert embedded == ["chunk b changed", "chunk d"]
+
+    calls = [call.kwargs for call in mocks["aurora"].call_args_list]
+    assert [call["chunks"] for call in calls] == [["chunk b changed"], ["chunk d"]]
+    # The previous vectors are kept, the engine must not replace them
+    assert all(call["replace"] is False for call in calls)
+
+    mocks["delete"].assert_called_once_with("workspace", ["id-b"])
+    assert [call.args[2] for call in mocks["vectors"].call_args_list] == [2, 2]
+
+    manifest = saved_manifest(mocks["s3"])
+    assert [item["hash"] for item in manifest] == [
+        get_chunk_hash(text)
+        for text in ["chunk a", "chunk b changed", "chunk c", "chunk d"]
+    ]
+    assert manifest[0]["chunk_id"] == "id-a"
+    assert manifest[2]["chunk_id"] == "id-c"
+
+
+def test_unchanged_document_is_not_embedded(mocks):
+    add_chunks(
+        replace=True,
+        workspace=workspace,
+        document=document,
+        document_sub_id=None,
+        chunks=["chunk a", "chunk b", "chunk c"],
+        chunk_complements=None,
+    )
+
+    mocks["embeddings"].assert_not_called()
+    mocks["aurora"].assert_not_called()
+    mocks["delete"].assert_not_called()
+    mocks["vectors"].assert_called_once_with("workspace", "document", 3, replace=True)
+
+
+def test_complement_change_is_a_new_chunk(mocks):
+    add_chunks(
+        replace=True,
+        workspace=workspace,
+        document=document,
+        document_sub_id=None,
+        chunks=["chunk a"],
+        chunk_complements=["answer"],
+    )
+
+    assert mocks["aurora"].call_args.kwargs["chunk_complements"] == ["answer"]
+    mocks["delete"].assert_called_once()
+    assert sorted(mocks["delete"].call_args.args[1]) == ["id-a", "id-b", "id-c"]
+
+
+def test_without_manifest_replaces(mocks):
+    mocks["manifests"]["manifest.json"] = None
+
+    add_chunks_pipelined(True, workspace, document, None, ["chunk a"])
+
+    chunk_id = str(mocks["aurora"].call_args.kwargs["chunk_ids"][0])
+    mocks["clean"].assert_called_once_with(
+        "workspace", "document", keep_chunk_ids=[chunk_id]
+    )
+    mocks["delete"].assert_not_called()
+    assert len(saved_manifest(mocks["s3"])) == 1
+
+
+def test_vanished_packs_are_deleted(mocks):
+    mocks["manifests"]["manifest.json"] = [
+        {**previous_manifest[0], "pack": "pack-1", "offset": 0, "length": 10},
+        {**previous_manifest[1], "pack": "pack-1", "offset": 10, "length": 10},
+        {**previous_manifest[2], "pack": "pack-2", "offset": 0, "length": 10},
+    ]
+
+    add_chunks_pipelined(True, workspace, document, None, ["chunk a"])
+
+    deleted = mocks["s3"].meta.client.delete_objects.call_args.kwargs["Delete"]
+    # pack-1 still holds chunk a
+    assert deleted["Objects"] == [{"Key": "pack-2"}]
+    assert saved_manifest(mocks["s3"])[0]["pack"] == "pack-1"
+
+
+def test_near_duplicates_are_skipped(mocks, mocker):
+    mocks["manifests"]["manifest.json"] = None
+    deduplicator = mocker.patch("genai_core.dedup.ChunkDeduplicator").return_value
+    deduplicator.is_duplicate.side_effect = lambda chunk: chunk == "footer"
+
+    result = add_chunks_pipelined(
+        True,
+        {**workspace, "chunk_dedup": True},
+        document,
+        None,
+        ["chunk a", "footer", "chunk b"],
+    )
+
+    assert mocks["aurora"].call_args.kwargs["chunks"] == ["chunk a", "chunk b"]
+    assert result == {"added_vectors": 2, "skipped_chunks": 1}
+    assert len(saved_manifest(mocks["s3"])) == 2
+    deduplicator.save.assert_called_once()
+
+
+def test_failed_ingestion_keeps_previous_manifest(mocks):
+    mocks["aurora"].side_effect = CommonError("Insert failed")
+
+    with pytest.raises(CommonError):
+        add_chunks_pipelined(True, workspace, document, None, ["chunk a", "chunk d"])
+
+    s3 = mocks["s3"]
+    s3.Object.return_value.delete.assert_not_called()
+    # Only the pending manifest is written, it lists the chunk being indexed
+    assert (
+        s3.Object.call_args.args[1] == "workspace/document/chunks/manifest.pending.json"
+    )
+    chunk_id = str(mocks["aurora"].call_args.kwargs["chunk_ids"][0])
+    assert saved_manifest(s3) == [{"chunk_id": chunk_id}]
+
+
+def test_chunks_of_failed_ingestion_are_removed(mocks):
+    mocks["manifests"]["manifest.pending.json"] = [
+        {"chunk_id": "id-x", "pack": "pack-x", "offset": 0, "length": 10}
+    ]
+
+    add_chunks_pipelined(True, workspace, document, None, ["chunk a", "chunk b"])
+
+    mocks["aurora"].assert_not_called()
+    assert sorted(mocks["delete"].call_args.args[1]) == ["id-c", "id-x"]
+    deleted = mocks["s3"].meta.client.delete_objects.call_args.kwargs["Delete"]
+    assert {"Key": "pack-x"} in deleted["Objects"]
+    mocks["s3"].Object.return_value.delete.assert_called_once()
@@ -0,0 +1,73 @@
+import gzip
+import io
+import json
+
+import pytest
+from genai_core.chunks import get_chunks_from_s3, store_chunks_on_s3
+
+
+class FakeObject:
+    def __init__(self, objects: dict, key: str):
+        self.objects = objects
+        self.key = key
+
+    def upload_fileobj(self, fileobj, ExtraArgs=None):
+        self.objects[self.key] = fileobj.read()
+
+    def put(self, Body, **kwargs):
+        self.objects[self.key] = Body.encode() if isinstance(Body, str) else Body
+
+    def get(self, Range=None):
+        body = self.objects[self.key]
+        if Range:
+            start, end = Range.removeprefix("bytes=").split("-")
+            body = body[int(start) : int(end) + 1]
+
+        return {"Body": io.BytesIO(body)}
+
+
+@pytest.fixture
+def objects(mocker):
+    objects = {}
+    s3 = mocker.patch("genai_core.chunks.s3")
+    s3.Object.side_effect = lambda bucket, key: FakeObject(objects, key)
+
+    return objects
+
+
+def test_chunks_are_stored_in_one_pack(objects):
+    chunks = ["first chunk", "second chunk", "ünïcode chunk"]
+
+    locations = store_chunks_on_s3(
+        "workspace", "document", None, ["a", "b", "c"], chunks
+    )
+
+    assert len(objects) == 1
+    pack = locations[0]["pack"]
+    assert pack.startswith("workspace/document/chunks/")
+    assert pack.endswith(".jsonl.gz")
+
+    # The whole pack is a regular gzipped JSON lines file
+    lines = gzip.decompress(objects[pack]).decode().splitlines()
+    assert [json.loads(line)["content"] for line in lines] == chunks
+
+
+def test_chunks_are_read_by_range(objects):
+    chunks = [f"chunk {i}" for i in range(10)]
+    chunk_ids = [f"id-{i}" for i in range(10)]
+    locations = store_chunks_on_s3("workspace", "document", "sub", chunk_ids, chunks)
+    manifest = [{**location, "hash": "x"} for location in locations]
+    objects["workspace/document/sub/chunks/manifest.json"] = json.dumps(
+        {"chunks": manifest}
+    ).encode()
+
+    assert get_chunks_from_s3("workspace", "document", "sub", ["id-3", "id-7"]) == {
+        "id-3": "chunk 3",
+        "id-7": "chunk 7",
+    }
+    assert len(get_chunks_from_s3("workspace", "document", "sub")) == 10
+
+
+def test_empty_batch_writes_nothing(objects):
+    assert store_chunks_on_s3("workspace", "document", None, [], []) == []
+    assert objects == {}
@@ -0,0 +1,127 @@
+import pytest
+import genai_core.aurora.chunks
+from genai_core.chunks import add_chunks_pipelined
+from genai_core.types import CommonError
+
+workspace = {
+    "workspace_id": "workspace",
+    "engine": "aurora",
+    "embeddings_model_provider": "bedrock",
+    "embeddings_model_name": "amazon.titan-embed",
+}
+document = {
+    "document_id": "document",
+    "document_type": "file",
+    "document_sub_type": None,
+    "path": "file.txt",
+    "title": "file.txt",
+}
+
+
+@pytest.fixture
+def mocks(mocker):
+    mocker.patch("genai_core.embeddings.get_workspace_embeddings_model")
+    mocker.patch(
+        "genai_core.embeddings.generate_embeddings",
+        side_effect=lambda model, input, task: [[float(len(x))] for x in input],
+    )
+    store = mocker.patch("genai_core.chunks.store_chunks_on_s3")
+    aurora = mocker.patch(
+        "genai_core.aurora.chunks.add_chunks_aurora",
+        side_effect=lambda **kwargs: {
+            "removed_vectors": 0,
+            "added_vectors": len(kwargs["chunk_ids"]),
+        },
+    )
+    mocker.patch("genai_core.aurora.chunks.clean_chunks_aurora")
+    vectors = mocker.patch("genai_core.documents.set_document_vectors")
+    mocker.patch("genai_core.chunks._get_chunks_manifest", return_value=None)
+    mocker.patch("genai_core.chunks.s3")
+
+    return store, aurora, vectors
+
+
+def test_pipelined_batches(mocks):
+    store, aurora, vectors = mocks
+    chunks = (f"chunk {i}" for i in range(25))
+
+    add_chunks_pipelined(
+        replace=True,
+        workspace=workspace,
+        document=document,
+        document_sub_id=None,
+        chunks=chunks,
+        chunk_complements=[f"complement {i}" for i in range(12)],
+        batch_size=10,
+    )
+
+    assert store.call_count == 3
+    assert aurora.call_count == 3
+
+    calls = [call.kwargs for call in aurora.call_args_list]
+    assert [call["replace"] for call in calls] == [False, False, False]
+    assert calls[1]["chunks"][0] == "chunk 10"
+    assert calls[1]["chunk_embeddings"][0] == [float(len("chunk 10"))]
+    assert calls[1]["chunk_complements"] == ["complement 10", "complement 11"]
+    assert calls[2]["chunk_complements"] is None
+
+    assert [call.args[2] for call in vectors.call_args_list] == [10, 10, 5]
+    assert [call.kwargs["replace"] for call in vectors.call_args_list] == [
+        True,
+        False,
+        False,
+    ]
+    # The previous vectors are removed after all batches are indexed
+    chunk_ids = [str(chunk_id) for call in calls for chunk_id in call["chunk_ids"]]
+    clean = genai_core.aurora.chunks.clean_chunks_aurora
+    clean.assert_called_once_with("workspace", "document", keep_chunk_ids=chunk_ids)
+
+
+def test_pipelined_empty_document_replaces(mocks):
+    _, aurora, vectors = mocks
+
+    add_chunks_pipelined(True, workspace, document, None, [])
+
+    aurora.assert_not_called()
+    genai_core.aurora.chunks.clean_chunks_aurora.assert_called_once_with(
+        "workspace", "document", keep_chunk_ids=[]
+    )
+    vectors.assert_called_once_with("workspace", "document", 0, replace=True)
+
+
+def test_pipelined_failure_keeps_previous_vectors(mocks):
+    _, aurora, _ = mocks
+    aurora.side_effect = [
+        {"removed_vectors": 0, "added_vectors": 10},
+        CommonError("Insert failed"),
+    ]
+
+    with pytest.raises(CommonError):
+        add_chunks_pipelined(
+            True,
+            workspace,
+            document,
+            None,
+            (f"chunk {i}" for i in range(25)),
+            batch_size=10,
+        )
+
+    assert aurora.call_args_list[0].kwargs["replace"] is False
+    genai_core.aurora.chunks.clean_chunks_aurora.assert_not_called()
+
+
+def test_pipelined_stage_error_is_raised(mocks, mocker):
+    _, aurora, _ = mocks
+    aurora.side_effect = CommonError("Insert failed")
+
+    with pytest.raises(CommonError):
+        add_chunks_pipelined(
+            False,
+            workspace,
+            document,
+            None,
+            (f"chunk {i}" for i in range(1000)),
+            batch_size=1,
+        )
+
+    assert aurora.call_count == 1
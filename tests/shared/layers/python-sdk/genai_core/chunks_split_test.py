@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import pytest
+from genai_core.chunks import split_content, split_content_stream
+from genai_core.types import CommonError, EmbeddingsModel
+
+workspace = {
+    "embeddings_model_provider": "bedrock",
+    "embeddings_model_name": "cohere.embed-english-v3",
+    "embeddings_model_dimensions": 1024,
+    "chunk_size": 1000,
+    "chunk_overlap": 0,
+}
+content = " ".join(f"word{i % 10}" for i in range(2000))
+
+
+@pytest.fixture(autouse=True)
+def embeddings_model(mocker):
+    mocker.patch(
+        "genai_core.embeddings.get_embeddings_model",
+        return_value=EmbeddingsModel(
+            provider="bedrock", name="cohere.embed-english-v3", dimensions=1024
+        ),
+    )
+
+
+def test_recursive_uses_characters():
+    chunks = split_content({**workspace, "chunking_strategy": "recursive"}, content)
+
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert len(chunks) == 13
+
+
+class WordTokenizer:
+    def encode(self, text, add_special_tokens=True):
+        return SimpleNamespace(ids=[0] * len(text.split()))
+
+    def num_special_tokens_to_add(self, is_pair):
+        return 2
+
+
+def test_token_uses_model_tokens():
+    chunks = split_content({**workspace, "chunking_strategy": "token"}, content)
+
+    # Capped at 75% of the 512 token Cohere window, as tokens are estimated at
+    # 4 characters per token
+    assert all(len(chunk) <= 384 * 4 for chunk in chunks)
+    assert len(chunks) == 8
+
+
+def test_token_uses_local_model_tokenizer(mocker):
+    mocker.patch(
+        "genai_core.embeddings.get_embeddings_model",
+        return_value=EmbeddingsModel(
+            provider="local",
+            name="sentence-transformers/all-MiniLM-L6-v2",
+            dimensions=384,
+        ),
+    )
+    mocker.patch(
+        "genai_core.local_embeddings.get_local_tokenizer",
+        return_value=WordTokenizer(),
+    )
+    local_workspace = {
+        **workspace,
+        "embeddings_model_provider": "local",
+        "embeddings_model_name": "sentence-transformers/all-MiniLM-L6-v2",
+        "embeddings_model_dimensions": 384,
+        "chunking_strategy": "token",
+    }
+
+    chunks = split_content(local_workspace, content)
+
+    # Capped at the 256 tokens of the session, less the 2 special tokens
+    assert all(len(chunk.split()) <= 254 for chunk in chunks)
+    assert len(chunks) == 8
+
+
+def test_unknown_strategy():
+    with pytest.raises(CommonError):
+        split_content({**workspace, "chunking_strategy": "unknown"}, content)
+
+
+def test_stream_small_document_matches_split_content():
+    recursive = {**workspace, "chunking_strategy": "recursive", "chunk_overlap": 100}
+    blocks = [content[i : i + 100] for i in range(0, len(content), 100)]
+
+    assert list(split_content_stream(recursive, blocks)) == split_content(
+        recursive, content
+    )
+
+
+def test_stream_keeps_overlap_across_buffers(mocker):
+    mocker.patch("genai_core.chunks.STREAM_BUFFER_CHARACTERS", 2000)
+    recursive = {**workspace, "chunking_strategy": "recursive", "chunk_overlap": 100}
+    unique_content = " ".join(f"word{i}" for i in range(2000))
+    blocks = [unique_content[i : i + 300] for i in range(0, len(unique_content), 300)]
+
+    chunks = list(split_content_stream(recursive, blocks))
+
+    position = 0
+    previous_end = 0
+    for chunk in chunks:
+        assert len(chunk) <= 1000
+        start = unique_content.index(chunk, position)
+        # Every chunk overlaps the previous one and no text is skipped
+        assert start < previous_end or previous_end == 0
+        position = start + 1
+        previous_end = start + len(chunk)
+    assert previous_end == len(unique_content)
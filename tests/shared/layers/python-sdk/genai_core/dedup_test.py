@@ -0,0 +1,102 @@
+import io
+
+import botocore
+import numpy as np
+import pytest
+import genai_core.dedup
+from genai_core.dedup import (
+    RECORD_DTYPE,
+    ChunkDeduplicator,
+    get_distances,
+    get_signature,
+)
+
+footer = (
+    "Copyright 2024 Example Corp. All rights reserved. Privacy policy, terms of "
+    "use and cookie settings. Follow us on social media for the latest news "
+    "about our products, services, events and community programs worldwide."
+)
+
+
+def distance(a: str, b: str) -> int:
+    return int(
+        get_distances(np.array([get_signature(a)], dtype="<u8"), get_signature(b))[0]
+    )
+
+
+def client_error(code: str):
+    return botocore.exceptions.ClientError({"Error": {"Code": code}}, "S3")
+
+
+@pytest.fixture
+def s3(mocker):
+    genai_core.dedup._indexes.clear()
+    s3 = mocker.patch("genai_core.dedup.s3")
+    s3.get_object.side_effect = client_error("NoSuchKey")
+    s3.put_object.return_value = {"ETag": '"1"'}
+
+    return s3
+
+
+def saved_records(s3):
+    body = s3.put_object.call_args.kwargs["Body"]
+
+    return np.load(io.BytesIO(body), allow_pickle=False)
+
+
+def test_signature_distance():
+    assert distance(footer, footer) == 0
+    assert distance(footer, footer.replace("2024", "2025")) <= 3
+    assert distance(footer, "An entirely different paragraph about vectors.") > 3
+
+
+def test_duplicates_are_skipped_and_saved(s3):
+    deduplicator = ChunkDeduplicator("workspace", "document", "page-1")
+
+    assert deduplicator.is_duplicate("unique page content about embeddings") is False
+    assert deduplicator.is_duplicate(footer) is False
+    assert deduplicator.is_duplicate(footer.replace("2024", "2025")) is True
+    deduplicator.save()
+
+    assert deduplicator.skipped == 1
+    assert len(saved_records(s3)) == 2
+    assert s3.put_object.call_args.kwargs["IfNoneMatch"] == "*"
+
+    # Another page of the same workspace finds the footer in the cached index
+    s3.get_object.side_effect = client_error("304")
+    other = ChunkDeduplicator("workspace", "document", "page-2")
+    assert other.is_duplicate(footer) is True
+
+
+def test_own_previous_signatures_are_replaced(s3):
+    first = ChunkDeduplicator("workspace", "document", "page-1")
+    first.is_duplicate(footer)
+    first.save()
+
+    s3.get_object.side_effect = client_error("304")
+    again = ChunkDeduplicator("workspace", "document", "page-1")
+    assert again.is_duplicate(footer) is False
+    again.save()
+
+    assert len(saved_records(s3)) == 1
+    assert s3.put_object.call_args.kwargs["IfMatch"] == '"1"'
+
+
+def test_concurrent_update_is_merged(s3):
+    concurrent = np.zeros(1, dtype=RECORD_DTYPE)
+    concurrent["signature"] = 12345
+    body = io.BytesIO()
+    np.save(body, concurrent)
+
+    deduplicator = ChunkDeduplicator("workspace", "document", None)
+    deduplicator.is_duplicate(footer)
+
+    s3.put_object.side_effect = [client_error("PreconditionFailed"), {"ETag": '"2"'}]
+    s3.get_object.side_effect = lambda **kwargs: {
+        "Body": io.BytesIO(body.getvalue()),
+        "ETag": '"1"',
+    }
+    deduplicator.save()
+
+    assert s3.put_object.call_count == 2
+    assert saved_records(s3)["signature"].tolist() == [12345, get_signature(footer)]
@@ -0,0 +1,78 @@
+import pytest
+import genai_core.embeddings
+import genai_core.embeddings_cache
+from genai_core.embeddings import (
+    estimate_token_length,
+    generate_embeddings,
+    plan_embeddings_batches,
+)
+from genai_core.types import EmbeddingsModel
+
+cohere = EmbeddingsModel(provider="bedrock", name="cohere.embed-v3", dimensions=2)
+titan = EmbeddingsModel(provider="bedrock", name="amazon.titan-embed", dimensions=2)
+openai = EmbeddingsModel(provider="openai", name="text-embedding-3-small", dimensions=2)
+
+
+@pytest.fixture
+def disable_cache(mocker):
+    # mocker puts back the cache of the process when the test ends
+    mocker.patch.object(genai_core.embeddings_cache, "_embeddings_cache", None)
+    mocker.patch.object(
+        genai_core.embeddings_cache, "_embeddings_cache_initialized", True
+    )
+
+
+def test_plan_fills_provider_item_limit():
+    plan = plan_embeddings_batches(cohere, ["short text"] * 200)
+
+    assert [len(batch.indices) for batch in plan.batches] == [96, 96, 8]
+    assert plan.batches[1].indices[0] == 96
+    assert plan.max_items == 96
+
+
+def test_plan_respects_token_budget():
+    # 96 * 512 tokens per Cohere call, with 4 characters per estimated token
+    texts = ["a" * 4 * 1000] * 200
+
+    plan = plan_embeddings_batches(cohere, texts)
+
+    assert all(batch.tokens <= 96 * 512 for batch in plan.batches)
+    assert [len(batch.indices) for batch in plan.batches] == [49, 49, 49, 49, 4]
+    assert plan.total_tokens == 200 * 1000
+
+
+def test_plan_pluggable_length_function():
+    plan = plan_embeddings_batches(
+        openai, ["one two", "three", "four five six"], length_function=len_words
+    )
+
+    assert len(plan.batches) == 1
+    assert plan.batches[0].tokens == 6
+
+
+def test_plan_batch_size_caps_items():
+    plan = plan_embeddings_batches(titan, ["text"] * 10, max_items=4)
+
+    assert [batch.indices for batch in plan.batches] == [
+        [0, 1, 2, 3],
+        [4, 5, 6, 7],
+        [8, 9],
+    ]
+    assert estimate_token_length("abcde") == 2
+
+
+def test_generate_embeddings_uses_plan(mocker, disable_cache):
+    mock = mocker.patch(
+        "genai_core.embeddings._generate_embeddings_bedrock",
+        side_effect=lambda model, input, task: [[float(len(x)), 0.0] for x in input],
+    )
+
+    result = generate_embeddings(cohere, [f"text {i}" for i in range(100)])
+
+    assert mock.call_count == 2
+    assert len(mock.call_args_list[0][0][1]) == 96
+    assert result[99] == [float(len("text 99")), 0.0]
+
+
+def len_words(text):
+    return len(text.split())
@@ -0,0 +1,137 @@
+import pytest
+import genai_core.embeddings
+import genai_core.embeddings_cache
+from genai_core.embeddings_cache import (
+    EmbeddingsCache,
+    EmbeddingsCacheStore,
+    FileEmbeddingsCacheStore,
+    LRUEmbeddingsCacheStore,
+    get_cache_key,
+)
+from genai_core.types import EmbeddingsModel, Task
+
+
+class FakeStore(EmbeddingsCacheStore):
+    def __init__(self):
+        self.items = {}
+
+    def get_many(self, keys):
+        return {key: self.items[key] for key in keys if key in self.items}
+
+    def put_many(self, items):
+        self.items.update(items)
+
+
+class FailingStore(EmbeddingsCacheStore):
+    def get_many(self, keys):
+        raise Exception("unavailable")
+
+    def put_many(self, items):
+        raise Exception("unavailable")
+
+
+model = EmbeddingsModel(provider="bedrock", name="amazon.titan-embed", dimensions=2)
+
+
+@pytest.fixture(autouse=True)
+def reset_cache(mocker):
+    # mocker puts back the cache of the process when the test ends
+    mocker.patch.object(genai_core.embeddings_cache, "_embeddings_cache", None)
+    mocker.patch.object(
+        genai_core.embeddings_cache, "_embeddings_cache_initialized", True
+    )
+
+
+def fake_embeddings(model, input, task):
+    return [[float(len(text)), 1.0] for text in input]
+
+
+def test_cache_key():
+    key = get_cache_key("bedrock", "amazon.titan-embed", "store", "text")
+    assert key.startswith("bedrock:amazon.titan-embed:store:")
+    assert key != get_cache_key("bedrock", "amazon.titan-embed", "retrieve", "text")
+    assert key != get_cache_key("bedrock", "cohere.embed", "store", "text")
+
+
+def test_lru_evicts_by_size():
+    # Each 2 dimensional float64 vector takes 16 bytes
+    store = LRUEmbeddingsCacheStore(max_bytes=32)
+    store.put_many({"a": [1.0, 1.0], "b": [2.0, 2.0]})
+    assert store.get_many(["a"]) == {"a": [1.0, 1.0]}
+
+    store.put_many({"c": [3.0, 3.0]})
+
+    assert store.get_many(["a", "b", "c"]) == {"a": [1.0, 1.0], "c": [3.0, 3.0]}
+    assert store.size_in_bytes == 32
+    assert len(store) == 2
+
+
+def test_file_store(tmp_path):
+    store = FileEmbeddingsCacheStore(str(tmp_path))
+    store.put_many({"bedrock:model/name:store:abc": [0.1, 0.2]})
+
+    assert store.get_many(["bedrock:model/name:store:abc", "missing"]) == {
+        "bedrock:model/name:store:abc": [0.1, 0.2]
+    }
+
+
+def test_persistent_hits_are_promoted():
+    persistent = FakeStore()
+    persistent.items = {"a": [1.0]}
+    memory = LRUEmbeddingsCacheStore(max_bytes=1024)
+    cache = EmbeddingsCache(memory, persistent)
+
+    assert cache.get_many(["a", "b"]) == {"a": [1.0]}
+    assert memory.get_many(["a"]) == {"a": [1.0]}
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_persistent_errors_are_misses():
+    cache = EmbeddingsCache(LRUEmbeddingsCacheStore(max_bytes=1024), FailingStore())
+    cache.put_many({"a": [1.0]})
+
+    assert cache.get_many(["a", "b"]) == {"a": [1.0]}
+
+
+def test_generate_embeddings_only_sends_misses(mocker):
+    genai_core.embeddings_cache.set_embeddings_cache(
+        EmbeddingsCache(LRUEmbeddingsCacheStore(max_bytes=1024 * 1024), FakeStore())
+    )
+    mock = mocker.patch(
+        "genai_core.embeddings._generate_embeddings_bedrock",
+        side_effect=fake_embeddings,
+    )
+
+    first = genai_core.embeddings.generate_embeddings(
+        model, ["a", "bb", "a"], Task.STORE.value
+    )
+    assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert mock.call_args[0][1] == ["a", "bb"]
+
+    second = genai_core.embeddings.generate_embeddings(
+        model, ["bb", "ccc"], Task.STORE.value
+    )
+    assert second == [[2.0, 1.0], [3.0, 1.0]]
+    assert mock.call_args[0][1] == ["ccc"]
+    assert mock.call_count == 2
+
+    genai_core.embeddings.generate_embeddings(model, ["a", "bb", "ccc"], Task.STORE)
+    assert mock.call_count == 2
+
+    # Query embeddings are cached separately from document embeddings
+    genai_core.embeddings.generate_embeddings(model, ["a"], Task.RETRIEVE)
+    assert mock.call_count == 3
+
+
+def test_generate_embeddings_without_cache(mocker):
+    genai_core.embeddings_cache.set_embeddings_cache(None)
+    mock = mocker.patch(
+        "genai_core.embeddings._generate_embeddings_bedrock",
+        side_effect=fake_embeddings,
+    )
+
+    genai_core.embeddings.generate_embeddings(model, ["a"])
+    genai_core.embeddings.generate_embeddings(model, ["a"])
+
+    assert mock.call_count == 2
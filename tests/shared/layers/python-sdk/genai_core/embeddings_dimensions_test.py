@@ -0,0 +1,97 @@
+import io
+import json
+
+import pytest
+import genai_core.embeddings
+import genai_core.embeddings_cache
+from genai_core.embeddings import (
+    get_native_output_dimensions,
+    get_workspace_embeddings_model,
+    reduce_dimensions,
+)
+from genai_core.types import EmbeddingsModel, Task
+
+titan_v2 = EmbeddingsModel(
+    provider="bedrock", name="amazon.titan-embed-text-v2:0", dimensions=1024
+)
+cohere = EmbeddingsModel(
+    provider="bedrock", name="cohere.embed-english-v3", dimensions=4
+)
+
+
+@pytest.fixture(autouse=True)
+def disable_cache(mocker):
+    # mocker puts back the cache of the process when the test ends
+    mocker.patch.object(genai_core.embeddings_cache, "_embeddings_cache", None)
+    mocker.patch.object(
+        genai_core.embeddings_cache, "_embeddings_cache_initialized", True
+    )
+
+
+def test_reduce_dimensions():
+    assert reduce_dimensions([[3.0, 4.0, 12.0]], 2) == [[0.6, 0.8]]
+    assert reduce_dimensions([[3.0, 4.0]], 2) == [[3.0, 4.0]]
+    assert reduce_dimensions([[3.0, 4.0]], None) == [[3.0, 4.0]]
+
+
+def test_workspace_embeddings_model(mocker):
+    mocker.patch("genai_core.embeddings.get_embeddings_model", return_value=titan_v2)
+    workspace = {
+        "embeddings_model_provider": "bedrock",
+        "embeddings_model_name": titan_v2.name,
+        "embeddings_model_dimensions": 256,
+    }
+
+    assert get_workspace_embeddings_model(workspace).output_dimensions == 256
+
+    workspace["embeddings_model_dimensions"] = 1024
+    assert get_workspace_embeddings_model(workspace).output_dimensions is None
+
+
+def test_native_output_dimensions():
+    assert get_native_output_dimensions(titan_v2) is None
+    assert (
+        get_native_output_dimensions(
+            titan_v2.model_copy(update={"output_dimensions": 512})
+        )
+        == 512
+    )
+    assert (
+        get_native_output_dimensions(
+            titan_v2.model_copy(update={"output_dimensions": 300})
+        )
+        is None
+    )
+
+    openai = EmbeddingsModel(
+        provider="openai",
+        name="text-embedding-3-small",
+        dimensions=1536,
+        output_dimensions=300,
+    )
+    assert get_native_output_dimensions(openai) == 300
+
+
+def test_titan_requests_reduced_dimensions(mocker):
+    bedrock = mocker.MagicMock()
+    bedrock.invoke_model.return_value = {
+        "body": io.BytesIO(json.dumps({"embedding": [1.0, 0.0]}).encode())
+    }
+    model = titan_v2.model_copy(update={"output_dimensions": 256})
+
+    genai_core.embeddings._generate_embeddings_amazon(model, ["text"], bedrock)
+
+    body = json.loads(bedrock.invoke_model.call_args.kwargs["body"])
+    assert body == {"inputText": "text", "dimensions": 256}
+
+
+def test_other_models_are_truncated(mocker):
+    mocker.patch(
+        "genai_core.embeddings._generate_embeddings_bedrock",
+        return_value=[[3.0, 4.0, 5.0, 6.0]],
+    )
+    model = cohere.model_copy(update={"output_dimensions": 2})
+
+    assert genai_core.embeddings.generate_embeddings(model, ["a"], Task.STORE) == [
+        [0.6, 0.8]
+    ]
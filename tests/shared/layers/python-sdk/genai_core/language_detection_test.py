@@ -0,0 +1,38 @@
+from genai_core.utils.language import detect_chunk_languages, detect_language
+
+languages = ["english", "french", "german", "russian"]
+
+
+def test_detect_language():
+    assert detect_language("The cat is on the mat and it was asleep.", languages) == (
+        "english"
+    )
+    assert detect_language("Le chat est sur le tapis, il dort.", languages) == "french"
+    assert detect_language("Die Katze ist nicht auf dem Tisch.", languages) == "german"
+    # The only candidate written in Cyrillic
+    assert detect_language("Кошка спит на ковре.", languages) == "russian"
+    # Too few function words to tell the Latin languages apart
+    assert detect_language("Kubernetes 1.29", languages) is None
+    assert detect_language("anything", ["simple"]) is None
+
+
+def test_detect_chunk_languages(mocker):
+    comprehend = mocker.patch("genai_core.utils.comprehend.get_dominant_languages")
+    chunks = ["Le chat est sur le tapis et il dort.", "Kubernetes 1.29"]
+
+    assert detect_chunk_languages(chunks, ["english"]) == ["english", "english"]
+    # Undetected chunks get the first workspace language
+    assert detect_chunk_languages(chunks, languages) == ["french", "english"]
+    comprehend.assert_not_called()
+
+
+def test_detect_chunk_languages_with_comprehend(mocker):
+    mocker.patch("genai_core.utils.language.LANGUAGE_DETECTION_COMPREHEND", True)
+    comprehend = mocker.patch(
+        "genai_core.utils.comprehend.get_dominant_languages",
+        return_value=["german", "spanish"],
+    )
+    chunks = ["Le chat est sur le tapis et il dort.", "Kubernetes", "Hola"]
+
+    assert detect_chunk_languages(chunks, languages) == ["french", "german", "english"]
+    comprehend.assert_called_once_with(["Kubernetes", "Hola"])
@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import genai_core.embeddings
+import genai_core.embeddings_cache
+import genai_core.local_embeddings
+from genai_core.local_embeddings import LocalEmbeddingsModel
+from genai_core.types import EmbeddingsModel, Task
+
+
+class FakeTokenizer:
+    def encode_batch(self, input):
+        length = max(len(text.split()) for text in input)
+        encodings = []
+        for text in input:
+            words = len(text.split())
+            encodings.append(
+                SimpleNamespace(
+                    ids=[1] * words + [0] * (length - words),
+                    attention_mask=[1] * words + [0] * (length - words),
+                    type_ids=[0] * length,
+                )
+            )
+
+        return encodings
+
+
+class FakeSession:
+    def __init__(self):
+        self.batches = []
+
+    def get_inputs(self):
+        return [
+            SimpleNamespace(name="input_ids"),
+            SimpleNamespace(name="attention_mask"),
+        ]
+
+    def run(self, output_names, inputs):
+        self.batches.append(inputs)
+        # Token states are [position, 1], padding tokens are large to show masking
+        batch, length = inputs["input_ids"].shape
+        states = np.zeros((batch, length, 2), dtype=np.float32)
+        states[:, :, 0] = np.arange(length)
+        states[:, :, 1] = 1
+        states[inputs["attention_mask"] == 0] = 100
+
+        return [states]
+
+
+@pytest.fixture(autouse=True)
+def reset_models(mocker):
+    genai_core.local_embeddings._models.clear()
+    genai_core.local_embeddings._tokenizers.clear()
+    # mocker puts back the cache of the process when the test ends
+    mocker.patch.object(genai_core.embeddings_cache, "_embeddings_cache", None)
+    mocker.patch.object(
+        genai_core.embeddings_cache, "_embeddings_cache_initialized", True
+    )
+    yield
+    genai_core.local_embeddings._models.clear()
+    genai_core.local_embeddings._tokenizers.clear()
+
+
+def test_mean_pooling_ignores_padding():
+    session = FakeSession()
+    model = LocalEmbeddingsModel(session, FakeTokenizer(), batch_size=2)
+
+    embeddings = model.embed(["a", "a b c", "a b"])
+
+    assert len(session.batches) == 2
+    assert "token_type_ids" not in session.batches[0]
+    assert embeddings[0] == pytest.approx([0.0, 1.0])
+    # Mean of positions 0, 1, 2 is 1, so the pooled vector is [1, 1] normalized
+    assert embeddings[1] == pytest.approx([2**-0.5, 2**-0.5])
+
+
+def test_model_is_loaded_once(mocker):
+    load = mocker.patch(
+        "genai_core.local_embeddings._load_model",
+        return_value=LocalEmbeddingsModel(FakeSession(), FakeTokenizer(), 32),
+    )
+    model = EmbeddingsModel(
+        provider="local", name="sentence-transformers/all-MiniLM-L6-v2", dimensions=2
+    )
+
+    genai_core.embeddings.generate_embeddings(model, ["a"], Task.RETRIEVE)
+    embeddings = genai_core.embeddings.generate_embeddings(model, ["a b"], Task.STORE)
+
+    assert load.call_count == 1
+    assert len(embeddings) == 1
+    assert len(embeddings[0]) == 2
+
+
+def test_missing_model(tmp_path, mocker):
+    mocker.patch.object(
+        genai_core.local_embeddings, "LOCAL_EMBEDDINGS_MODELS_PATH", str(tmp_path)
+    )
+
+    with pytest.raises(genai_core.types.CommonError):
+        genai_core.local_embeddings.get_local_embeddings_model("missing")
+
+
+def test_token_limit_leaves_room_for_special_tokens(mocker):
+    tokenizer = mocker.Mock()
+    tokenizer.num_special_tokens_to_add.return_value = 2
+    load = mocker.patch(
+        "genai_core.local_embeddings._load_tokenizer", return_value=tokenizer
+    )
+    mocker.patch(
+        "genai_core.local_embeddings._get_model_dir", return_value="/opt/models/m"
+    )
+
+    limit = genai_core.local_embeddings.get_local_token_limit("m")
+
+    assert limit == genai_core.local_embeddings.LOCAL_EMBEDDINGS_MAX_LENGTH - 2
+    assert genai_core.local_embeddings.get_local_tokenizer("m") is tokenizer
+    load.assert_called_once_with("/opt/models/m")
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+from opensearchpy.serializer import JSONSerializer
+from genai_core.opensearch.chunks import add_chunks_open_search
+from genai_core.types import CommonError
+
+
+def add_chunks(count: int):
+    return add_chunks_open_search(
+        workspace_id="6c0e3a3e-8a3b-4d1e-9a55-0a4b0b7e2f10",
+        document_id="document",
+        document_sub_id=None,
+        document_type="file",
+        document_sub_type=None,
+        path="file.txt",
+        title="file.txt",
+        chunk_ids=[f"chunk-{idx}" for idx in range(count)],
+        chunk_embeddings=[[0.1, 0.2]] * count,
+        chunks=[f"content {idx}" for idx in range(count)],
+        chunk_complements=None,
+        replace=False,
+    )
+
+
+@pytest.fixture
+def client(mocker):
+    mocker.patch("genai_core.opensearch.chunks.BULK_CHUNK_SIZE", 2)
+    mocker.patch("opensearchpy.helpers.actions.time.sleep")
+    client = mocker.patch(
+        "genai_core.opensearch.chunks.get_open_search_client"
+    ).return_value
+    client.transport.serializer = JSONSerializer()
+    client.requests = []
+
+    def bulk(body, *args, **kwargs):
+        lines = body.strip().split("\n")
+        sources = [json.loads(line) for line in lines[1::2]]
+        client.requests.append([source["chunk_id"] for source in sources])
+        statuses = client.statuses.pop(0) if client.statuses else []
+        items = [
+            {"index": {"status": statuses[idx] if idx < len(statuses) else 201}}
+            for idx in range(len(sources))
+        ]
+        return {
+            "errors": any(item["index"]["status"] >= 300 for item in items),
+            "items": items,
+        }
+
+    client.statuses = []
+    client.bulk.side_effect = bulk
+
+    return client
+
+
+def test_chunks_are_indexed_in_bulk(client):
+    result = add_chunks(5)
+
+    client.index.assert_not_called()
+    assert client.requests == [
+        ["chunk-0", "chunk-1"],
+        ["chunk-2", "chunk-3"],
+        ["chunk-4"],
+    ]
+    assert result == {"removed_vectors": 0, "added_vectors": 5}
+
+
+def test_throttled_chunks_are_retried(client):
+    client.statuses = [[201, 429]]
+
+    assert add_chunks(2) == {"removed_vectors": 0, "added_vectors": 2}
+    assert client.requests == [["chunk-0", "chunk-1"], ["chunk-1"]]
+
+
+def test_failed_chunks_are_raised(client):
+    client.statuses = [[201, 400]]
+
+    with pytest.raises(CommonError, match="Failed to index 1 of 3 chunks"):
+        add_chunks(3)
+    # The other batches are still sent
+    assert len(client.requests) == 2
@@ -0,0 +1,77 @@
+from genai_core.opensearch.query import (
+    CANDIDATE_FIELDS,
+    RECORD_FIELDS,
+    query_workspace_open_search,
+)
+
+workspace = {
+    "cross_encoder_model_provider": None,
+    "cross_encoder_model_name": None,
+    "hybrid_search": False,
+    "languages": ["english"],
+}
+
+
+def hit(chunk_id, score=None, **fields):
+    return {"_score": score, "_source": {"chunk_id": chunk_id, **fields}}
+
+
+def test_candidates_are_hydrated_for_returned_items_only(mocker):
+    mocker.patch(
+        "genai_core.embeddings.get_workspace_embeddings_model", return_value=object()
+    )
+    mocker.patch("genai_core.embeddings.generate_embeddings", return_value=[[0.1, 0.2]])
+    client = mocker.patch(
+        "genai_core.opensearch.query.get_open_search_client"
+    ).return_value
+    client.search.side_effect = [
+        {"hits": {"hits": [hit("a", 0.9), hit("b", 0.8), hit("c", 0.7)]}},
+        # b was deleted in between
+        {"hits": {"hits": [hit("a", content="content a", title="a.txt")]}},
+    ]
+
+    result = query_workspace_open_search("workspace", workspace, "query", 2, False)
+
+    candidates, hydrate = client.search.call_args_list
+    assert candidates.kwargs["body"]["_source"] == CANDIDATE_FIELDS
+    assert hydrate.kwargs["body"]["_source"] == RECORD_FIELDS
+    assert hydrate.kwargs["body"]["query"] == {"terms": {"chunk_id": ["a", "b"]}}
+    assert [item["chunk_id"] for item in result["items"]] == ["a"]
+    assert result["items"][0]["content"] == "content a"
+    assert result["items"][0]["vector_search_score"] == 0.9
+
+
+def test_rescoring_reads_full_precision_with_the_candidates(mocker):
+    mocker.patch(
+        "genai_core.embeddings.get_workspace_embeddings_model", return_value=object()
+    )
+    mocker.patch("genai_core.embeddings.generate_embeddings", return_value=[[1.0, 0]])
+    client = mocker.patch(
+        "genai_core.opensearch.query.get_open_search_client"
+    ).return_value
+    client.search.side_effect = [
+        {
+            "hits": {
+                "hits": [
+                    hit("a", 0.9, content_embeddings_full=[0.0, 1.0]),
+                    hit("b", 0.8, content_embeddings_full=[1.0, 0.0]),
+                ]
+            }
+        },
+        {"hits": {"hits": [hit("b"), hit("a")]}},
+    ]
+    int8 = {**workspace, "vector_precision": "int8", "vector_rescore": True}
+
+    result = query_workspace_open_search("workspace", int8, "query", 2, False)
+
+    candidates, hydrate = client.search.call_args_list
+    assert candidates.kwargs["body"]["_source"] == CANDIDATE_FIELDS + [
+        "content_embeddings_full"
+    ]
+    assert candidates.kwargs["body"]["query"]["knn"]["content_embeddings"] == {
+        "vector": [127, 0],
+        "k": 100,
+    }
+    assert [item["chunk_id"] for item in result["items"]] == ["b", "a"]
+    assert result["items"][0]["vector_search_score"] == 1.0
+    assert "content_embeddings_full" not in result["items"][0]
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from genai_core.quantization import (
+    FULL_PRECISION_FIELD,
+    get_vector_distances,
+    quantize_binary_bits,
+    quantize_binary_packed,
+    quantize_float16,
+    quantize_int8,
+    rescore_records,
+    validate_vector_precision,
+)
+from genai_core.types import CommonError
+
+
+def test_quantize():
+    embeddings = [[0.5, -0.25, 1.0, -1.0, 0.0, 0.1, -0.1, 0.9]]
+
+    assert quantize_float16(embeddings)[0].dtype == np.float16
+    assert quantize_int8(embeddings) == [[64, -32, 127, -127, 0, 13, -13, 114]]
+    assert quantize_binary_bits(embeddings) == ["10100101"]
+    assert quantize_binary_packed(embeddings) == [[np.int8(np.uint8(0b10100101))]]
+
+
+def test_validate_vector_precision():
+    validate_vector_precision("aurora", "float16", 1024)
+    validate_vector_precision("opensearch", "int8", 1024)
+
+    with pytest.raises(CommonError):
+        validate_vector_precision("aurora", "int8", 1024)
+    with pytest.raises(CommonError):
+        validate_vector_precision("aurora", "binary", 1023)
+
+
+def test_vector_distances():
+    embeddings = np.array([[1.0, 0.0], [0.0, 2.0]], dtype=np.float32)
+
+    assert get_vector_distances([1.0, 0.0], embeddings, "cosine").tolist() == [
+        0.0,
+        1.0,
+    ]
+    assert get_vector_distances([0.0, 0.0], embeddings, "l2").tolist() == [1.0, 2.0]
+    assert get_vector_distances([0.0, 1.0], embeddings, "inner").tolist() == [
+        -0.0,
+        -2.0,
+    ]
+
+
+def _record(chunk_id, embedding=None):
+    record = {
+        "chunk_id": chunk_id,
+        "document_id": "doc",
+        "document_sub_id": None,
+        "vector_search_score": 0.0,
+    }
+    if embedding is not None:
+        record[FULL_PRECISION_FIELD] = embedding
+
+    return record
+
+
+def test_rescore_records():
+    records = [_record("a", [0.0, 3.0]), _record("missing"), _record("b", [1.0, 0])]
+
+    rescored = rescore_records([1.0, 0.0], records, "l2")
+
+    assert [record["chunk_id"] for record in rescored] == ["b", "a", "missing"]
+    assert rescored[0]["vector_search_score"] == 0.0
+    # The embeddings are only read for rescoring
+    assert not any(FULL_PRECISION_FIELD in record for record in rescored)
+
+
+def test_rescore_records_similarity():
+    records = [_record("a", [0.0, 3.0]), _record("b", [1.0, 1.0])]
+
+    rescored = rescore_records([1.0, 0.0], records, "l2", similarity=True)
+
+    assert [record["chunk_id"] for record in rescored] == ["b", "a"]
+    assert rescored[0]["vector_search_score"] == 0.5
@@ -0,0 +1,127 @@
+import io
+import json
+
+import botocore
+import numpy as np
+import pytest
+import genai_core.cross_encoder
+import genai_core.embeddings
+import genai_core.embeddings_cache
+import genai_core.utils.sagemaker
+from genai_core.utils.sagemaker import (
+    NPY_CONTENT_TYPE,
+    decode_response,
+    invoke_rag_models_endpoint,
+)
+from genai_core.types import CrossEncoderModel, EmbeddingsModel, Task
+
+e5_large = EmbeddingsModel(
+    provider="sagemaker", name="intfloat/multilingual-e5-large", dimensions=4
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_negotiation():
+    genai_core.utils.sagemaker._binary_responses_supported = True
+    yield
+    genai_core.utils.sagemaker._binary_responses_supported = True
+
+
+def npy_response(value):
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(value, dtype="<f4"))
+    buffer.seek(0)
+
+    return {"ContentType": NPY_CONTENT_TYPE, "Body": buffer}
+
+
+def json_response(value):
+    return {
+        "ContentType": "application/json",
+        "Body": io.BytesIO(json.dumps(value).encode()),
+    }
+
+
+def test_decode_response():
+    assert decode_response(npy_response([[0.5, 0.25]])) == [[0.5, 0.25]]
+    assert decode_response(npy_response([1.5, -2.0])) == [1.5, -2.0]
+    assert decode_response(json_response([[0.5, 0.25]])) == [[0.5, 0.25]]
+
+
+def test_invoke_requests_binary(mocker):
+    client = mocker.MagicMock()
+    client.invoke_endpoint.return_value = npy_response([[1.0, 2.0]])
+
+    assert invoke_rag_models_endpoint(client, "endpoint", {"type": "x"}) == [[1.0, 2.0]]
+    assert client.invoke_endpoint.call_args.kwargs["Accept"] == NPY_CONTENT_TYPE
+
+
+def test_invoke_falls_back_to_json(mocker):
+    client = mocker.MagicMock()
+    client.invoke_endpoint.side_effect = [
+        botocore.exceptions.ClientError(
+            {"Error": {"Code": "ModelError"}}, "InvokeEndpoint"
+        ),
+        json_response([0.5]),
+        json_response([0.25]),
+    ]
+
+    assert invoke_rag_models_endpoint(client, "endpoint", {"type": "x"}) == [0.5]
+    assert invoke_rag_models_endpoint(client, "endpoint", {"type": "x"}) == [0.25]
+
+    # The endpoint is only asked for a binary response once
+    accepts = [call.kwargs["Accept"] for call in client.invoke_endpoint.call_args_list]
+    assert accepts == [NPY_CONTENT_TYPE, "application/json", "application/json"]
+
+
+@pytest.fixture
+def sagemaker_client(mocker):
+    # mocker puts back the cache of the process when the test ends
+    mocker.patch.object(genai_core.embeddings_cache, "_embeddings_cache", None)
+    mocker.patch.object(
+        genai_core.embeddings_cache, "_embeddings_cache_initialized", True
+    )
+    client = mocker.MagicMock()
+    mocker.patch("genai_core.clients.get_sagemaker_client", return_value=client)
+
+    return client
+
+
+def test_sagemaker_embeddings_from_npy(sagemaker_client):
+    sagemaker_client.invoke_endpoint.return_value = npy_response(
+        [[0.5, -0.5, 0.5, -0.5], [1.0, 0.0, 0.0, 0.0]]
+    )
+
+    ret_value = genai_core.embeddings.generate_embeddings(
+        e5_large, ["a", "b"], Task.STORE
+    )
+
+    assert ret_value == [[0.5, -0.5, 0.5, -0.5], [1.0, 0.0, 0.0, 0.0]]
+    assert all(isinstance(value, float) for value in ret_value[0])
+    kwargs = sagemaker_client.invoke_endpoint.call_args.kwargs
+    assert kwargs["Accept"] == NPY_CONTENT_TYPE
+    assert json.loads(kwargs["Body"])["input"] == ["a", "b"]
+
+
+def test_sagemaker_embeddings_from_npy_are_truncated(sagemaker_client):
+    sagemaker_client.invoke_endpoint.return_value = npy_response(
+        [[3.0, 4.0, 12.0, 84.0], [0.0, 0.5, 7.0, 1.0]]
+    )
+    model = e5_large.model_copy(update={"output_dimensions": 2})
+
+    ret_value = genai_core.embeddings.generate_embeddings(model, ["a", "b"], Task.STORE)
+
+    # The first dimensions are kept and scaled back to unit length
+    assert np.allclose(ret_value, [[0.6, 0.8], [0.0, 1.0]])
+    assert np.allclose(np.linalg.norm(ret_value, axis=1), 1.0)
+
+
+def test_sagemaker_ranking_from_npy(sagemaker_client):
+    sagemaker_client.invoke_endpoint.return_value = npy_response([2.5, -1.0, 0.25])
+    model = CrossEncoderModel(
+        provider="sagemaker", name="cross-encoder/ms-marco-MiniLM-L-12-v2"
+    )
+
+    ret_value = genai_core.cross_encoder.rank_passages(model, "q", ["a", "b", "c"])
+
+    assert ret_value == [2.5, -1.0, 0.25]